@@ -0,0 +1,52 @@
+"""
+Measures the memory used by the message classes generated for a large synthetic ICD.
+
+Usage: python benchmarks/memory.py [--messages 10000] [--fields 12]
+
+Created on Oct 19, 2026
+
+@author: smalb
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+from pymessagelib import MessageBuilder
+from startup import synthetic_icd
+
+
+def main():
+    """Run the benchmark and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--messages", type=int, default=10000, help="number of message definitions")
+    parser.add_argument("--fields", type=int, default=12, help="number of data fields per message")
+    args = parser.parse_args()
+
+    definitions = synthetic_icd(args.messages, args.fields)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    start = time.perf_counter()
+    builder = MessageBuilder(definitions)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    used = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    msg_cls = builder.message_classes[-1]
+    start = time.perf_counter()
+    for _ in range(100000):
+        isinstance(msg_cls, type) and len(msg_cls)
+    len_time = (time.perf_counter() - start) / 100000
+
+    print(f"{args.messages} messages with {args.fields + 3} fields each")
+    print(f"build time:    {elapsed * 1000:9.2f} ms")
+    print(f"memory:        {used / 2**20:9.2f} MiB ({used / args.messages / 1024:.2f} KiB per message class)")
+    print(f"len(msg_cls):  {len_time * 1e9:9.2f} ns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Measures how long it takes to load a large synthetic ICD and construct the first message or decode the first frame,
+with and without lazy message class generation, and how long it takes another builder to load the same ICD.
+
+Usage: python benchmarks/startup.py [--messages 1500] [--fields 12]
+
+Created on Oct 19, 2026
+
+@author: smalb
+"""
+
+import argparse
+import time
+
+from pymessagelib import MessageBuilder, Field, Nibbles, Bytes, Bits
+
+
+def synthetic_icd(num_messages, num_fields):
+    """Return a dictionary of message definitions with a unique id, a length and checksum, and data fields."""
+    definitions = {}
+    for i in range(num_messages):
+        fmt = {
+            "mid": Nibbles(4, value=f"x{i:04X}"),
+            "length": Bytes(2, value=f"x{num_fields:04X}"),
+        }
+        for j in range(num_fields):
+            fmt[f"field_{j}"] = Bytes(2) if j % 3 else Bits(16)
+        fmt["crc"] = Bytes(2, value=lambda field_0, field_1: f"x{(int(field_0) ^ int(field_1)) & 0xFFFF:04X}")
+        definitions[f"MSG_{i}"] = fmt
+    return definitions
+
+
+def time_to_first_message(definitions, lazy):
+    """Return the seconds taken to load the definitions and to construct the first message."""
+    start = time.perf_counter()
+    builder = MessageBuilder(definitions, lazy=lazy)
+    loaded = time.perf_counter()
+    msg_cls = builder.MSG_0
+    values = {name: "x0000" for name, field in msg_cls.format.items() if field.is_writable}
+    msg_cls(**values)
+    first = time.perf_counter()
+    return loaded - start, first - start
+
+
+def time_to_first_decode(definitions, lazy, frame):
+    """Return the seconds taken to load the definitions and to decode the first frame with build_message."""
+    start = time.perf_counter()
+    builder = MessageBuilder(definitions, lazy=lazy)
+    builder.build_message(frame)
+    return time.perf_counter() - start
+
+
+def main():
+    """Run the benchmark and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--messages", type=int, default=1500, help="number of message definitions")
+    parser.add_argument("--fields", type=int, default=12, help="number of data fields per message")
+    args = parser.parse_args()
+
+    definitions = synthetic_icd(args.messages, args.fields)
+    print(f"{args.messages} messages with {args.fields + 3} fields each")
+    for lazy in (False, True):
+        loaded, first = time_to_first_message(definitions, lazy)
+        label = "lazy" if lazy else "eager"
+        print(f"{label:>6}: load {loaded * 1000:9.2f} ms, first message {first * 1000:9.2f} ms")
+
+    # The frame is built by a separate builder, so the builders being measured don't share its compiled formats.
+    msg_cls = MessageBuilder({"MSG_0": definitions["MSG_0"]}).MSG_0
+    frame = bytes(msg_cls(**{name: "x0000" for name, field in msg_cls.format.items() if field.is_writable}))
+    for lazy in (False, True):
+        label = "lazy" if lazy else "eager"
+        print(f"{label:>6}: first decode {time_to_first_decode(definitions, lazy, frame) * 1000:9.2f} ms")
+
+    # Builders loading definitions that another builder has compiled share the compiled formats.
+    builder = MessageBuilder(definitions)
+    start = time.perf_counter()
+    MessageBuilder(definitions)
+    print(f"another eager builder: load {(time.perf_counter() - start) * 1000:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
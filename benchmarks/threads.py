@@ -0,0 +1,60 @@
+"""
+Measures decoding throughput with a MessageBuilder shared by a number of threads. Throughput only scales with the
+number of threads on a free-threaded (no-GIL) build of Python.
+
+Usage: python benchmarks/threads.py [--messages 20000] [--threads 1 2 4 8]
+
+Created on Oct 19, 2026
+
+@author: smalb
+"""
+
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from pymessagelib import MessageBuilder, Nibbles, Bytes, Byte
+
+
+def definitions():
+    """Return the definitions of a few register messages with a checksum."""
+    return {
+        f"WRITE_{i}": {
+            "mid": Nibbles(4, value=f"x{i:04X}"),
+            "addr": Bytes(4),
+            "data": Bytes(4),
+            "crc": Byte(value=lambda addr, data: f"x{(int(addr) ^ int(data)) & 0xFF:02X}"),
+        }
+        for i in range(16)
+    }
+
+
+def main():
+    """Run the benchmark and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--messages", type=int, default=20000, help="number of messages to decode")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8], help="numbers of threads")
+    args = parser.parse_args()
+
+    builder = MessageBuilder(definitions(), lazy=True)
+    frames = [bytes(builder.build_message(f"x{i % 16:04X}{i:08X}{i * 3:08X}00")) for i in range(args.messages)]
+
+    def decode(chunk):
+        """Decode a chunk of frames with the shared builder."""
+        for frame in chunk:
+            builder.build_message(frame)
+
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"{args.messages} messages, GIL {'enabled' if gil else 'disabled'}")
+    for threads in args.threads:
+        chunks = [frames[i::threads] for i in range(threads)]
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            start = time.perf_counter()
+            list(executor.map(decode, chunks))
+            elapsed = time.perf_counter() - start
+        print(f"{threads:>3} threads: {args.messages / elapsed:10.0f} messages/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,36 @@
 from pymessagelib.message import Message
 from pymessagelib.message_builder import MessageBuilder
-from pymessagelib.field import Field, Bit, Bits, Nibble, Nibbles, Byte, Bytes, Word, Words, DWord, DWords, QWord, QWords
+from pymessagelib.field import (
+    Field,
+    Bit,
+    Bits,
+    Nibble,
+    Nibbles,
+    Byte,
+    Bytes,
+    Word,
+    Words,
+    DWord,
+    DWords,
+    QWord,
+    QWords,
+    Array,
+    TaggedUnion,
+    auto_update,
+)
 from pymessagelib._exceptions import *
 from pymessagelib.dependency_graph import DependencyGraph
-
+from pymessagelib.layout import Layout
+from pymessagelib.compiled import CompiledFormat
+from pymessagelib.cache import DefinitionCache
+from pymessagelib.stats import Stats
+from pymessagelib.tracing import Tracer
+from pymessagelib.encoder import encode_many, iter_encode
+from pymessagelib.checksum import Checksum, Crc, Sum, Xor
+from pymessagelib.pool import MessagePool
+from pymessagelib.frozen import FrozenMessage
+from pymessagelib.capture import Capture
+from pymessagelib.dispatch import DispatchIndex
+from pymessagelib.resync import Resynchronizer, Frame, Skipped
 
 __version__ = "0.2.7"
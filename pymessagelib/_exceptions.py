@@ -39,3 +39,15 @@ class ConflictingContextsException(Exception):
 
 class CircularDependencyException(Exception):
     pass
+
+
+class AutoUpdateMismatchException(InvalidDataFormatException):
+    """
+    Raised when the value of an auto-update field in received data doesn't match the value calculated from the
+    fields it depends on. The mismatches attribute maps field names to (received, expected) integer values.
+    """
+
+    def __init__(self, message, mismatches=None):
+        """Constructs the exception with a mapping of mismatching fields."""
+        super().__init__(message)
+        self.mismatches = mismatches or {}
@@ -0,0 +1,105 @@
+"""
+This module contains the DefinitionCache class which stores compiled message formats in a file so they can be
+reused by later processes.
+
+Created on Oct 19, 2026
+
+@author: smalb
+"""
+
+import json
+import os
+import tempfile
+
+
+class DefinitionCache:
+    """
+    A DefinitionCache is a JSON file holding everything a MessageBuilder derives from message definitions: the
+    compiled format of each definition (bit lengths, field positions and constant masks, update orders and
+    dependency graphs) and the ambiguous pairs of sets of message types. Entries are keyed by digests of the
+    definitions (see CompiledFormat.fingerprint), so a cache file can be shared by any definitions and an entry is
+    never used for a definition that has changed. Auto-update functions stay in the definitions; only the names of
+    their arguments affect the cached data. For example:
+
+    builder = MessageBuilder(msg_fmts, cache="msg_fmts.cache")
+
+    The first process that loads the definitions compiles them and writes the file. Later processes load the
+    compiled formats from it instead of checking and compiling the definitions again.
+
+    A missing, unreadable or outdated cache file is treated as empty and replaced when the cache is saved.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path):
+        """Constructs a cache stored in the file at the path and loads its entries if the file exists."""
+        self.path = os.fspath(path)
+        self._formats = {}  # maps digests of definitions to snapshots of compiled formats
+        self._ambiguous_pairs = {}  # maps digests of sets of message types to pairs of indexes into the set
+        self._modified = False
+        try:
+            with open(self.path) as file:
+                contents = json.load(file)
+            if contents.get("version") == DefinitionCache.VERSION:
+                self._formats = contents["formats"]
+                self._ambiguous_pairs = contents["ambiguous_pairs"]
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass
+
+    @property
+    def modified(self):
+        """Return True if entries have been added since the cache was loaded or saved."""
+        return self._modified
+
+    def get(self, digest):
+        """Return the snapshot of the compiled format of a definition, or None if it isn't in the cache."""
+        return self._formats.get(digest)
+
+    def put(self, digest, snapshot):
+        """Add the snapshot of the compiled format of a definition to the cache."""
+        self._formats[digest] = snapshot
+        self._modified = True
+
+    def get_ambiguous_pairs(self, digest):
+        """Return the ambiguous pairs of a set of message types as pairs of indexes, or None if they aren't cached."""
+        pairs = self._ambiguous_pairs.get(digest)
+        return None if pairs is None else [tuple(pair) for pair in pairs]
+
+    def put_ambiguous_pairs(self, digest, pairs):
+        """Add the ambiguous pairs of a set of message types, given as pairs of indexes into the set."""
+        self._ambiguous_pairs[digest] = [list(pair) for pair in pairs]
+        self._modified = True
+
+    def save(self):
+        """
+        Write the cache to its file if it has been modified. The file is replaced atomically. Each save writes to a
+        temporary file of its own, so processes sharing the cache can save at the same time.
+        """
+        if not self._modified:
+            return
+        directory, name = os.path.split(os.path.abspath(self.path))
+        with tempfile.NamedTemporaryFile("w", dir=directory, prefix=f"{name}.", suffix=".tmp", delete=False) as file:
+            try:
+                json.dump(
+                    {
+                        "version": DefinitionCache.VERSION,
+                        "formats": self._formats,
+                        "ambiguous_pairs": self._ambiguous_pairs,
+                    },
+                    file,
+                    separators=(",", ":"),
+                )
+            except BaseException:
+                file.close()
+                os.remove(file.name)
+                raise
+        os.replace(file.name, self.path)
+        self._modified = False
+
+    def __len__(self):
+        """Return the number of compiled formats in the cache."""
+        return len(self._formats)
+
+    def __repr__(self):
+        """Return a short string representation of the cache"""
+        return f"<{type(self).__name__} {self.path!r} ({len(self)} formats)>"
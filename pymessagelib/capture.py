@@ -0,0 +1,499 @@
+"""
+This module contains the Capture class which scans files of recorded frames without constructing messages for
+frames that aren't needed.
+
+A capture file is a sequence of records. Each record is a 4-byte big-endian length followed by that many bytes
+of frame data in the same form as bytes(message).
+
+Captures can be indexed by the value of a field. An index is stored in a sidecar file next to the capture and
+holds the offsets of the matching records sorted by the value of the field.
+
+Created on Oct 19, 2026
+
+@author: smalb
+"""
+
+import heapq
+import mmap
+import os
+import struct
+import tempfile
+import zlib
+from bisect import bisect_left, bisect_right
+
+from pymessagelib.field import Field
+from pymessagelib.message import Message
+from pymessagelib._exceptions import (
+    InvalidDataFormatException,
+    InvalidFieldException,
+    InvalidFieldDataException,
+    InvalidFormatException,
+)
+
+_HEADER = struct.Struct(">I")
+# magic, definition digest, value width, indexed size of the capture, check, entry count
+_INDEX_HEADER = struct.Struct(">8s16sHQIQ")
+_INDEX_MAGIC = b"PMLINDX2"
+_OFFSET_WIDTH = 8
+
+
+class Capture:
+    """
+    A Capture gives read access to a capture file through a memory map and answers queries about the frames in
+    it. For example:
+
+    with Capture("traffic.cap") as capture:
+        for msg in capture.where(WRITE_REGISTER_REQUEST, addr="x60000001", data=lambda v: v & 1 << 31):
+            print(msg)
+
+    Field predicates are compiled into a single (mask, value) test on the integer value of each frame, plus a
+    call for each predicate that is a function. A message is only constructed for frames that pass all tests.
+    """
+
+    def __init__(self, path):
+        """Opens the capture file at the path."""
+        self.path = os.fspath(path)
+        self._file = open(self.path, "rb")
+        self._data = b""
+        self._retired = []  # old maps that couldn't be closed because frames from them were still in use
+        self._indexes = {}  # maps (message class, field name) to CaptureIndex objects
+        self.refresh()
+
+    def refresh(self):
+        """
+        Map the capture file again if it has grown or shrunk since it was mapped. The old map is closed, unless
+        frames from it are still in use, in which case it's closed when the capture is closed.
+        """
+        size = os.fstat(self._file.fileno()).st_size
+        if size != len(self._data):
+            old = self._data
+            self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+            if isinstance(old, mmap.mmap):
+                Capture._close_map(old, self._retired)
+        self._retired = [data for data in self._retired if not Capture._close_map(data)]
+
+    @staticmethod
+    def _close_map(data, retired=None):
+        """
+        Close a memory map and return True, or return False (and add it to the retired maps if they're given) if
+        it is still used by a memoryview.
+        """
+        try:
+            data.close()
+        except BufferError:
+            if retired is not None:
+                retired.append(data)
+            return False
+        return True
+
+    @staticmethod
+    def write(path, frames, append=False):
+        """
+        Writes messages (or frames given as bytes-like objects) to a capture file. Returns the number of frames
+        written.
+        """
+        count = 0
+        with open(path, "ab" if append else "wb") as file:
+            for frame in frames:
+                frame = bytes(frame)
+                file.write(_HEADER.pack(len(frame)))
+                file.write(frame)
+                count += 1
+        return count
+
+    def close(self):
+        """Closes the capture file and its indexes."""
+        for index in self._indexes.values():
+            index.close()
+        self._indexes.clear()
+        for data in self._retired + [self._data]:
+            if isinstance(data, mmap.mmap):
+                Capture._close_map(data)
+        self._retired = []
+        self._data = b""
+        self._file.close()
+
+    def __enter__(self):
+        """Return the capture for use in a with statement."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Close the capture at the end of a with statement."""
+        self.close()
+
+    @property
+    def size(self):
+        """Return the size of the capture file in bytes (when it was last mapped)."""
+        return len(self._data)
+
+    def records(self, start=0):
+        """
+        Yields a tuple of (offset, frame) for every record from the offset of a record onwards. The offset is the
+        position of the record in the file and the frame is a memoryview of its data.
+
+        :raises: InvalidDataFormatException if the last record is truncated.
+        """
+        data = self._data
+        view = memoryview(data)
+        size = len(data)
+        offset = start
+        unpack_from = _HEADER.unpack_from
+        header_size = _HEADER.size
+        while offset < size:
+            if offset + header_size > size:
+                raise InvalidDataFormatException(f"The record at offset {offset} of {self.path} is truncated.")
+            (length,) = unpack_from(data, offset)
+            end = offset + header_size + length
+            if end > size:
+                raise InvalidDataFormatException(f"The record at offset {offset} of {self.path} is truncated.")
+            yield offset, view[offset + header_size : end]
+            offset = end
+
+    def __iter__(self):
+        """Iterate over the frames in the capture as bytes."""
+        for _, frame in self.records():
+            yield bytes(frame)
+
+    def frame_at(self, offset):
+        """
+        Return the frame of the record at the offset as bytes.
+
+        :raises: InvalidDataFormatException if there is no complete record at the offset.
+        """
+        for _, frame in self.records(offset):
+            return bytes(frame)
+        raise InvalidDataFormatException(f"There is no record at offset {offset} of {self.path}.")
+
+    def matching(self, msg_cls, start=0, **predicates):
+        """
+        Yields a tuple of (offset, value) for every frame from the offset of a record onwards that is a message of
+        the class and satisfies the predicates. The value is the integer value of the frame. No messages are
+        constructed.
+
+        .. seealso:
+            Capture.where describes the predicates.
+        """
+        size = (msg_cls.bit_length + 7) // 8
+        mask, expected, calls = compile_predicates(msg_cls, predicates)
+        from_bytes = int.from_bytes
+        for offset, frame in self.records(start):
+            if len(frame) != size:
+                continue
+            value = from_bytes(frame, "big")
+            if value & mask != expected:
+                continue
+            if calls and not all(test(value) for test in calls):
+                continue
+            yield offset, value
+
+    def where(self, msg_cls, strict=False, **predicates):
+        """
+        Yields a message for every frame in the capture that is a message of the class and satisfies the predicates.
+
+        Predicates are given for fields by name. A predicate can be a formatted value or an integer, in which case
+        the field must have that value, or a function that is called with the integer value of the field and
+        returns True if the frame should be included. Frames must also match the constant fields of the message.
+
+        Frames that satisfy the predicates but can't be decoded as the message (because the data of a nested field
+        isn't compatible with its context) are skipped. If strict is True, InvalidDataFormatException is raised for
+        them instead, which ends the scan.
+        """
+        for _, value in self.matching(msg_cls, **predicates):
+            msg = Capture._decode(msg_cls, value, strict)
+            if msg is not None:
+                yield msg
+
+    @staticmethod
+    def _decode(msg_cls, value, strict):
+        """
+        Return the message of the class decoded from the integer value of a frame, or None if the frame can't be
+        decoded and strict is False.
+
+        :raises: InvalidDataFormatException if the frame can't be decoded and strict is True.
+        """
+        try:
+            return msg_cls.from_data(value)
+        except InvalidDataFormatException:
+            if strict:
+                raise
+            return None
+
+    def _check(self, size):
+        """Return a checksum of the end of the first `size` bytes of the capture, used to detect rewritten files."""
+        return zlib.crc32(self._data[max(0, size - 4096) : size])
+
+    def index_path(self, msg_cls, field_name):
+        """Return the path of the sidecar file of the index of the field of the message class."""
+        return f"{self.path}.{msg_cls.__name__}.{field_name}.idx"
+
+    def build_index(self, msg_cls, field_name):
+        """
+        Build (or bring up to date) the index of the field over all frames of the message class, and return it.
+
+        If the index file already exists and the capture has only grown since it was written, only the new records
+        are scanned and added to the index. If the capture was rewritten, the index is rebuilt.
+
+        :raises: InvalidFieldException if the field doesn't exist.
+        """
+        key = (msg_cls, field_name)
+        if key in self._indexes:
+            index = self._indexes[key]
+        else:
+            index = self._indexes[key] = CaptureIndex(self, msg_cls, field_name)
+        self.refresh()
+        index.update()
+        return index
+
+    def lookup(self, msg_cls, strict=False, **values):
+        """
+        Return the messages of the class whose fields have the given values (formatted values, integers or
+        messages) or satisfy the given functions (see Capture.where), in capture order. One of the fields given a
+        value must have an index built with build_index, or an index file from an earlier build. The index is
+        brought up to date first. Frames that can't be decoded are skipped, or raise if strict is True, as with
+        Capture.where.
+
+        :raises: InvalidFieldException if none of the fields are indexed or a field doesn't exist.
+        :raises: InvalidDataFormatException if strict is True and a matching frame can't be decoded.
+        """
+        for name in values:
+            if callable(values[name]):
+                continue
+            if (msg_cls, name) in self._indexes or os.path.exists(self.index_path(msg_cls, name)):
+                break
+        else:
+            raise InvalidFieldException(f"None of the fields {', '.join(values)} of {msg_cls.__name__} are indexed.")
+
+        index = self.build_index(msg_cls, name)
+        mask, expected, calls = compile_predicates(msg_cls, values)
+        messages = []
+        for offset in index.offsets(values[name]):
+            value = int.from_bytes(self.frame_at(offset), "big")
+            if value & mask == expected and all(test(value) for test in calls):
+                msg = Capture._decode(msg_cls, value, strict)
+                if msg is not None:
+                    messages.append(msg)
+        return messages
+
+    def __repr__(self):
+        """Return a short string representation of the capture"""
+        return f"<{type(self).__name__} {self.path} ({self.size} bytes)>"
+
+
+class CaptureIndex:
+    """
+    A CaptureIndex maps the values of one field of a message class to the offsets of the records holding those
+    messages in a capture. It is stored in a sidecar file (see Capture.index_path) that is memory-mapped, and
+    lookups are binary searches in the file.
+
+    The file has a header holding a digest of the message definition and the size of the capture that was indexed,
+    followed by fixed-width entries of the field value and the record offset, sorted by value and then offset. An
+    index file written for a different definition of the message is rebuilt.
+    """
+
+    def __init__(self, capture, msg_cls, field_name):
+        """Constructs the index of the field for the capture. The sidecar file is opened by CaptureIndex.update."""
+        if field_name not in msg_cls.format:
+            raise InvalidFieldException(f"'{field_name}' is not a valid field in the {msg_cls.__name__} message.")
+        self.capture = capture
+        self.message_class = msg_cls
+        self.field_name = field_name
+        self.path = capture.index_path(msg_cls, field_name)
+        self._width = (len(msg_cls.format[field_name]) + 7) // 8
+        self._definition = bytes.fromhex(msg_cls.compiled.digest)[:16]
+        self._entry_size = self._width + _OFFSET_WIDTH
+        self._data = b""
+        self._size = 0  # the size of the capture that is indexed
+        self._count = 0
+
+    def _load(self):
+        """Map the index file. Returns False if it doesn't exist or doesn't belong to the capture."""
+        try:
+            with open(self.path, "rb") as file:
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return False
+        if len(data) < _INDEX_HEADER.size:
+            data.close()
+            return False
+        magic, definition, width, size, check, count = _INDEX_HEADER.unpack_from(data)
+        if (
+            magic != _INDEX_MAGIC
+            or definition != self._definition
+            or width != self._width
+            or len(data) != _INDEX_HEADER.size + count * self._entry_size
+            or size > self.capture.size
+            or check != self.capture._check(size)
+        ):
+            data.close()
+            return False
+        self._data, self._size, self._count = data, size, count
+        return True
+
+    def _entries(self):
+        """Yields all entries of the index as (value, offset) tuples, in order."""
+        for i in range(self._count):
+            yield self._value_at(i), self._offset_at(i)
+
+    def _value_at(self, i):
+        """Return the field value of the i-th entry."""
+        start = _INDEX_HEADER.size + i * self._entry_size
+        return int.from_bytes(self._data[start : start + self._width], "big")
+
+    def _offset_at(self, i):
+        """Return the record offset of the i-th entry."""
+        start = _INDEX_HEADER.size + i * self._entry_size + self._width
+        return int.from_bytes(self._data[start : start + _OFFSET_WIDTH], "big")
+
+    def update(self):
+        """
+        Bring the index up to date with the capture, scanning only records that aren't indexed yet. The new entries
+        are sorted and merged with the entries in the index file as the new file is written, so only the new
+        entries are held in memory.
+        """
+        if not self._data and not self._load():
+            self._size, self._count = 0, 0
+        elif self._size and (self._size > self.capture.size or self.capture._check(self._size) != self._check):
+            self.close()
+            self._size, self._count = 0, 0
+        if self._data and self._size == self.capture.size:
+            return
+
+        layout = self.message_class.layout
+        new_entries = sorted(
+            (layout.extract(value, self.field_name), offset)
+            for offset, value in self.capture.matching(self.message_class, start=self._size)
+        )
+        size = self.capture.size
+        header = _INDEX_HEADER.pack(
+            _INDEX_MAGIC,
+            self._definition,
+            self._width,
+            size,
+            self.capture._check(size),
+            self._count + len(new_entries),
+        )
+
+        if self._data and not new_entries:
+            # Only the indexed size of the capture changed.
+            self.close()
+            with open(self.path, "r+b") as file:
+                file.write(header)
+            self._load()
+            return
+
+        # New records come after every indexed record, so merging keeps entries with equal values in capture order.
+        # Each update writes a temporary file of its own, so processes indexing the same capture don't collide.
+        directory, name = os.path.split(os.path.abspath(self.path))
+        with tempfile.NamedTemporaryFile(dir=directory, prefix=f"{name}.", suffix=".tmp", delete=False) as file:
+            try:
+                file.write(header)
+                width = self._width
+                for value, offset in heapq.merge(self._entries(), new_entries):
+                    file.write(value.to_bytes(width, "big") + offset.to_bytes(_OFFSET_WIDTH, "big"))
+            except BaseException:
+                file.close()
+                os.remove(file.name)
+                raise
+        self.close()
+        os.replace(file.name, self.path)
+        self._load()
+
+    @property
+    def _check(self):
+        """Return the checksum of the capture stored in the index file."""
+        return _INDEX_HEADER.unpack_from(self._data)[4]
+
+    def __len__(self):
+        """Return the number of indexed records."""
+        return self._count
+
+    def offsets(self, value):
+        """
+        Return the offsets of the records whose field has the value (a formatted value, integer or message), in
+        capture order.
+        """
+        value = _field_value(self.message_class, self.field_name, value)
+        keys = _IndexKeys(self)
+        first, last = bisect_left(keys, value), bisect_right(keys, value)
+        return [self._offset_at(i) for i in range(first, last)]
+
+    def close(self):
+        """Unmap the index file."""
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._data = b""
+
+    def __repr__(self):
+        """Return a short string representation of the index"""
+        return f"<{type(self).__name__} {self.message_class.__name__}.{self.field_name} ({len(self)} records)>"
+
+
+class _IndexKeys:
+    """A sequence view of the field values of an index, so it can be searched with the bisect module."""
+
+    def __init__(self, index):
+        """Constructs a view of the values of the index."""
+        self._index = index
+
+    def __len__(self):
+        """Return the number of entries in the index."""
+        return len(self._index)
+
+    def __getitem__(self, i):
+        """Return the field value of the i-th entry."""
+        return self._index._value_at(i)
+
+
+def compile_predicates(msg_cls, predicates):
+    """
+    Compile field predicates for a message class into a tuple of (mask, value, calls). A frame with the integer
+    value v satisfies the predicates when `v & mask == value` and every function in calls returns True for v. The
+    constant fields of the message are always included, and the test fails for values that are too long.
+
+    :raises: InvalidFormatException if the message has variable-length fields.
+    :raises: InvalidFieldException if a predicate is given for a field that doesn't exist.
+    :raises: InvalidFieldDataException if a predicate value doesn't fit in its field.
+    """
+    layout = msg_cls.layout
+    if not layout.is_fixed:
+        raise InvalidFormatException(f"Frames of variable-length message {msg_cls.__name__} cannot be queried.")
+
+    size = (msg_cls.bit_length + 7) // 8
+    mask = ((1 << size * 8) - 1) ^ ((1 << msg_cls.bit_length) - 1)  # padding bits must be zero
+    mask |= layout.constant_mask
+    value = layout.constant_value
+
+    calls = []
+    for name, predicate in predicates.items():
+        if name not in layout.spans:
+            raise InvalidFieldException(f"'{name}' is not a valid field in the {msg_cls.__name__} message.")
+        shift, field_mask = layout.spans[name]
+        if callable(predicate):
+            calls.append(lambda v, shift=shift, field_mask=field_mask, test=predicate: test((v >> shift) & field_mask))
+            continue
+        predicate = _field_value(msg_cls, name, predicate)
+        if mask & field_mask << shift and value >> shift & field_mask != predicate:
+            # The predicate contradicts a constant field, so no frame can match.
+            return -1, -1, []
+        mask |= field_mask << shift
+        value |= predicate << shift
+    return mask, value, calls
+
+
+def _field_value(msg_cls, name, value):
+    """
+    Convert a value for the named field (a formatted value, integer or message) to an integer.
+
+    :raises: InvalidFieldDataException if the value doesn't fit in the field.
+    """
+    original = value
+    if isinstance(value, Message):
+        value = int(value)
+    elif isinstance(value, str):
+        try:
+            value = int(value[1:], Field.get_format(value).value)
+        except (KeyError, ValueError, IndexError):
+            raise InvalidFieldDataException(f"'{original}' is not correctly formatted.")
+    if not isinstance(value, int) or not 0 <= value < 1 << len(msg_cls.format[name]):
+        raise InvalidFieldDataException(f"'{original}' is not a valid value for the field '{name}'")
+    return value
@@ -0,0 +1,242 @@
+"""
+This module contains checksum algorithms (CRCs, sums and XORs) that can be used directly as the value of
+auto-update fields in message definitions. For example:
+
+msg_fmts = {
+    "GET_ADDR": {
+        "id": Nibbles(4, value="x0014"),
+        "ptr": Bytes(4),
+        "addr": Bits(11),
+        "pad": Bits(3, value="b000"),
+        "crc": Bytes(2, value=CRC16_CCITT_FALSE.auto_update("ptr", "addr", "pad")),
+    }
+}
+
+The checksum is calculated over the span of the named fields. The span is the concatenation of the bits of
+the fields in the order they are named. When it is converted to bytes, it is right-aligned and padded with zero
+bits at the most significant end to a whole number of bytes.
+
+All algorithms operate on bytes and integers using precomputed tables. When only a part of the span changes,
+`patch` can be used to correct a previous checksum value without processing the entire span again.
+
+Created on Oct 19, 2026
+
+@author: smalb
+"""
+
+import inspect
+from abc import ABC, abstractmethod
+
+from pymessagelib.field import auto_update
+
+
+class Checksum(ABC):
+    """
+    Base class for all checksum algorithms. A checksum maps a sequence of bytes to an integer that is `width`
+    bits wide.
+    """
+
+    def __init__(self, width, name=""):
+        """Constructs a Checksum that produces values of the given number of bits."""
+        self.width = width
+        self.name = name or type(self).__name__
+        self._mask = (1 << width) - 1
+
+    @abstractmethod
+    def compute(self, data) -> int:
+        """Return the checksum of a bytes-like object."""
+
+    @abstractmethod
+    def patch(self, value, old, new, bit_length) -> int:
+        """
+        Return the checksum of the span `new` given the checksum `value` of the span `old`. Both spans are integers
+        that are `bit_length` bits long. Only the bytes that differ between the spans are processed, so this is
+        much faster than computing the checksum again when a single field in a long span changed.
+        """
+
+    @staticmethod
+    def span(*fields):
+        """Return the concatenation of the bits of the given fields as a tuple of (value, bit_length)."""
+        value = 0
+        bit_length = 0
+        for field in fields:
+            value = (value << len(field)) | int(field)
+            bit_length += len(field)
+        return value, bit_length
+
+    @staticmethod
+    def to_bytes(value, bit_length):
+        """Convert an integer span to bytes, padding with zero bits at the most significant end."""
+        return value.to_bytes((bit_length + 7) // 8, "big")
+
+    def compute_span(self, value, bit_length) -> int:
+        """Return the checksum of an integer span that is `bit_length` bits long."""
+        return self.compute(Checksum.to_bytes(value, bit_length))
+
+    def auto_update(self, *field_names):
+        """
+        Return a function that calculates this checksum over the named fields. The function can be used as the
+        value of an auto-update field in a message definition.
+        """
+        checksum = self
+
+        @auto_update(takes=str)
+        def update(*spans):
+            """Calculate the checksum over the concatenated bit spans of the fields."""
+            bits = "".join(spans)
+            return checksum.compute_span(int(bits, 2), len(bits))
+
+        parameter = inspect.Parameter.POSITIONAL_OR_KEYWORD
+        update.__signature__ = inspect.Signature([inspect.Parameter(name, parameter) for name in field_names])
+        update.__name__ = update.__qualname__ = f"{self.name}_over_{'_'.join(field_names)}"
+        return update
+
+    def __repr__(self):
+        """Return a short string representation of the checksum algorithm"""
+        return f"<{type(self).__name__} {self.name} ({self.width} bits)>"
+
+
+class Crc(Checksum):
+    """
+    A table-driven cyclic redundancy check. The parameters follow the usual model of CRC algorithms:
+
+        - width: The number of bits in the CRC (at least 8).
+        - poly: The generator polynomial without the leading term.
+        - init: The initial value of the register.
+        - refin: True if the bits of each input byte are processed least significant first.
+        - refout: True if the final register value is bit-reversed.
+        - xorout: The value XORed with the register to produce the CRC.
+    """
+
+    def __init__(self, width, poly, init=0, refin=False, refout=False, xorout=0, name=""):
+        """Constructs a Crc and precomputes its lookup table."""
+        if width < 8:
+            raise ValueError(f"CRCs narrower than 8 bits are not supported (width={width}).")
+        super().__init__(width, name)
+        self.poly = poly
+        self.init = init
+        self.refin = refin
+        self.refout = refout
+        self.xorout = xorout
+        self._table = self._build_table()
+
+    def _reflect(self, value, width=None):
+        """Return the value with the order of its `width` least significant bits reversed."""
+        width = width or self.width
+        return int(format(value, f"0{width}b")[::-1], 2)
+
+    def _build_table(self):
+        """Precompute the register update for every possible byte value."""
+        table = []
+        if self.refin:
+            poly = self._reflect(self.poly)
+            for byte in range(256):
+                crc = byte
+                for _ in range(8):
+                    crc = (crc >> 1) ^ poly if crc & 1 else crc >> 1
+                table.append(crc)
+        else:
+            top_bit = 1 << (self.width - 1)
+            for byte in range(256):
+                crc = byte << (self.width - 8)
+                for _ in range(8):
+                    crc = ((crc << 1) ^ self.poly) if crc & top_bit else crc << 1
+                table.append(crc & self._mask)
+        return tuple(table)
+
+    def _process(self, register, data):
+        """Feed the data through the register and return the new register value."""
+        table = self._table
+        if self.refin:
+            for byte in data:
+                register = (register >> 8) ^ table[(register ^ byte) & 0xFF]
+        else:
+            shift = self.width - 8
+            mask = self._mask
+            for byte in data:
+                register = ((register << 8) & mask) ^ table[((register >> shift) ^ byte) & 0xFF]
+        return register
+
+    def _finalize(self, register):
+        """Convert a register value to a CRC value."""
+        if self.refin != self.refout:
+            register = self._reflect(register)
+        return register ^ self.xorout
+
+    def compute(self, data) -> int:
+        """Return the CRC of a bytes-like object."""
+        register = self._reflect(self.init) if self.refin else self.init
+        return self._finalize(self._process(register, data))
+
+    def extend(self, value, data) -> int:
+        """Return the CRC of the data that produced `value` followed by `data`."""
+        register = value ^ self.xorout
+        if self.refin != self.refout:
+            register = self._reflect(register)
+        return self._finalize(self._process(register, data))
+
+    def patch(self, value, old, new, bit_length) -> int:
+        """
+        Return the CRC of the span `new` given the CRC `value` of the span `old`.
+
+        CRCs are linear, so the CRC of the new span is the old CRC XORed with the CRC (with a zero initial and
+        final value) of the difference between the spans. Leading zero bytes of the difference don't change a
+        zeroed register, so only the bytes from the first difference onwards are processed.
+        """
+        delta = Checksum.to_bytes(old ^ new, bit_length)
+        stripped = delta.lstrip(b"\x00")
+        if not stripped:
+            return value
+        register = self._process(0, stripped)
+        if self.refin != self.refout:
+            register = self._reflect(register)
+        return value ^ register
+
+
+class Sum(Checksum):
+    """The sum of all bytes, truncated to `width` bits."""
+
+    def compute(self, data) -> int:
+        """Return the sum of the bytes of a bytes-like object."""
+        return sum(data) & self._mask
+
+    def patch(self, value, old, new, bit_length) -> int:
+        """Return the sum of the span `new` given the sum `value` of the span `old`."""
+        old_bytes = Checksum.to_bytes(old, bit_length)
+        new_bytes = Checksum.to_bytes(new, bit_length)
+        delta = Checksum.to_bytes(old ^ new, bit_length)
+        start = len(delta) - len(delta.lstrip(b"\x00"))
+        stop = len(delta.rstrip(b"\x00"))
+        return (value - sum(old_bytes[start:stop]) + sum(new_bytes[start:stop])) & self._mask
+
+
+class Xor(Checksum):
+    """The XOR of all bytes. Wider checksums XOR the data in big-endian words of `width` bits."""
+
+    def compute(self, data) -> int:
+        """Return the XOR of the words of a bytes-like object."""
+        word_size = (self.width + 7) // 8
+        padded = bytes(-len(data) % word_size) + bytes(data)
+        value = 0
+        for i in range(0, len(padded), word_size):
+            value ^= int.from_bytes(padded[i : i + word_size], "big")
+        return value & self._mask
+
+    def patch(self, value, old, new, bit_length) -> int:
+        """Return the XOR of the span `new` given the XOR `value` of the span `old`."""
+        return value ^ self.compute_span(old ^ new, bit_length)
+
+
+CRC8 = Crc(8, 0x07, name="CRC8")
+CRC8_MAXIM = Crc(8, 0x31, refin=True, refout=True, name="CRC8_MAXIM")
+CRC16_ARC = Crc(16, 0x8005, refin=True, refout=True, name="CRC16_ARC")
+CRC16_CCITT_FALSE = Crc(16, 0x1021, init=0xFFFF, name="CRC16_CCITT_FALSE")
+CRC16_KERMIT = Crc(16, 0x1021, refin=True, refout=True, name="CRC16_KERMIT")
+CRC16_MODBUS = Crc(16, 0x8005, init=0xFFFF, refin=True, refout=True, name="CRC16_MODBUS")
+CRC16_XMODEM = Crc(16, 0x1021, name="CRC16_XMODEM")
+CRC32 = Crc(32, 0x04C11DB7, init=0xFFFFFFFF, refin=True, refout=True, xorout=0xFFFFFFFF, name="CRC32")
+CRC32C = Crc(32, 0x1EDC6F41, init=0xFFFFFFFF, refin=True, refout=True, xorout=0xFFFFFFFF, name="CRC32C")
+CRC32_MPEG2 = Crc(32, 0x04C11DB7, init=0xFFFFFFFF, name="CRC32_MPEG2")
+SUM8 = Sum(8, name="SUM8")
+SUM16 = Sum(16, name="SUM16")
+XOR8 = Xor(8, name="XOR8")
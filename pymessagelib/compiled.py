@@ -0,0 +1,168 @@
+"""
+This module contains the CompiledFormat class which holds everything derived from a message definition that
+doesn't depend on the MessageBuilder that loads it.
+
+Created on Oct 19, 2026
+
+@author: smalb
+"""
+
+import hashlib
+import threading
+import weakref
+from typing import Dict
+
+from pymessagelib.field import Field
+from pymessagelib.layout import Layout
+from pymessagelib.dependency_graph import DependencyGraph
+from pymessagelib._exceptions import InvalidFieldException, CircularDependencyException
+
+
+class CompiledFormat:
+    """
+    A CompiledFormat holds the checked and derived form of a message definition: the layout of its fields, the
+    dependency graph and update order of its auto-update fields and the names of its writable fields.
+
+    Compiled formats are interned by the fingerprint of their definition (see CompiledFormat.fingerprint). When
+    several MessageBuilders load the same definitions, every builder still generates its own message classes, but
+    the classes share one compiled format, so only the first builder pays for checking and compiling them. A
+    compiled format is freed when no message class uses it anymore.
+
+    Compiled formats can also be stored in a DefinitionCache file so they don't have to be compiled again in the
+    next process that loads the same definitions.
+
+    Compiled formats must not be modified, which makes them safe to share between threads.
+    """
+
+    _interned = weakref.WeakValueDictionary()  # maps fingerprints to compiled formats
+    _lock = threading.Lock()  # held while looking up and adding interned compiled formats
+    digest = None  # the digest of the fingerprint of the definition (see CompiledFormat.digest)
+
+    def __init__(self, cls_name, fmt: Dict[str, Field]):
+        """
+        Checks and compiles a message definition. The name of the message is only used in error messages.
+
+        :raises: InvalidFieldException if the definition is not valid.
+        :raises: CircularDependencyException if the auto-update fields depend on each other in a cycle.
+        """
+        for name, item in fmt.items():
+            if not isinstance(item, Field):
+                raise InvalidFieldException(f"cls_name: {name} must be a Field object.")
+        auto_updated_fields = {name: field for name, field in fmt.items() if field.is_auto_updated}
+
+        # Verify the length of each variable-length field is given by a fixed-length field that precedes it.
+        preceding_fields = []
+        for name, field in fmt.items():
+            if field.is_variable_length:
+                length_field = fmt.get(field.length_field)
+                if field.length_field not in preceding_fields or length_field.is_variable_length:
+                    raise InvalidFieldException(
+                        f"The length of field '{name}' must be given by a fixed-length field that precedes it."
+                    )
+            preceding_fields.append(name)
+
+        # Construct a graph of all dependencies - used for detecting circular imports and choosing order of updates.
+        self.dependency_graph = DependencyGraph()
+        for name, field in auto_updated_fields.items():
+            self.dependency_graph.addNode(name)
+            for dependency in field.updater_args:
+                if dependency not in fmt:
+                    raise InvalidFieldException(
+                        f"Auto-update field '{name}' depends on '{dependency}' which is not a field in {cls_name}."
+                    )
+                self.dependency_graph.addEdge(name, dependency)
+
+        # Verify no cycles exist in auto-update fields
+        if self.dependency_graph.cycle is not None:
+            raise CircularDependencyException(
+                f"Detected cycle in auto-update fields: {' -> '.join(self.dependency_graph.cycle)}"
+            )
+
+        # Order the auto-update fields so each one is updated after the auto-update fields it depends on.
+        update_order = [name for name in self.dependency_graph.topological_order() if name in auto_updated_fields]
+
+        self.field_names = tuple(fmt)
+        self.update_order = tuple(update_order)
+        self.writable_fields = tuple(name for name, field in fmt.items() if field.is_writable)
+        self.layout = Layout(fmt)
+
+    @staticmethod
+    def fingerprint(fmt: Dict[str, Field]):
+        """
+        Return a hashable fingerprint of a message definition. Definitions with the same fingerprint compile to the
+        same format: their fields have the same names, types, lengths, constant values and auto-update arguments,
+        in the same order. Auto-update functions and contexts are not part of the fingerprint because nothing in a
+        compiled format depends on them (only on the names of the arguments of the functions).
+
+        The fingerprint only holds strings, integers, tuples and None, so its repr is the same in every process.
+
+        :raises: InvalidFieldException if an item of the definition is not a Field.
+        """
+        items = []
+        for name, field in fmt.items():
+            if not isinstance(field, Field):
+                raise InvalidFieldException(f"cls_name: {name} must be a Field object.")
+            # Read the attributes directly since this is done for every definition each builder loads.
+            updater_args = field._updater_args if field._value_function is not None else None
+            items.append(
+                (name, type(field).__name__, field._bit_length, field._length_field, field._value, updater_args)
+            )
+        return tuple(items)
+
+    @staticmethod
+    def digest(fingerprint):
+        """Return a hexadecimal digest of a fingerprint that can be used as a key in files."""
+        return hashlib.sha256(repr(fingerprint).encode()).hexdigest()
+
+    @classmethod
+    def get(cls, cls_name, fmt: Dict[str, Field], cache=None):
+        """
+        Return the interned compiled format of a message definition. If no definition with the same fingerprint
+        has been compiled, the compiled format is loaded from the cache (a DefinitionCache) or compiled.
+
+        :raises: the exceptions raised by the CompiledFormat constructor.
+        """
+        key = CompiledFormat.fingerprint(fmt)
+        with cls._lock:
+            compiled = cls._interned.get(key)
+            if compiled is None:
+                digest = CompiledFormat.digest(key)
+                snapshot = cache.get(digest) if cache is not None else None
+                if snapshot is not None:
+                    compiled = cls.from_snapshot(snapshot)
+                else:
+                    compiled = cls(cls_name, fmt)
+                    if cache is not None:
+                        cache.put(digest, compiled.snapshot())
+                compiled.digest = digest
+                cls._interned[key] = compiled
+        return compiled
+
+    def snapshot(self):
+        """Return the compiled format as a dictionary that can be stored as JSON (see CompiledFormat.from_snapshot)."""
+        return {
+            "field_names": self.field_names,
+            "update_order": self.update_order,
+            "writable_fields": self.writable_fields,
+            "dependencies": self.dependency_graph.graph,
+            "layout": self.layout.snapshot(),
+        }
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        """Reconstruct a compiled format from the dictionary returned by CompiledFormat.snapshot without checking it."""
+        compiled = cls.__new__(cls)
+        compiled.dependency_graph = DependencyGraph()
+        for node, dependencies in snapshot["dependencies"].items():
+            compiled.dependency_graph.addNode(node)
+            for dependency in dependencies:
+                compiled.dependency_graph.addEdge(node, dependency)
+        compiled.field_names = tuple(snapshot["field_names"])
+        compiled.update_order = tuple(snapshot["update_order"])
+        compiled.writable_fields = tuple(snapshot["writable_fields"])
+        compiled.layout = Layout.from_snapshot(snapshot["layout"])
+        return compiled
+
+    def __repr__(self):
+        """Return a short string representation of the compiled format"""
+        return f"<{type(self).__name__} ({len(self.field_names)} fields)>"
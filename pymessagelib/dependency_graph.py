@@ -4,12 +4,12 @@ Created on Feb 24, 2021
 This module contains the DependencyGraph class which is used by each Message to model
 dependencies of auto-update fields.
 
-This code was adapted from https://www.geeksforgeeks.org/detect-cycle-in-a-graph/
-
 @author: smalb
 """
 
-from collections import defaultdict
+from collections import defaultdict, deque
+
+from pymessagelib._exceptions import CircularDependencyException
 
 
 class DependencyGraph:
@@ -20,62 +20,166 @@ class DependencyGraph:
     This is important because cycles in auto-update fields will result in unstable fields and/or
     infinite looping while updating. Fields that depend on each other need to be updated in the
     correct order to make sure they each end up with the correct values.
+
+    An edge from u to v means that u depends on v. The strongly connected components of the graph are found with an
+    iterative version of Tarjan's algorithm, so deep chains of dependencies don't hit the recursion limit. The
+    components, the cycle and the topological order are computed once and cached until the graph is modified, so
+    the graph must only be modified with addEdge and addNode.
     """
 
     def __init__(self):
         """Constructs an empty DependencyGraph. Each edge must be added individually."""
         self.graph = defaultdict(list)
-        self._cycle = None
+        self._analysis = None  # (strongly connected components dependencies first, cycle, topological order)
+        self._reverse = None  # maps nodes to the nodes that depend on them directly
+        self._dependents = {}  # caches the results of dependents
 
     def addEdge(self, u, v):
         """Add an edge from node u to node v"""
         self.graph[u].append(v)
         if not v in self.graph:
             self.graph[v] = []
+        self._invalidate()
 
-    # Returns true if graph is cyclic else false
-    def isCyclic(self):
-        """
-        Determine if there are any cycles in the graph. If there are return True. Else, return False.
+    def addNode(self, u):
+        """Add a node without any edges. Nothing happens if the node is already in the graph."""
+        if not u in self.graph:
+            self.graph[u] = []
+            self._invalidate()
 
-        If a cycle is detected, a list of the nodes in the cycle is stored in self._cycle
+    def _invalidate(self):
+        """Forget the results computed for the graph after it has been modified."""
+        self._analysis = None
+        self._reverse = None
+        self._dependents = {}
+
+    def _analyze(self):
+        """
+        Return the strongly connected components, a cycle and the topological order of the graph. They're computed
+        the first time and replaced all at once, so threads can read them without a lock.
         """
+        if self._analysis is not None:
+            return self._analysis
+        graph = self.graph
+        index = {}
+        low = {}
+        stack = []
+        on_stack = set()
+        components = []
+
+        for root in graph:
+            if root in index:
+                continue
+            index[root] = low[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            work = [(root, iter(graph[root]))]
+            while work:
+                node, neighbors = work[-1]
+                for neighbor in neighbors:
+                    if neighbor not in index:
+                        index[neighbor] = low[neighbor] = len(index)
+                        stack.append(neighbor)
+                        on_stack.add(neighbor)
+                        work.append((neighbor, iter(graph[neighbor])))
+                        break
+                    if neighbor in on_stack:
+                        low[node] = min(low[node], index[neighbor])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        low[parent] = min(low[parent], low[node])
+                    if low[node] == index[node]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.append(member)
+                            if member == node:
+                                break
+                        components.append(component)
+
+        # Tarjan's algorithm finds a component after every component it depends on.
+        cycle = None
+        for component in components:
+            if len(component) > 1 or component[0] in graph[component[0]]:
+                cycle = self._find_cycle(component, index)
+                break
+        order = None if cycle else [component[0] for component in components]
+        self._analysis = (components, cycle, order)
+        return self._analysis
+
+    def _find_cycle(self, component, index):
+        """Return the shortest cycle through the first node (in the order nodes were added) of a component."""
+        members = set(component)
+        start = min(component, key=index.__getitem__)
+        previous = {start: None}
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            for neighbor in self.graph[node]:
+                if neighbor == start:
+                    path = []
+                    while node is not None:
+                        path.append(node)
+                        node = previous[node]
+                    return path[::-1]
+                if neighbor in members and neighbor not in previous:
+                    previous[neighbor] = node
+                    queue.append(neighbor)
 
-        def isCyclicUtil(v, visited, recStack):
-            """Recursive portion of the cycle detection algorithm."""
-            assert v in visited
-            assert v in recStack
-
-            # Mark current node as visited and adds to recursion stack
-            visited[v] = True
-            recStack[v] = True
-
-            # Recur for all neighbors if any neighbor is visited and in recStack then graph is cyclic
-            for neighbor in self.graph[v]:
-                if not visited[neighbor]:
-                    if isCyclicUtil(neighbor, visited, recStack):
-                        self._cycle = [node for node in recStack]
-                        return True
-                elif recStack[neighbor]:
-                    return True
-
-            # The node needs to be popped from recursion stack before function ends
-            recStack[v] = False
-            return False
-
-        visited = {i: False for i in self.graph.keys()}
-        recStack = {i: False for i in self.graph.keys()}
-        for node in self.graph.keys():
-            if not visited[node]:
-                if isCyclicUtil(node, visited, recStack):
-                    return True
-        return False
+    def isCyclic(self):
+        """Determine if there are any cycles in the graph. If there are return True. Else, return False."""
+        return self.cycle is not None
 
     @property
     def cycle(self):
-        """If there is a cycle, return the list of nodes in the cycle."""
-        if self.isCyclic():
-            return self._cycle
+        """If there is a cycle, return the list of nodes in the cycle, in the order of the edges between them."""
+        return self._analyze()[1]
+
+    @property
+    def components(self):
+        """Return the strongly connected components of the graph as lists of nodes, dependencies first."""
+        return [list(component) for component in self._analyze()[0]]
+
+    def topological_order(self):
+        """
+        Return all nodes ordered so that every node comes after the nodes it depends on.
+
+        :raises: CircularDependencyException if the graph has a cycle.
+        """
+        components, cycle, order = self._analyze()
+        if cycle is not None:
+            raise CircularDependencyException(f"Detected cycle in dependency graph: {' -> '.join(map(str, cycle))}")
+        return list(order)
+
+    def dependents(self, node):
+        """
+        Return the nodes that depend on the node, directly or indirectly, in topological order. The node itself is
+        not included.
+
+        :raises: CircularDependencyException if the graph has a cycle.
+        """
+        dependents = self._dependents.get(node)
+        if dependents is None:
+            order = self.topological_order()
+            reverse = self._reverse
+            if reverse is None:
+                reverse = defaultdict(list)
+                for u, vs in self.graph.items():
+                    for v in vs:
+                        reverse[v].append(u)
+                self._reverse = reverse
+            found = set()
+            queue = deque([node])
+            while queue:
+                for dependent in reverse.get(queue.popleft(), ()):
+                    if dependent not in found:
+                        found.add(dependent)
+                        queue.append(dependent)
+            dependents = self._dependents[node] = tuple(n for n in order if n in found)
+        return dependents
 
     @property
     def num_vertices(self):
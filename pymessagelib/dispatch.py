@@ -0,0 +1,210 @@
+"""
+This module contains the DispatchIndex class which narrows down the message classes that some data could be
+decoded as without decoding it.
+
+Created on Oct 19, 2026
+
+@author: smalb
+"""
+
+from typing import Iterable
+
+
+class DispatchIndex:
+    """
+    A DispatchIndex maps the integer value of a frame to the message classes whose constant fields it matches.
+
+    Fixed-length message classes are grouped by their bit length. Within a group, the bits that are constant in
+    every class of the group (such as a shared `mid` field) are used as a key into a table of classes, so only the
+    classes with the right key are tested against their full constant masks. Classes with variable-length fields
+    are matched by the constant fields that precede their first variable-length field, which is only possible
+    when the bit length of the data is known.
+
+    The index also finds the pairs of classes that are ambiguous, meaning that their constant fields don't rule out
+    some data being a message of both classes (see DispatchIndex.may_overlap). The classes each class is ambiguous
+    with (its partners) are found once per class, so a message builder only has to decode the partners of the
+    first class that matches to detect ambiguous data. Finding all pairs takes time quadratic in the number of
+    classes, so the partners of a class are found the first time they're needed, unless the pairs are given.
+
+    Classes whose constant fields match some data can still be ruled out before decoding it if the data doesn't
+    match the constant fields of the contexts their tagged unions select (see DispatchIndex.rules_out).
+    """
+
+    def __init__(self, message_classes: Iterable, pairs=None):
+        """
+        Constructs the index for the message classes. Candidates are always returned in this order. If the
+        ambiguous pairs of the classes are known (e.g. from a DefinitionCache), they can be given as pairs of
+        positions of the classes so they aren't found again.
+        """
+        self.message_classes = tuple(message_classes)
+        self.variable_classes = tuple(cls for cls in self.message_classes if not cls.layout.is_fixed)
+        self._groups = {}  # maps bit lengths to (key mask, {key: [message classes]})
+        self._prefixes = {cls: DispatchIndex.constant_prefix(cls) for cls in self.variable_classes}
+        self._overlaps = {}  # caches the results of may_overlap
+        self._partners = {}  # maps message classes to the frozenset of classes they may overlap with
+        self._union_checks = {}  # maps message classes to the constant fields of their tagged-union contexts
+        if pairs is not None:
+            partners = {msg_cls: set() for msg_cls in self.message_classes}
+            for i, j in pairs:
+                cls_a, cls_b = self.message_classes[i], self.message_classes[j]
+                partners[cls_a].add(cls_b)
+                partners[cls_b].add(cls_a)
+            self._partners = {msg_cls: frozenset(others) for msg_cls, others in partners.items()}
+
+        grouped = {}
+        for msg_cls in self.message_classes:
+            if msg_cls.layout.is_fixed:
+                grouped.setdefault(msg_cls.bit_length, []).append(msg_cls)
+        for bit_length, classes in grouped.items():
+            key_mask = -1
+            for msg_cls in classes:
+                key_mask &= msg_cls.layout.constant_mask
+            table = {}
+            for msg_cls in classes:
+                table.setdefault(msg_cls.layout.constant_value & key_mask, []).append(msg_cls)
+            self._groups[bit_length] = (key_mask, table)
+
+    @staticmethod
+    def constant_prefix(msg_cls):
+        """
+        Return the constant fields that precede the first variable-length field of a message class as a tuple of
+        (bit length of the prefix, mask, value), with the prefix laid out like a fixed-length message.
+        """
+        return msg_cls.layout.constant_prefix
+
+    @property
+    def bit_lengths(self):
+        """Return the bit lengths of the fixed-length message classes, longest first."""
+        return sorted(self._groups, reverse=True)
+
+    def match(self, value, bit_length):
+        """Return the fixed-length message classes of the bit length whose constant fields match the value."""
+        group = self._groups.get(bit_length)
+        if group is None:
+            return []
+        key_mask, table = group
+        return [
+            msg_cls
+            for msg_cls in table.get(value & key_mask, ())
+            if value & msg_cls.layout.constant_mask == msg_cls.layout.constant_value
+        ]
+
+    def candidates(self, value, data_length=None):
+        """
+        Return the message classes that a message with the integer value could be, in the order the classes were
+        given. These are the fixed-length classes the value fits in whose constant fields match, and the
+        variable-length classes whose constant prefix matches.
+
+        The data length is the number of bits in the data the value was read from (e.g. 4 per hexadecimal digit).
+        If it's None, the data is an integer, which can't be decoded as a variable-length message.
+        """
+        matches = set()
+        for bit_length in self._groups:
+            if not value >> bit_length:
+                matches.update(self.match(value, bit_length))
+        if data_length is not None:
+            for msg_cls, (prefix_length, mask, prefix_value) in self._prefixes.items():
+                if data_length >= prefix_length and (value >> (data_length - prefix_length)) & mask == prefix_value:
+                    matches.add(msg_cls)
+        return [msg_cls for msg_cls in self.message_classes if msg_cls in matches]
+
+    def may_overlap(self, cls_a, cls_b):
+        """
+        Return True if the constant fields of the message classes don't rule out some data being a message of both
+        classes. Classes that don't overlap can never both be decoded from the same data.
+
+        Fixed-length messages can be decoded from shorter data (the missing bits are leading zeros), so a shorter
+        class overlaps a longer one only if the longer class has no non-zero constant bits above the length of the
+        shorter one. Variable-length messages are compared by their constant prefixes, which are aligned with the
+        start of the data. A fixed-length and a variable-length class are always assumed to overlap.
+        """
+        if cls_a is cls_b:
+            return True
+        key = (cls_a, cls_b) if id(cls_a) < id(cls_b) else (cls_b, cls_a)
+        result = self._overlaps.get(key)
+        if result is None:
+            result = self._overlaps[key] = DispatchIndex._constants_overlap(*key)
+        return result
+
+    @staticmethod
+    def _constants_overlap(cls_a, cls_b):
+        """Return True if the constant fields of the two message classes are compatible (see may_overlap)."""
+        fixed_a, fixed_b = cls_a.layout.is_fixed, cls_b.layout.is_fixed
+        if fixed_a != fixed_b:
+            return True
+        if fixed_a:
+            short, long = sorted((cls_a, cls_b), key=lambda cls: cls.bit_length)
+            # Bits above the shorter message are zero in any data that is decoded as both.
+            mask_short = short.layout.constant_mask | (((1 << long.bit_length) - 1) ^ ((1 << short.bit_length) - 1))
+            conflicts = (
+                (short.layout.constant_value ^ long.layout.constant_value) & mask_short & long.layout.constant_mask
+            )
+            return not conflicts
+        length_a, mask_a, value_a = DispatchIndex.constant_prefix(cls_a)
+        length_b, mask_b, value_b = DispatchIndex.constant_prefix(cls_b)
+        # Align the shorter prefix with the start of the longer one.
+        if length_a < length_b:
+            length_a, mask_a, value_a, length_b, mask_b, value_b = length_b, mask_b, value_b, length_a, mask_a, value_a
+        shift = length_a - length_b
+        return not ((value_a ^ (value_b << shift)) & mask_a & (mask_b << shift))
+
+    def partners(self, msg_cls):
+        """Return the frozenset of the other message classes that may overlap with a message class."""
+        partners = self._partners.get(msg_cls)
+        if partners is None:
+            partners = self._partners[msg_cls] = frozenset(
+                other for other in self.message_classes if other is not msg_cls and self.may_overlap(msg_cls, other)
+            )
+        return partners
+
+    def ambiguous_pairs(self):
+        """Return every pair of message classes that may overlap, in the order the classes were given."""
+        return [
+            (cls_a, cls_b)
+            for i, cls_a in enumerate(self.message_classes)
+            for cls_b in self.message_classes[i + 1 :]
+            if cls_b in self.partners(cls_a)
+        ]
+
+    def rules_out(self, msg_cls, value):
+        """
+        Return True if a fixed-length message class can't be decoded from the integer value because the value
+        doesn't match the constant fields of a context selected by one of its tagged unions. Only the contexts
+        selected directly by the class are checked, so a value that isn't ruled out may still fail to decode.
+        """
+        checks = self._union_checks.get(msg_cls)
+        if checks is None:
+            checks = self._union_checks[msg_cls] = DispatchIndex._compile_union_checks(msg_cls)
+        for discriminator_shift, discriminator_mask, field_shift, constants, default in checks:
+            mask, constant_value = constants.get((value >> discriminator_shift) & discriminator_mask, default)
+            if (value >> field_shift) & mask != constant_value:
+                return True
+        return False
+
+    @staticmethod
+    def _compile_union_checks(msg_cls):
+        """
+        Return a tuple of (discriminator shift, discriminator mask, field shift, {key: (mask, value)}, default
+        (mask, value)) for each tagged union of a fixed-length message class whose contexts have constant fields.
+        """
+        layout = msg_cls.layout
+        if not layout.is_fixed:
+            return ()
+        checks = []
+        for name, (discriminator, table, default) in getattr(msg_cls, "unions", {}).items():
+            constants = {key: DispatchIndex._context_constants(ctx) for key, ctx in table.items()}
+            default = DispatchIndex._context_constants(default)
+            if default[0] or any(mask for mask, _ in constants.values()):
+                checks.append((*layout.spans[discriminator], layout.spans[name][0], constants, default))
+        return tuple(checks)
+
+    @staticmethod
+    def _context_constants(context):
+        """Return the (mask, value) of the constant fields of a context, or (0, 0) if it has none it can check."""
+        if context is None or not context.layout.is_fixed:
+            return (0, 0)
+        return (context.layout.constant_mask, context.layout.constant_value)
+
+    def __repr__(self):
+        """Return a short string representation of the index"""
+        return f"<{type(self).__name__} ({len(self.message_classes)} message classes)>"
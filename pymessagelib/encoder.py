@@ -0,0 +1,53 @@
+"""
+This module contains functions for encoding many messages into a single preallocated buffer.
+
+Each message is written in the same form as bytes(message): big-endian, padded with zero bits at the most
+significant end to a whole number of bytes. Messages are written back-to-back.
+
+Created on Oct 19, 2026
+
+@author: smalb
+"""
+
+from typing import Iterable
+
+from pymessagelib.message import Message
+
+
+def encode_many(messages: Iterable[Message], out=None, offset=0):
+    """
+    Writes the messages into the buffer `out` at successive offsets starting at `offset` and returns a memoryview
+    of the bytes that were written. If no buffer is given, a single bytearray large enough for all messages is
+    allocated.
+
+    :raises: ValueError if the messages don't fit in the buffer.
+    """
+    if out is None:
+        messages = list(messages)
+        out = bytearray(offset + sum((len(msg) + 7) // 8 for msg in messages))
+
+    position = offset
+    for msg in messages:
+        position += msg.pack_into(out, position)
+    return memoryview(out)[offset:position]
+
+
+def iter_encode(messages: Iterable[Message], out):
+    """
+    Writes the messages into the reusable buffer `out` and yields a memoryview of the filled part of the buffer
+    every time it can't hold the next message (and once more for the remaining messages at the end). The buffer is
+    overwritten from the start after each yield, so each view must be consumed (e.g. sent) before the next one is
+    requested.
+
+    :raises: ValueError if a single message doesn't fit in the buffer.
+    """
+    view = memoryview(out)
+    position = 0
+    for msg in messages:
+        size = (len(msg) + 7) // 8
+        if position + size > len(view) and position > 0:
+            yield view[:position]
+            position = 0
+        position += msg.pack_into(view, position)
+    if position > 0:
+        yield view[:position]
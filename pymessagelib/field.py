@@ -11,6 +11,7 @@ import copy
 import math
 import inspect
 import operator
+import weakref
 from abc import ABC
 from enum import Enum
 
@@ -22,6 +23,39 @@ from pymessagelib._exceptions import (
 )
 from pickle import FALSE
 
+# Maps value prefixes to the base of the numeric part. Used on hot paths instead of Field.bases().
+_PREFIX_BASES = {"b": 2, "o": 8, "d": 10, "x": 16}
+
+
+def auto_update(takes):
+    """
+    Decorator that declares the type of the arguments an auto-update function takes. By default, auto-update
+    functions are given the Field objects they depend on. Functions that only need the values of the fields can
+    instead take:
+
+        - int: The value of each field as an integer.
+        - bytes: The value of each field as big-endian bytes, padded at the most significant end.
+        - str: The raw bit span of each field as a string of binary digits (without a format prefix).
+
+    Arguments can also be declared individually with annotations (e.g. `def calc(addr: int, data: bytes)`).
+    Auto-update functions may return an int instead of a formatted value. For example:
+
+    @auto_update(takes=int)
+    def calc_or(addr, data):
+        return addr | data
+
+    :raises: InvalidFormatException if the argument type is not supported.
+    """
+    if takes not in UPDATER_ARG_KINDS.values():
+        raise InvalidFormatException(f"Auto-update functions cannot take arguments of type {takes}.")
+
+    def decorator(func):
+        """Record the argument type on the function."""
+        func._takes = takes
+        return func
+
+    return decorator
+
 
 class Field(ABC):
     """
@@ -45,20 +79,35 @@ class Field(ABC):
         Dec = 10
         Hex = 16
 
+    _read_only = False  # True for the fields returned by frozen messages, which cannot be modified
+
     def __init__(self, length=1, value=None, fmt=None, context=None):
-        """Constructs a Field object"""
+        """
+        Constructs a Field object
 
-        if length <= 1 and type(self).__name__.endswith("s"):
-            raise InvalidFormatException(f"Length for plural field type {type(self).__name__} must be greater than 1.")
-        elif length != 1 and not type(self).__name__.endswith("s"):
-            raise InvalidFormatException(f"Length for singular field type {type(self).__name__} must be 1.")
+        In message definitions, the context may be a TaggedUnion. The context of the field will then be
+        selected automatically from the value of the union's discriminator field.
+
+        The length can also be the name of a field that precedes this one in the message definition. The field
+        is then variable-length and the number of units it contains is the value of the named field.
+        """
+
+        if isinstance(length, str):
+            if value is not None:
+                raise InvalidFormatException(f"Variable-length field type {type(self).__name__} must be writable.")
+            self._length_field = length
+            length = 0
+        else:
+            self._length_field = None
+            self._check_length(length)
 
         self._name = ""
         self._parent_message = None
         self._nested_msg = None
-        self._context = context
+        self._union = context if isinstance(context, TaggedUnion) else None
+        self._context = None if self._union else context
         self._unit_length = length
-        self._bit_length = length * type(self).bits_per_unit
+        self._bit_length = length * self.bits_per_unit
         self._format = None
         self._value_function = None
         self._value = None
@@ -79,13 +128,32 @@ class Field(ABC):
             self._format = Field.Format.Bin if "Bit" in type(self).__name__ else Field.Format.Hex
 
         # Determine if the value is a function or an actual value.
+        self._updater_args = ()
+        self._updater_arg_kinds = ()
         if inspect.isfunction(value):
             self._value_function = value
+            spec = inspect.getfullargspec(value)
+            default_kind = getattr(value, "_takes", Field)
+            self._updater_args = tuple(spec.args)
+            self._updater_arg_kinds = tuple(
+                UPDATER_ARG_KINDS.get(spec.annotations.get(arg), default_kind) for arg in spec.args
+            )
         elif value is not None:
             if not self.value_is_valid(value):
                 raise InvalidFieldDataException(f"The value {value} is not valid for field {self}")
             self._value = self.render(value=value, fmt=Field.Format.Bin, pad_to_length=self._bit_length)
 
+    def _check_length(self, length):
+        """
+        Verify the length is valid for this type of field.
+
+        :raises: InvalidFormatException if the length doesn't agree with the singular or plural field type.
+        """
+        if length <= 1 and type(self).__name__.endswith("s"):
+            raise InvalidFormatException(f"Length for plural field type {type(self).__name__} must be greater than 1.")
+        elif length != 1 and not type(self).__name__.endswith("s"):
+            raise InvalidFormatException(f"Length for singular field type {type(self).__name__} must be 1.")
+
     def render(self, value=None, fmt=None, pad_to_length=0) -> str:
         """
         Renders the field in the format specified.
@@ -135,6 +203,10 @@ class Field(ABC):
                 if chars_left_over:
                     return False
 
+            if self.is_variable_length:
+                bit_length = len(value) if isinstance(value, Message) else Field.value_bit_length(value)
+                return bit_length > 0 and bit_length % self.bits_per_unit == 0
+
             bin_value = self.render(value=value, fmt=Field.Format.Bin, pad_to_length=self._bit_length)[1:]
             if len(bin_value) == self._bit_length:
                 return True
@@ -151,11 +223,52 @@ class Field(ABC):
         """Returns the name of the field. If no name is stored, an empty string will be returned."""
         return self._name
 
+    @property
+    def _parent_message(self):
+        """
+        Return the message this field belongs to. None if it doesn't belong to a message.
+
+        Only a weak reference to the message is kept so that messages and their fields don't form reference cycles,
+        and are freed as soon as they are no longer used.
+        """
+        ref = self._parent_message_ref
+        return None if ref is None else ref()
+
+    @_parent_message.setter
+    def _parent_message(self, msg):
+        """Sets the message this field belongs to."""
+        self._parent_message_ref = None if msg is None else weakref.ref(msg)
+
+    @property
+    def length_field(self):
+        """Return the name of the field holding the number of units in this field. None if it has a fixed length."""
+        return self._length_field
+
+    @property
+    def is_variable_length(self):
+        """Return True if the length of the field is determined by another field and False otherwise"""
+        return self._length_field is not None
+
+    @property
+    def union(self):
+        """Return the TaggedUnion used to select the context of this field. None if there isn't one."""
+        return self._union
+
     @property
     def value_updater(self):
         """Return the function to be used for auto-updating the field. None if not an auto-update field."""
         return self._value_function
 
+    @property
+    def updater_args(self):
+        """Return the names of the fields the auto-update function depends on. Empty if not an auto-update field."""
+        return self._updater_args
+
+    @property
+    def updater_arg_kinds(self):
+        """Return the type each argument of the auto-update function is given as (Field, int, bytes or str)."""
+        return self._updater_arg_kinds
+
     @property
     def is_readable(self):
         """Return True if the field is readable and False otherwise"""
@@ -184,23 +297,38 @@ class Field(ABC):
         Sets the value of the field. If it's a nested field, a Message can be the value.
 
         :raises: InvalidFieldDataException if the value is too big to fit in the field.
+        :raises: AttributeError if the field belongs to a frozen message.
         """
         from pymessagelib.message import Message
 
+        self._check_not_read_only()
+        written = value
         is_msg = False
         if isinstance(value, Message):
             is_msg = True
             context = type(value)
-            value = value.render()
+            value = value.render(fmt=Field.Format.Bin)
         if self.value_is_valid(value):
+            if self.is_variable_length:
+                self._bit_length = Field.value_bit_length(value)
+                self._unit_length = self._bit_length // self.bits_per_unit
+                value = Field.render_value(value=value, fmt=Field.Format.Bin, pad_to_length=self._bit_length)
             self._value = value
             if is_msg:
                 self.context = context
             if self.context:
                 self._nested_msg.update(value)
+            self._written(written)
         else:
             raise InvalidFieldDataException(f"{value} is not a valid value for this field")
 
+    def _written(self, value):
+        """Tell the message this field belongs to that a value was written to the field, if the field is writable."""
+        if self._access["Write"] and self._parent_message_ref is not None:
+            msg = self._parent_message_ref()
+            if msg is not None:
+                msg._field_written(self._name, value)
+
     @property
     def context(self):
         """If this is a nested field, return the class of the inner Message."""
@@ -211,12 +339,16 @@ class Field(ABC):
         """Sets the context of the field."""
         from pymessagelib.message import Message
 
+        self._check_not_read_only()
         assert context is None or Message in inspect.getmro(context)
 
         if context is None:
             self._context = None
             self._nested_msg = None
         else:
+            # The nested message holds the most recent data if there already is one.
+            if self._nested_msg is not None:
+                self._value = self._nested_msg.render(fmt=Field.Format.Bin)
             try:
                 msg = context.from_data(self._value)
             except InvalidDataFormatException:
@@ -227,6 +359,14 @@ class Field(ABC):
                 self._context = context
                 self._nested_msg = msg
 
+    def _nested_updated(self, msg):
+        """
+        Called when the nested message of this field has been modified. Updates the auto-update fields of the
+        parent message that depend on this field.
+        """
+        if self._parent_message is not None:
+            self._parent_message.update_fields(self._name)
+
     def __repr__(self):
         """If the field has a value, render it in its default format. Else, return a summary of empty field"""
         if self.value:
@@ -243,7 +383,38 @@ class Field(ABC):
 
     def __int__(self):
         """Converts the field to an integer"""
-        return int(self.render(fmt=Field.Format.Bin)[1:], 2)
+        if self._nested_msg is not None:
+            return int(self._nested_msg)
+        return int(self._value[1:], _PREFIX_BASES[self._value[0]])
+
+    def _updater_arg(self, kind):
+        """Return the value of this field as the given type of auto-update function argument."""
+        if kind is Field:
+            return self
+        if kind is int:
+            return int(self)
+        if kind is bytes:
+            return bytes(self)
+        return format(int(self), f"0{self._bit_length}b")
+
+    def _check_not_read_only(self):
+        """Raises an AttributeError if the field belongs to a frozen message."""
+        if self._read_only:
+            raise AttributeError(f"Cannot modify field '{self._name}' of a frozen message.")
+
+    def _set_int(self, value):
+        """
+        Sets the value of the field from an integer without parsing a formatted value.
+
+        :raises: InvalidFieldDataException if the value doesn't fit in the field.
+        """
+        self._check_not_read_only()
+        if not 0 <= value < 1 << self._bit_length:
+            raise InvalidFieldDataException(f"{value} is not a valid value for this field")
+        if self.context or self.is_variable_length:
+            self.value = f"d{value}"
+        else:
+            self._value = f"b{value:0{self._bit_length}b}"
 
     def __index__(self):
         """Converts the field to a hexadecimal string"""
@@ -299,8 +470,9 @@ class Field(ABC):
         """Return True if self is less than or equal to other. False otherwise"""
         return self < other or self == other
 
-    #     def __bytes__(self):
-    #         pass
+    def __bytes__(self):
+        """Converts the field to big-endian bytes, padded with zero bits at the most significant end."""
+        return int(self).to_bytes((len(self) + 7) // 8, "big")
 
     ###############################################
     #  --  Bitwise Operation Special Methods  --  #
@@ -462,6 +634,7 @@ class Field(ABC):
         Set specific bits in the field
 
         Raises an InvalidFieldDataException if the field is not writable
+        Raises an AttributeError if the field belongs to a frozen message
         Raises an InvalidDataFormatException if the number of bits does not match the start and stop indecies.
 
         Slice Criteria:
@@ -478,6 +651,7 @@ class Field(ABC):
         - The index corresponds to the bit-position starting from the LSB (on the right)
         """
 
+        self._check_not_read_only()
         if not self.is_writable:
             raise InvalidFieldDataException(f"This field is not writable")
 
@@ -563,6 +737,17 @@ class Field(ABC):
         """Returns the format of a value"""
         return Field.bases()[value[0]]
 
+    @staticmethod
+    def value_bit_length(value):
+        """
+        Returns the number of bits a formatted value spans. Leading zeros count towards the length of binary, octal
+        and hexadecimal values. Decimal values span the minimum number of bits needed to hold them.
+        """
+        fmt = Field.get_format(value)
+        if fmt is Field.Format.Dec:
+            return int(value[1:]).bit_length()
+        return len(value[1:]) * int(math.log2(fmt.value))
+
     @staticmethod
     def get_valid_chars(fmt):
         if fmt is Field.Format.Hex:
@@ -645,3 +830,200 @@ class QWords(Field):
     """1 Q-Word = 64 Bits"""
 
     bits_per_unit = 64
+
+
+class Array(Field):
+    """
+    An Array is a field made up of a number of consecutive records that all have the layout of the same
+    Message class. All records are stored in the single bit range of the field and individual records are
+    located by their stride (the bit length of the element class). For example:
+
+    msg_defs = {
+        "CHANNEL_REPORT": {
+            "mid": Nibbles(4, value="x0020"),
+            "channels": Array(CHANNEL_STATUS, count=64),
+        }
+    }
+
+    Indexing an Array returns a message of the element type (slicing returns a list of them). Writing to a
+    field of a record writes the record back into the array, so `msg.channels[3].enabled = "b1"` works just
+    like writing to a nested field. Unlike other fields, indexes and slices address records, not bits.
+    """
+
+    def __init__(self, element, count, value=None, fmt=None):
+        """Constructs an Array of `count` records with the layout of the `element` Message class."""
+        from pymessagelib.message import Message
+
+        if not (isinstance(element, type) and issubclass(element, Message)) or len(element) <= 0:
+            raise InvalidFormatException(f"The element of an Array must be a Message class, not {element}.")
+        self._element = element
+        self.bits_per_unit = len(element)
+        super().__init__(length=count, value=value, fmt=fmt)
+
+    def _check_length(self, length):
+        """
+        Verify the number of records is valid.
+
+        :raises: InvalidFormatException if there isn't at least one record.
+        """
+        if not isinstance(length, int) or length < 1:
+            raise InvalidFormatException(f"An Array must contain at least 1 record, not {length}.")
+
+    @property
+    def element(self):
+        """Return the Message class of the records in the array."""
+        return self._element
+
+    @property
+    def count(self):
+        """Return the number of records in the array."""
+        return self._unit_length
+
+    @property
+    def stride(self):
+        """Return the number of bits in each record."""
+        return self.bits_per_unit
+
+    def _bits(self):
+        """Return the value of the whole array as a string of binary digits without a format prefix."""
+        return Field.render_value(value=self._value, fmt=Field.Format.Bin, pad_to_length=self._bit_length)[1:]
+
+    def _record(self, bits, index):
+        """Construct the record at the given index from the binary digits of the array."""
+        start = index * self.stride
+        msg = self._element.from_data(f"b{bits[start:start + self.stride]}")
+        msg._parent_field = self
+        msg._array_index = index
+        return msg
+
+    def __getitem__(self, subscript):
+        """Return the record at an index, or a list of records if a slice is given."""
+        bits = self._bits()
+        if isinstance(subscript, slice):
+            return [self._record(bits, i) for i in range(*subscript.indices(self.count))]
+        if subscript < 0:
+            subscript += self.count
+        if not 0 <= subscript < self.count:
+            raise IndexError(f"Record index {subscript} is out of range for an Array of {self.count} records.")
+        return self._record(bits, subscript)
+
+    def __setitem__(self, index, value):
+        """
+        Overwrite the record at an index with a message of the element type or a formatted value.
+
+        :raises: InvalidFieldDataException if the array isn't writable or the value doesn't fit in a record.
+        :raises: AttributeError if the array belongs to a frozen message.
+        """
+        from pymessagelib.message import Message
+
+        self._check_not_read_only()
+        if not self.is_writable:
+            raise InvalidFieldDataException(f"This field is not writable")
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(f"Record index {index} is out of range for an Array of {self.count} records.")
+        if isinstance(value, Message):
+            if type(value) is not self._element:
+                raise InvalidFieldDataException(f"Records of this array must be {self._element.__name__} messages")
+            value = value.render(fmt=Field.Format.Bin)
+        try:
+            record_bits = Field.render_value(
+                value=value, fmt=Field.Format.Bin, pad_to_length=self.stride, check_length=True
+            )[1:]
+        except (InvalidDataFormatException, KeyError, ValueError, IndexError, TypeError):
+            raise InvalidFieldDataException(f"{value} is not a valid value for a record of this field")
+        if len(record_bits) != self.stride:
+            raise InvalidFieldDataException(f"{value} is not a valid value for a record of this field")
+
+        bits = self._bits()
+        start = index * self.stride
+        self._value = f"b{bits[:start]}{record_bits}{bits[start + self.stride:]}"
+        self._written(self._value)
+        if self._parent_message is not None:
+            self._parent_message.update_fields(self._name)
+
+    def __iter__(self):
+        """Iterate over the records of the array."""
+        bits = self._bits()
+        for i in range(self.count):
+            yield self._record(bits, i)
+
+    def _nested_updated(self, msg):
+        """Write a record that was modified back into the array before propagating the update."""
+        self[msg._array_index] = msg
+
+    def column(self, name, fmt=None):
+        """
+        Return the value of the named field from every record. Values are integers unless a format is given,
+        in which case they are rendered as formatted strings.
+        """
+        offset = 0
+        for field_name, field in self._element.format.items():
+            if field_name == name:
+                break
+            offset += len(field)
+        else:
+            raise KeyError(f"'{name}' is not a field of {self._element.__name__}")
+
+        length = len(self._element.format[name])
+        bits = self._bits()
+        values = [int(bits[start : start + length], 2) for start in range(offset, self._bit_length, self.stride)]
+        if fmt is None:
+            return values
+        return [Field.render_value(value=f"d{value}", fmt=fmt, pad_to_length=0) for value in values]
+
+
+# Maps the supported auto-update argument types (and their names, for string annotations) to themselves.
+UPDATER_ARG_KINDS = {kind: kind for kind in (Field, int, bytes, str)}
+UPDATER_ARG_KINDS.update({kind.__name__: kind for kind in (Field, int, bytes, str)})
+
+
+class TaggedUnion:
+    """
+    A TaggedUnion can be given as the context of a field in a message definition. It maps values of
+    another field in the same message (the discriminator) to the context that should be used for the
+    field. For example:
+
+    msg_defs = {
+        "REGISTER_ACCESS": {
+            "mid": Nibbles(4),
+            "data": Bytes(4, context=TaggedUnion("mid", {"x0016": OUTPUTS, "x0017": "INPUTS"})),
+        }
+    }
+
+    Contexts can be given as Message classes or as names of messages loaded into the same MessageBuilder.
+    When the MessageBuilder generates the message class, the mapping is compiled into a dictionary keyed by
+    integer values so the context can be looked up whenever the discriminator changes (including when a
+    message is constructed from data). If the discriminator value is not in the mapping, the default context
+    is used.
+    """
+
+    def __init__(self, discriminator, contexts, default=None):
+        """Constructs a TaggedUnion from a discriminator field name and a mapping of values to contexts."""
+        self.discriminator = discriminator
+        self.contexts = dict(contexts)
+        self.default = default
+
+    def compile(self, resolve):
+        """
+        Return a tuple of (discriminator, table, default) where the table maps integer discriminator values
+        to context classes. The resolve function is used to convert each context to a Message class.
+
+        :raises: InvalidDataFormatException if any of the discriminator values is not correctly formatted.
+        """
+        table = {}
+        for value, context in self.contexts.items():
+            if not isinstance(value, str) or not value or value[0] not in Field.bases():
+                raise InvalidDataFormatException(f"Discriminator value '{value}' is not correctly formatted.")
+            try:
+                key = int(value[1:], Field.get_format(value).value)
+            except ValueError:
+                raise InvalidDataFormatException(f"Discriminator value '{value}' is not correctly formatted.")
+            table[key] = resolve(context)
+        default = resolve(self.default) if self.default is not None else None
+        return self.discriminator, table, default
+
+    def __repr__(self):
+        """Return a short string representation of the union"""
+        return f"<TaggedUnion on '{self.discriminator}': {self.contexts}>"
@@ -0,0 +1,213 @@
+"""
+This module contains the FrozenMessage class, which is the base class of the read-only siblings of generated
+message classes.
+
+Created on Oct 19, 2026
+
+@author: smalb
+"""
+
+import math
+from copy import copy
+
+from pymessagelib.field import Field
+from pymessagelib._exceptions import InvalidDataFormatException, InvalidFormatException, AutoUpdateMismatchException
+
+
+class FrozenMessage:
+    """
+    A FrozenMessage is an immutable, hashable view of a decoded message. It only holds the integer value of the
+    message and a cache of the fields that have been read, so it is much smaller and faster to decode than a
+    Message. Frozen messages are meant for received traffic that is only inspected and never modified. For
+    example:
+
+    msg = WRITE_REGISTER_REQUEST.from_data("x0016000860000001800000FF", frozen=True)
+    msg.addr  # -> Field with value x60000001
+    msg.addr = "x60000002"  # -> AttributeError
+    msg.addr.value = "x60000002"  # -> AttributeError
+
+    Every message class has a frozen sibling class (see Message.frozen_class) with a getter for each field of the
+    message. Fields are only constructed the first time they are read and are read-only. Nested fields are returned
+    as frozen messages of the field's context. As with Message.from_data, their data is checked against the context
+    (including contexts selected by tagged unions) when the message is decoded.
+
+    Only messages without variable-length fields can be frozen.
+    """
+
+    __slots__ = ("_value", "_cache")
+
+    message_class = None  # the Message subclass this class is the frozen sibling of
+    _nested_fields = ()  # the names of the fields that have a context or a tagged union
+
+    def __init__(self, value: int):
+        """Constructs a frozen message from the integer value of the entire message. The value is not checked."""
+        object.__setattr__(self, "_value", value)
+        object.__setattr__(self, "_cache", None)
+
+    @classmethod
+    def build(cls, msg_cls):
+        """Generate the frozen sibling class of a message class."""
+        layout = msg_cls.layout
+        if not layout.is_fixed:
+            raise InvalidFormatException(f"Variable-length message {msg_cls.__name__} cannot be frozen.")
+
+        namespace = {
+            "__slots__": (),
+            "__doc__": f"Read-only version of the {msg_cls.__name__} message.",
+            "message_class": msg_cls,
+            "_nested_fields": tuple(
+                name for name, field in msg_cls.format.items() if field.context is not None or name in msg_cls.unions
+            ),
+        }
+        for name in msg_cls.format:
+            namespace[name] = property(FrozenMessage._create_getter(name))
+        return type(f"Frozen{msg_cls.__name__}", (cls,), namespace)
+
+    @staticmethod
+    def _create_getter(name):
+        """Used for dynamically creating getters for the fields of frozen classes."""
+
+        def get_field(self):
+            """
+            Return a read-only copy of the field holding its part of the message, or a frozen message if the field
+            is nested. The value is constructed the first time the field is read and then cached.
+            """
+            cache = self._cache
+            if cache is None:
+                cache = {}
+                object.__setattr__(self, "_cache", cache)
+            try:
+                return cache[name]
+            except KeyError:
+                value = cache[name] = self._materialize(name)
+                return value
+
+        return get_field
+
+    def _materialize(self, name):
+        """Construct the value returned by the getter of the named field."""
+        msg_cls = self.message_class
+        field = msg_cls.format[name]
+        value = msg_cls.layout.extract(self._value, name)
+
+        context = field.context
+        if name in msg_cls.unions:
+            discriminator, table, default = msg_cls.unions[name]
+            context = table.get(msg_cls.layout.extract(self._value, discriminator), default)
+        if context is not None:
+            return context.from_data(value, frozen=True)
+
+        field = copy(field)
+        field._value = f"b{value:0{len(field)}b}"
+        field._read_only = True
+        return field
+
+    @classmethod
+    def from_data(cls, data, verify=False):
+        """
+        Constructs a frozen message from data in any of the forms accepted by Message.from_data. As with
+        Message.from_data, constant fields and the data of nested fields are checked and auto-update fields are
+        recalculated.
+
+        :raises: InvalidDataFormatException if the data does not have the format of the message or the data of a
+            nested field is not compatible with its context
+        :raises: AutoUpdateMismatchException if verify is True and the data has incorrect auto-update values.
+        :raises: InvalidFieldDataException if an auto-update function returns a value that does not fit in its field.
+        """
+        msg_cls = cls.message_class
+        value = msg_cls._frame_value(data)
+        layout = msg_cls.layout
+        if value & layout.constant_mask != layout.constant_value:
+            raise InvalidDataFormatException(
+                f"The data '{data}' does not match the constant fields of {msg_cls.__name__}."
+            )
+
+        if msg_cls.update_order:
+            values = layout.extract_all(value)
+            received = {name: values[name] for name in msg_cls.update_order}
+            msg_cls._compute_auto_fields(values)
+            mismatches = {}
+            for name, received_value in received.items():
+                if received_value != values[name]:
+                    mismatches[name] = (received_value, values[name])
+                    shift, mask = layout.spans[name]
+                    value = value & ~(mask << shift) | values[name] << shift
+            if verify and mismatches:
+                raise AutoUpdateMismatchException(
+                    f"The data '{data}' has incorrect values for the auto-update fields {', '.join(mismatches)}.",
+                    mismatches,
+                )
+
+        msg = cls(value)
+        if cls._nested_fields:
+            # The nested messages are decoded now so their data is checked, and cached for the getters.
+            object.__setattr__(msg, "_cache", {name: msg._materialize(name) for name in cls._nested_fields})
+        return msg
+
+    @property
+    def context(self):
+        """Return the (mutable) message class of this frozen message."""
+        return self.message_class
+
+    def thaw(self):
+        """Return a new mutable message with the same value."""
+        return self.message_class.from_data(self._value)
+
+    def __setattr__(self, name, value):
+        """Frozen messages cannot be modified."""
+        raise AttributeError(f"Cannot set '{name}' of frozen message {self!r}.")
+
+    def __delattr__(self, name):
+        """Frozen messages cannot be modified."""
+        raise AttributeError(f"Cannot delete '{name}' of frozen message {self!r}.")
+
+    def render(self, fmt=Field.Format.Hex, pad_to_length=0) -> str:
+        """Renders the entire message in the same way as Message.render."""
+        pad_to_length = pad_to_length if pad_to_length > 0 else math.ceil(len(self) / math.log2(fmt.value))
+        return Field.render_value(value=f"b{self._value:b}", fmt=fmt, pad_to_length=pad_to_length)
+
+    def __repr__(self):
+        """Return a short string representation of the message"""
+        return f"<{type(self).__name__}: {self.render()}>"
+
+    def __len__(self):
+        """Returns the total number of bits in the message."""
+        return self.message_class.bit_length
+
+    def __int__(self):
+        """Returns the integer value of the entire message"""
+        return self._value
+
+    def __bytes__(self):
+        """Converts the entire message to bytes in the same form as bytes(message)."""
+        return self._value.to_bytes((len(self) + 7) // 8, "big")
+
+    def pack_into(self, buffer, offset=0):
+        """
+        Writes the message into a writable buffer at the offset in the same form as Message.pack_into. Returns the
+        number of bytes written.
+
+        :raises: ValueError if the message doesn't fit in the buffer at the offset.
+        """
+        size = (len(self) + 7) // 8
+        if offset < 0 or offset + size > len(buffer):
+            raise ValueError(f"A {size}-byte message does not fit in a {len(buffer)}-byte buffer at offset {offset}.")
+        buffer[offset : offset + size] = self._value.to_bytes(size, "big")
+        return size
+
+    def __eq__(self, other):
+        """
+        Return True if the other message is a frozen message of the same type with the same value.
+
+        Can also compare to a string value.
+        """
+        if isinstance(other, str):
+            other = Field.render_value(value=other, fmt=Field.Format.Bin, pad_to_length=len(self))
+            return self.render(fmt=Field.Format.Bin, pad_to_length=len(self)) == other
+        if type(other) is type(self):
+            return self._value == other._value
+        return False
+
+    def __hash__(self):
+        """Frozen messages with the same type and value have the same hash."""
+        return hash((type(self), self._value))
@@ -0,0 +1,92 @@
+"""
+This module contains the Layout class which describes where each field of a message is located.
+
+Created on Oct 19, 2026
+
+@author: smalb
+"""
+
+from typing import Dict
+
+from pymessagelib.field import Field
+
+
+class Layout:
+    """
+    A Layout holds the position of every field in a fixed-length message so that the value of a field can be
+    read from an integer holding the entire message without constructing any Field or Message objects.
+
+    Fields are laid out most significant bit first, in definition order. The span of each field is stored as a
+    (shift, mask) pair, so the value of a field is `(message >> shift) & mask`.
+
+    The constant fields of a fixed-length message are combined into a single (mask, value) pair, so an integer
+    holds a message with the right constant fields if `message & constant_mask == constant_value`.
+
+    Messages with variable-length fields have no fixed positions. Their layouts have no spans and `is_fixed` is
+    False. The constant fields that precede the first variable-length field are laid out like a fixed-length
+    message in `constant_prefix`, a tuple of (bit length of the prefix, mask, value). The constant prefix of a
+    fixed-length message is the whole message.
+    """
+
+    def __init__(self, fields: Dict[str, Field]):
+        """Constructs a Layout from a dictionary mapping field names to fields in message order."""
+        self.is_fixed = not any(field.is_variable_length for field in fields.values())
+        self.bit_length = sum(len(field) for field in fields.values()) if self.is_fixed else 0
+        self.spans = {}
+        self.constant_mask = 0
+        self.constant_value = 0
+        if self.is_fixed:
+            offset = 0
+            for name, field in fields.items():
+                offset += len(field)
+                shift, mask = self.spans[name] = (self.bit_length - offset, (1 << len(field)) - 1)
+                if not field.is_writable and not field.is_auto_updated:
+                    self.constant_mask |= mask << shift
+                    self.constant_value |= int(field) << shift
+
+        prefix_fields = []
+        for field in fields.values():
+            if field.is_variable_length:
+                break
+            prefix_fields.append(field)
+        prefix_length = sum(len(field) for field in prefix_fields)
+        prefix_mask = prefix_value = 0
+        offset = 0
+        for field in prefix_fields:
+            offset += len(field)
+            if not field.is_writable and not field.is_auto_updated:
+                prefix_mask |= ((1 << len(field)) - 1) << (prefix_length - offset)
+                prefix_value |= int(field) << (prefix_length - offset)
+        self.constant_prefix = (prefix_length, prefix_mask, prefix_value)
+
+    def snapshot(self):
+        """Return the layout as a dictionary that can be stored as JSON (see Layout.from_snapshot)."""
+        return {
+            "is_fixed": self.is_fixed,
+            "bit_length": self.bit_length,
+            "spans": self.spans,
+            "constant_mask": self.constant_mask,
+            "constant_value": self.constant_value,
+            "constant_prefix": self.constant_prefix,
+        }
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        """Reconstruct a layout from the dictionary returned by Layout.snapshot without the fields."""
+        layout = cls.__new__(cls)
+        layout.is_fixed = snapshot["is_fixed"]
+        layout.bit_length = snapshot["bit_length"]
+        layout.spans = {name: tuple(span) for name, span in snapshot["spans"].items()}
+        layout.constant_mask = snapshot["constant_mask"]
+        layout.constant_value = snapshot["constant_value"]
+        layout.constant_prefix = tuple(snapshot["constant_prefix"])
+        return layout
+
+    def extract(self, value, name):
+        """Return the value of the named field from the integer value of an entire message."""
+        shift, mask = self.spans[name]
+        return (value >> shift) & mask
+
+    def extract_all(self, value):
+        """Return a dictionary mapping the name of every field to its value in the integer value of a message."""
+        return {name: (value >> shift) & mask for name, (shift, mask) in self.spans.items()}
@@ -8,10 +8,11 @@ Created on Jan 9, 2021
 """
 
 import math
-import inspect
+import threading
+import weakref
 from abc import ABC
 from typing import Dict
-from copy import deepcopy
+from copy import copy, deepcopy
 
 from pymessagelib.field import Field
 from pymessagelib._exceptions import (
@@ -19,8 +20,14 @@ from pymessagelib._exceptions import (
     MissingFieldDataException,
     InvalidFieldDataException,
     ConflictingContextsException,
+    ContextDataMismatchException,
+    AutoUpdateMismatchException,
+    InvalidFormatException,
 )
 
+_field_properties = {}  # maps (field name, is writable) to the property shared by the subclasses with such a field
+_frozen_class_lock = threading.Lock()  # held while a frozen class is generated, so only one is published per class
+
 
 class Message(ABC):
     """
@@ -70,6 +77,13 @@ class Message(ABC):
     each field of 2 messages.
     """
 
+    unions = {}  # maps field names to compiled tagged unions: (discriminator, {value: context}, default)
+    update_order = ()  # names of auto-update fields, ordered so that dependencies are updated first
+    layout = None  # positions of the fields in the message (see the Layout class)
+    compiled = None  # the checked and derived form of the message definition (see the CompiledFormat class)
+    dependency_graph = None  # the dependencies of the auto-update fields (see the DependencyGraph class)
+    _writable_fields = ()  # names of the writable fields, in message order
+
     def __init__(self, fields: Dict):
 
         # Fields need to be deep copied so the same field objects aren't shared
@@ -78,13 +92,48 @@ class Message(ABC):
         for field in self._fields.values():
             field._parent_message = self
         self._parent_field = None
+        self._union_keys = {}  # maps union field names to the discriminator value their context was chosen for
+
+    @property
+    def _parent_field(self):
+        """
+        Return the field this message is nested in. None if it isn't nested.
+
+        Only a weak reference to the field is kept so that fields and their nested messages don't form reference
+        cycles.
+        """
+        ref = self._parent_field_ref
+        return None if ref is None else ref()
+
+    @_parent_field.setter
+    def _parent_field(self, field):
+        """Sets the field this message is nested in."""
+        self._parent_field_ref = None if field is None else weakref.ref(field)
+
+    def __deepcopy__(self, memo):
+        """
+        Return a deep copy of the message. Weak references are copied as they are, so the copied fields are pointed
+        at the copy. The copy is only nested in a field if that field was copied along with it.
+        """
+        cls = type(self)
+        msg = memo[id(self)] = cls.__new__(cls)
+        for name, value in self.__dict__.items():
+            msg.__dict__[name] = deepcopy(value, memo)
+        fields = msg._fields
+        if isinstance(fields, _LazyFields):
+            fields._msg = weakref.ref(msg)
+        for field in dict.values(fields):
+            field._parent_message = msg
+        parent = self._parent_field
+        msg._parent_field = None if parent is None else memo.get(id(parent))
+        return msg
 
     def __repr__(self):
         """Return a short string representation of the message"""
         return f"<{type(self).__name__}: {self.render()}>"
 
     @staticmethod
-    def _create_setter(name, field):
+    def _create_setter(name):
         """Used for dynamically creating setters for fields of subclasses."""
 
         def set_field(self, value):
@@ -92,15 +141,16 @@ class Message(ABC):
             Used as the setter function for all writable fields in a message. fields of all other
             types will *not* have an associated setter.
 
-            When this function is called, all auto-update fields of the field's parent message
-            will be updated since they might rely on this field.
+            When this function is called, the auto-update fields of the field's parent message
+            that rely on this field will be updated.
 
             :raises: InvalidFieldDataException if the data being set is not valid for this field.
             """
+            field = type(self).format[name]
             if not field.value_is_valid(value):
                 raise InvalidFieldDataException(f"{value} is not a valid value for {field}")
             self._fields[name].value = value
-            self.update_fields()
+            self.update_fields(name)
 
         return set_field
 
@@ -125,6 +175,19 @@ class Message(ABC):
 
         return get_field
 
+    @staticmethod
+    def _field_property(name, writable):
+        """
+        Return the property used to access a field of subclasses. The property only depends on the name of the
+        field and whether it's writable, so it's shared by every subclass with such a field.
+        """
+        key = (name, writable)
+        prop = _field_properties.get(key)
+        if prop is None:
+            setter = Message._create_setter(name) if writable else None
+            prop = _field_properties[key] = property(Message._create_getter(name), setter)
+        return prop
+
     @property
     def context(self):
         """
@@ -144,30 +207,113 @@ class Message(ABC):
         assert self._parent_field is not None
         self._parent_field.context = context
 
-    def update_fields(self) -> None:
+    def update_fields(self, changed=None) -> None:
         """
-        Updates all auto-update fields.
+        Updates all auto-update fields. If the name of a changed field is given, only the auto-update fields that
+        depend on it (directly or indirectly) are updated.
+
+        The parent message is then told that the field holding this message changed, so only the auto-update
+        fields of each ancestor that depend on this message are updated.
 
         :raises: CircularDependencyException if auto-update fields depend on each other.
         """
-        # Update all auto-update fields
-        auto_update_fields = [f for f in self._fields.values() if f.is_auto_updated]
-
-        for field in auto_update_fields:
-            field._value = None  # erase old values
-
-        # NOTE: This is inefficient because auto-update fields can depend on each other.
-        #       This could be improved by forming an update order from the dependency graph.
-        for i in range(len(auto_update_fields)):
-            for field in auto_update_fields:
-                field.value = field.value_updater(
-                    *[self._fields[arg] for arg in inspect.getfullargspec(field.value_updater)[0]]
-                )
+        self._update_auto_fields(changed)
 
         # Propagate updates to parents
         if self._parent_field is not None:
-            if self._parent_field._parent_message is not None:
-                self._parent_field._parent_message.update_fields()
+            self._parent_field._nested_updated(self)
+
+    def _update_auto_fields(self, changed=None) -> None:
+        """
+        Updates the auto-update fields (only those depending on the changed field if one is given) and tagged-union
+        contexts of this message without notifying the parent.
+        """
+        # Update the auto-update fields in an order where each field is updated after the fields it depends on.
+        cls = type(self)
+        fields = self._fields
+        for name in cls.update_order if changed is None else cls.dependency_graph.dependents(changed):
+            field = fields[name]
+            args = [fields[arg]._updater_arg(kind) for arg, kind in zip(field.updater_args, field.updater_arg_kinds)]
+            value = self._evaluate_updater(field, args)
+            if isinstance(value, int):
+                field._set_int(value)
+            else:
+                field.value = value
+
+        if cls.unions:
+            self._select_contexts()
+
+    def _select_contexts(self) -> None:
+        """
+        Sets the context of each tagged-union field from the current value of its discriminator.
+
+        A context is only selected when the discriminator value changes, so contexts that were set manually
+        stay in place until the discriminator is written again.
+
+        :raises: ContextDataMismatchException if the data of a field is not compatible with the selected context.
+        """
+        for name, (discriminator, table, default) in type(self).unions.items():
+            key = int(self._fields[discriminator])
+            if self._union_keys.get(name) == key:
+                continue
+            context = table.get(key, default)
+            field = self._fields[name]
+            if field.context is not context:
+                field.context = context
+            self._union_keys[name] = key
+
+    def _field_written(self, name, value):
+        """
+        Called when a value is written to a writable field of this message, whether through the property of the
+        field, the field itself (Field.value or bit assignment) or the constructor. Decoding doesn't write fields
+        this way. Tracers wrap this method to be notified of field writes (see Tracing).
+        """
+
+    def _evaluate_updater(self, field, args):
+        """
+        Return the value calculated by the auto-update function of a field of this message from the arguments
+        (the fields it depends on in the form its function expects). Tracers wrap this method to time each
+        auto-update function (see Tracing).
+        """
+        return field.value_updater(*args)
+
+    def _materialize_field(self, name, field_data):
+        """
+        Construct the named field of a lazily decoded message. Writable fields are given their data, auto-update
+        fields are calculated and tagged-union contexts are selected.
+
+        :raises: InvalidDataFormatException if the data of a field is not compatible with its context.
+        """
+        cls = type(self)
+        fields = self._fields
+        field = deepcopy(cls.format[name])
+        field._parent_message = self
+
+        if field.is_auto_updated:
+            args = [fields[arg]._updater_arg(kind) for arg, kind in zip(field.updater_args, field.updater_arg_kinds)]
+            value = self._evaluate_updater(field, args)
+            if isinstance(value, int):
+                field._set_int(value)
+            else:
+                field.value = value
+        elif field.is_writable:
+            if field.is_variable_length:
+                field._bit_length = len(field_data) - 1
+                field._unit_length = field._bit_length // field.bits_per_unit
+            field._value = field_data
+            context = field._context
+            if name in cls.unions:
+                discriminator, table, default = cls.unions[name]
+                key = int(fields[discriminator])
+                context = table.get(key, default)
+                self._union_keys[name] = key
+            if context is not None:
+                field._context = None
+                try:
+                    field.context = context
+                except ContextDataMismatchException as e:
+                    raise InvalidDataFormatException(str(e))
+        return field
 
     def render(self, fmt=Field.Format.Hex, pad_to_length=0) -> str:
         """Renders entire field object as a hexadecimal value."""
@@ -290,7 +436,31 @@ class Message(ABC):
 
     def __len__(self):
         """Returns the total number of bits in the message."""
-        return type(self).bit_length
+        return type(self).bit_length or sum(len(field) for field in self._fields.values())
+
+    def __int__(self):
+        """Converts the entire message to an integer"""
+        value = 0
+        for field in self._fields.values():
+            value = (value << len(field)) | int(field)
+        return value
+
+    def __bytes__(self):
+        """Converts the entire message to big-endian bytes, padded with zero bits at the most significant end."""
+        return int(self).to_bytes((len(self) + 7) // 8, "big")
+
+    def pack_into(self, buffer, offset=0):
+        """
+        Writes the message into a writable buffer (such as a bytearray or memoryview) at the offset in the same form
+        as bytes(message). Returns the number of bytes written.
+
+        :raises: ValueError if the message doesn't fit in the buffer at the offset.
+        """
+        size = (len(self) + 7) // 8
+        if offset < 0 or offset + size > len(buffer):
+            raise ValueError(f"A {size}-byte message does not fit in a {len(buffer)}-byte buffer at offset {offset}.")
+        buffer[offset : offset + size] = int(self).to_bytes(size, "big")
+        return size
 
     def __eq__(self, other):
         """
@@ -313,39 +483,430 @@ class Message(ABC):
         Same as the Message.from_data method except a new object is not constructed.
         All fields of the message are updated with the new data.
         """
-        new_msg = type(self).from_data(data)
-        for name, field in new_msg._fields.items():
-            self._fields[name].value = field.render()
+        self._decode(data)
+
+    def decode_into(self, data, verify=False):
+        """
+        Decodes the data into this message instead of constructing a new one, and returns the message. The Field
+        objects (and nested messages) of the message are reused, so decoding many messages with one instance avoids
+        allocating new objects for every message. The data is accepted in the same forms as Message.from_data.
+
+        If decoding fails, the message must be decoded into again before it is used.
+
+        :raises: InvalidDataFormatException if the data does not have the format of this message
+        :raises: AutoUpdateMismatchException if verify is True and the data has incorrect auto-update values.
+        """
+        self._decode(data, verify)
+        if self._parent_field is not None:
+            self._parent_field._nested_updated(self)
+        return self
+
+    def _decode(self, data, verify=False):
+        """Decodes the data into the fields of this message without notifying the parent message."""
+        cls = type(self)
+        writable_field_data, auto_field_data = cls._split_data(data)
+
+        fields = self._fields
+        for fieldname, field_data in writable_field_data.items():
+            field = fields[fieldname]
+            if field.is_variable_length:
+                field._bit_length = len(field_data) - 1
+                field._unit_length = field._bit_length // field.bits_per_unit
+            field._value = field_data
+            nested_msg = field._nested_msg
+            if nested_msg is None:
+                continue
+            if fieldname in cls.unions and self._union_key(fieldname, writable_field_data) != self._union_keys.get(
+                fieldname
+            ):
+                # The context is selected again (from the new data) once the fields are updated.
+                field._context = field._nested_msg = None
+                self._union_keys.pop(fieldname, None)
+            else:
+                try:
+                    nested_msg._decode(field_data)
+                except InvalidDataFormatException:
+                    raise InvalidDataFormatException(
+                        f"The data '{field_data}' is not compatible with context {type(nested_msg).__name__}"
+                    )
+
+        try:
+            self._update_auto_fields()
+        except ContextDataMismatchException as e:
+            raise InvalidDataFormatException(str(e))
+
+        if verify:
+            self._verify_auto_fields(data, auto_field_data)
+
+    def _union_key(self, name, field_data):
+        """Return the discriminator value of a tagged-union field, preferring the data that is being decoded."""
+        discriminator = type(self).unions[name][0]
+        if discriminator in field_data:
+            return int(field_data[discriminator][1:], 2)
+        return int(self._fields[discriminator])
+
+    def _verify_auto_fields(self, data, auto_field_data):
+        """
+        Compare the received auto-update values with the recalculated ones.
+
+        :raises: AutoUpdateMismatchException if any of the received values are incorrect.
+        """
+        mismatches = {}
+        for fieldname, field_data in auto_field_data.items():
+            received, expected = int(field_data[1:], 2), int(self._fields[fieldname])
+            if received != expected:
+                mismatches[fieldname] = (received, expected)
+        if mismatches:
+            raise AutoUpdateMismatchException(
+                f"The data '{data}' has incorrect values for the auto-update fields {', '.join(mismatches)}.",
+                mismatches,
+            )
 
     @classmethod
-    def from_data(cls, data):
+    def from_data(cls, data, verify=False, into=None, frozen=False, lazy=False):
         """
-        Constructs an object of type cls given an entire hex message.
+        Constructs an object of type cls given an entire hex message. The data can also be given as a bytes-like
+        object or an integer (in the same form as bytes(message) and int(message)).
+
+        If the message has variable-length fields, every digit of the data is significant (leading zeros
+        included) and the data must contain exactly one message.
+
+        Auto-update fields are always recalculated. If verify is True, the received values of auto-update fields
+        are compared with the recalculated values and an exception is raised if any of them differ.
+
+        If a message of this type is given as `into`, the data is decoded into it instead of constructing a new
+        message (see Message.decode_into).
+
+        If frozen is True, a read-only message of the frozen sibling class is returned instead (see
+        Message.frozen_class).
+
+        If lazy is True, the data is only chunked and the constant fields are checked. Each Field object is
+        constructed (and auto-update fields are calculated) the first time the field is used, which is much faster
+        when only a few fields of a large message are read.
 
         #TODO: take a context tree as a parameter to allow construction of nested messages
 
         :raises: InvalidDataFormatException if the object could not be created due to issues with the format of the data
+        :raises: AutoUpdateMismatchException if verify is True and the data has incorrect auto-update values.
+        """
+        if frozen:
+            return cls.frozen_class().from_data(data, verify)
+        if into is not None:
+            if type(into) is not cls:
+                raise InvalidDataFormatException(f"Cannot decode a {cls.__name__} message into {into!r}.")
+            return into.decode_into(data, verify)
+
+        writable_field_data, auto_field_data = cls._split_data(data)
+
+        if lazy:
+            msg = cls.__new__(cls)
+            Message.__init__(msg, {})
+            msg._fields = _LazyFields(msg, writable_field_data)
+        else:
+            # Construct a new message providing data only for writable fields.
+            # Tagged-union contexts are selected as part of construction.
+            try:
+                msg = cls(**writable_field_data)
+            except ContextDataMismatchException as e:
+                raise InvalidDataFormatException(str(e))
+
+        if verify:
+            msg._verify_auto_fields(data, auto_field_data)
+
+        return msg
+
+    @classmethod
+    def frozen_class(cls):
+        """
+        Return the read-only sibling class of this message class. It is generated the first time it's requested,
+        once even if several threads request it at the same time.
+
+        .. seealso:
+            The FrozenMessage class describes frozen messages in more detail.
+
+        :raises: InvalidFormatException if the message has variable-length fields.
+        """
+        frozen_cls = cls.__dict__.get("_frozen_class")
+        if frozen_cls is None:
+            from pymessagelib.frozen import FrozenMessage
+
+            with _frozen_class_lock:
+                frozen_cls = cls.__dict__.get("_frozen_class")
+                if frozen_cls is None:
+                    frozen_cls = cls._frozen_class = FrozenMessage.build(cls)
+        return frozen_cls
+
+    @classmethod
+    def _split_data(cls, data):
+        """
+        Chunk the data into fields and check the constant fields.
+
+        Returns a tuple of dictionaries mapping the names of the writable fields and the auto-update fields to their
+        data as binary values.
+
+        :raises: InvalidDataFormatException if the data does not have the format of this message
         """
 
         # 1. Convert the data to binary
-        binary_data = Field.render_value(
-            value=data, fmt=Field.Format.Bin, pad_to_length=cls.bit_length, check_length=True
-        )[1:]
+        if not isinstance(data, str):
+            if cls.bit_length:
+                data = f"b{cls._frame_value(data):0{cls.bit_length}b}"
+            elif isinstance(data, int):
+                raise InvalidDataFormatException(
+                    f"Variable-length message {cls.__name__} cannot be decoded from an integer."
+                )
+            else:
+                data = f"x{bytes(data).hex()}"
+        if cls.bit_length:
+            binary_data = Field.render_value(
+                value=data, fmt=Field.Format.Bin, pad_to_length=cls.bit_length, check_length=True
+            )[1:]
+        else:
+            binary_data = Field.render_value(
+                value=data, fmt=Field.Format.Bin, pad_to_length=Field.value_bit_length(data)
+            )[1:]
 
-        # 2. chunk into fields
+        # 2. chunk into fields. The data is walked once with a cursor, so variable-length fields are sized from
+        #    the length fields that were already read.
         writable_field_data = {}
+        auto_field_data = {}
+        field_spans = {}
+        offset = 0
         for fieldname, field in cls.format.items():
-            field_data = f"b{binary_data[:len(field)]}"
+            length = len(field)
+            if field.is_variable_length:
+                length_offset, length_length = field_spans[field.length_field]
+                length = int(binary_data[length_offset : length_offset + length_length], 2) * field.bits_per_unit
+                if length == 0 or offset + length > len(binary_data):
+                    raise InvalidDataFormatException(
+                        f"The data '{data}' does not contain {length} bits for the field {fieldname}."
+                    )
+            field_spans[fieldname] = (offset, length)
+            field_data = f"b{binary_data[offset:offset + length]}"
             if field.is_writable:
                 writable_field_data[fieldname] = field_data
             elif field.is_auto_updated:
-                pass
+                auto_field_data[fieldname] = field_data
             else:
                 if field.value != field_data:
                     raise InvalidDataFormatException(
                         f"The data '{field_data}' does not match with constant field {fieldname}."
                     )
-            binary_data = binary_data[len(field) :]
+            offset += length
+
+        if offset != len(binary_data):
+            raise InvalidDataFormatException(f"The data '{data}' is longer than the {cls.__name__} message.")
+
+        return writable_field_data, auto_field_data
+
+    @classmethod
+    def _frame_value(cls, frame):
+        """
+        Return the integer value of a frame given as a bytes-like object, an integer or a formatted value.
+
+        :raises: InvalidDataFormatException if the frame is too long to be a message of this type.
+        """
+        if isinstance(frame, int):
+            value = frame
+        elif isinstance(frame, str):
+            try:
+                value = int(frame[1:], Field.get_format(frame).value)
+            except (KeyError, ValueError, IndexError):
+                raise InvalidDataFormatException(f"'{frame}' is not correctly formatted.")
+        else:
+            if len(frame) > (cls.bit_length + 7) // 8:
+                raise InvalidDataFormatException(f"{frame} is longer than the {cls.__name__} message.")
+            value = int.from_bytes(frame, "big")
+        if value >> cls.bit_length:
+            raise InvalidDataFormatException(f"{frame} is longer than the {cls.__name__} message.")
+        return value
+
+    @classmethod
+    def _compute_auto_fields(cls, values, names=None):
+        """
+        Recalculate the auto-update fields from a dictionary mapping field names to integer values. The values of
+        the auto-update fields in the dictionary are replaced. No Message object is constructed, and Field objects
+        are only created for auto-update functions that take Field arguments.
 
-        # 3. Construct a new message providing data only for writable fields.
-        return cls(**writable_field_data)
+        If names are given, only those auto-update fields are recalculated (in update order).
+
+        :raises: InvalidFieldDataException if an auto-update function returns a value that doesn't fit in its field,
+            as it does when a Message is updated.
+        """
+        layout = cls.layout
+        for name in cls.update_order if names is None else names:
+            field = cls.format[name]
+            args = []
+            for arg, kind in zip(field.updater_args, field.updater_arg_kinds):
+                value = values[arg]
+                if kind is int:
+                    args.append(value)
+                elif kind is bytes:
+                    args.append(value.to_bytes((len(cls.format[arg]) + 7) // 8, "big"))
+                elif kind is str:
+                    args.append(format(value, f"0{len(cls.format[arg])}b"))
+                else:
+                    arg_field = copy(cls.format[arg])
+                    arg_field._value = f"b{value:0{len(arg_field)}b}"
+                    args.append(arg_field)
+            returned = result = field.value_updater(*args)
+            if isinstance(result, str):
+                result = int(result[1:], Field.get_format(result).value) if field.value_is_valid(result) else -1
+            elif not isinstance(result, int):
+                result = int(result)
+            if not 0 <= result <= layout.spans[name][1]:
+                raise InvalidFieldDataException(
+                    f"{returned} is not a valid value for the field '{name}' in message '{cls.__name__}'"
+                )
+            values[name] = result
+
+    @classmethod
+    def template(cls, **defaults):
+        """
+        Returns a MessageTemplate for this message type. Values given here are used for writable fields that
+        aren't specified when encoding with the template.
+
+        .. seealso:
+            The MessageTemplate class describes templates in more detail.
+        """
+        from pymessagelib.template import MessageTemplate
+
+        return MessageTemplate(cls, **defaults)
+
+    @classmethod
+    def verify_frames(cls, frames):
+        """
+        Check the constant and auto-update fields of many frames of this message type without constructing any
+        messages. Frames can be bytes-like objects, integers or formatted values.
+
+        Yields a tuple of (index, mismatches) for every frame that doesn't verify, where mismatches maps field
+        names to (received, expected) integer values.
+
+        :raises: InvalidFormatException if the message has variable-length fields.
+        :raises: InvalidDataFormatException if a frame is too long to be a message of this type.
+        """
+        layout = cls.layout
+        if not layout.is_fixed:
+            raise InvalidFormatException(f"Frames of variable-length message {cls.__name__} cannot be verified.")
+
+        constants = {
+            name: int(field)
+            for name, field in cls.format.items()
+            if not field.is_writable and not field.is_auto_updated
+        }
+        checked = list(constants) + list(cls.update_order)
+        for index, frame in enumerate(frames):
+            received = layout.extract_all(cls._frame_value(frame))
+            expected = dict(received)
+            expected.update(constants)
+            cls._compute_auto_fields(expected)
+            mismatches = {
+                name: (received[name], expected[name]) for name in checked if received[name] != expected[name]
+            }
+            if mismatches:
+                yield index, mismatches
+
+    @classmethod
+    def frame_length(cls, data):
+        """
+        Returns the number of bits in the message at the start of the data. The data may contain more than one
+        message (for example, a stream of messages). Only the length fields are read, so the data doesn't need to
+        be decoded to find where the next message starts.
+
+        :raises: InvalidDataFormatException if the data is too short to contain the length fields.
+        """
+        if cls.bit_length:
+            return cls.bit_length
+
+        fmt = Field.get_format(data)
+        digits = data[1:]
+        bits_per_digit = int(math.log2(fmt.value))
+
+        def read(offset, length):
+            """Read an integer from the bits of the data at the offset."""
+            if fmt is Field.Format.Dec:
+                binary_data = format(int(digits), "b")
+            else:
+                num_digits = math.ceil((offset + length) / bits_per_digit)
+                if num_digits > len(digits):
+                    raise InvalidDataFormatException(f"The data '{data}' is too short to be a {cls.__name__} message.")
+                binary_data = format(int(digits[:num_digits], fmt.value), f"0{num_digits * bits_per_digit}b")
+            if offset + length > len(binary_data):
+                raise InvalidDataFormatException(f"The data '{data}' is too short to be a {cls.__name__} message.")
+            return int(binary_data[offset : offset + length], 2)
+
+        field_spans = {}
+        offset = 0
+        for fieldname, field in cls.format.items():
+            length = len(field)
+            if field.is_variable_length:
+                length = read(*field_spans[field.length_field]) * field.bits_per_unit
+            field_spans[fieldname] = (offset, length)
+            offset += length
+        return offset
+
+
+class _LazyFields(dict):
+    """
+    The fields of a lazily decoded message. Fields are constructed by the message the first time they are looked
+    up. Iterating over the fields constructs all remaining fields first, so the fields are always iterated in
+    message order.
+    """
+
+    __slots__ = ("_msg", "_data")
+
+    def __init__(self, msg, writable_field_data):
+        """Constructs an empty field dictionary for the message, holding the data of its writable fields."""
+        super().__init__()
+        self._msg = weakref.ref(msg)  # a weak reference, so the message and its fields don't form a cycle
+        self._data = {name: writable_field_data.get(name) for name in type(msg).format}
+
+    def __missing__(self, name):
+        """Construct the named field. Raises KeyError if the message doesn't have the field."""
+        field_data = self._data[name]
+        field = self[name] = self._msg()._materialize_field(name, field_data)
+        del self._data[name]
+        if not self._data:
+            # Fields were constructed in the order they were used. Restore the message order.
+            fields = [(name, dict.__getitem__(self, name)) for name in type(self._msg()).format]
+            self.clear()
+            self.update(fields)
+        return field
+
+    def _materialize_all(self):
+        """Construct all remaining fields."""
+        for name in list(self._data):
+            if name in self._data:
+                self[name]
+
+    def __contains__(self, name):
+        """Return True if the message has the named field, whether or not it was constructed yet."""
+        return name in self._data or super().__contains__(name)
+
+    def get(self, name, default=None):
+        """Return the named field, or the default if the message doesn't have it."""
+        return self[name] if name in self else default
+
+    def __len__(self):
+        """Return the number of fields in the message."""
+        return len(self._data) + super().__len__()
+
+    def __iter__(self):
+        """Iterate over the field names in message order."""
+        self._materialize_all()
+        return super().__iter__()
+
+    def keys(self):
+        """Return the field names in message order."""
+        self._materialize_all()
+        return super().keys()
+
+    def values(self):
+        """Return the fields in message order."""
+        self._materialize_all()
+        return super().values()
+
+    def items(self):
+        """Return the (name, field) pairs in message order."""
+        self._materialize_all()
+        return super().items()
@@ -6,7 +6,7 @@ Created on Feb 18, 2021
 @author: smalb
 """
 
-import inspect
+import threading
 from abc import ABCMeta
 from typing import Dict
 
@@ -17,10 +17,82 @@ from pymessagelib._exceptions import (
     InvalidFieldException,
     InvalidFieldDataException,
     InvalidDataFormatException,
-    CircularDependencyException,
     MultipleMatchingMessageDefinitionsException,
 )
-from pymessagelib.dependency_graph import DependencyGraph
+from pymessagelib.compiled import CompiledFormat
+from pymessagelib.cache import DefinitionCache
+from pymessagelib.dispatch import DispatchIndex
+from pymessagelib.stats import Stats
+from pymessagelib.tracing import Tracing
+
+
+class MessageType(ABCMeta):
+    """
+    The metaclass of every generated Message subclass. The classes only differ in their class attributes, so a
+    single metaclass is shared by all of them.
+    """
+
+    def __len__(cls):
+        """Return the length of the Message class. If it has variable-length fields, return 0"""
+        return cls.layout.bit_length
+
+
+def _init_message(self, **kwargs):
+    """Constructor for generated Message subclasses."""
+    msg_cls = type(self)
+    Message.__init__(self, msg_cls.format)
+
+    # Verify values for all writable fields were provided via params
+    for field_name in msg_cls._writable_fields:
+        if field_name not in kwargs:
+            raise MissingFieldDataException(f"A value must be provided for the '{field_name}' field upon instantiation")
+
+    # initialize writable fields from parameters
+    for param, val in kwargs.items():
+
+        if param in msg_cls.format and param not in msg_cls._writable_fields:
+            raise InvalidFieldException(f"Cannot specify a value for read-only field '{param}'.")
+        elif param in msg_cls.format:
+            context = None
+            if isinstance(val, Message):
+                context = type(val)
+                val = val.render()
+
+            if msg_cls.format[param].value_is_valid(val):
+                self._fields[param].value = val
+                if context:
+                    self._fields[param].context = context
+            else:
+                raise InvalidFieldDataException(
+                    f"'{val}' is not a valid value for the field '{param}' in message '{msg_cls.__name__}'"
+                )
+        else:
+            raise InvalidFieldException(f"'{param}' is not a valid field in the {msg_cls.__name__} message.")
+
+    self.update_fields()
+
+    # Verify variable-length fields agree with the fields holding their lengths
+    for name, field in self._fields.items():
+        if field.is_variable_length and field._unit_length != int(self._fields[field.length_field]):
+            raise InvalidFieldDataException(
+                f"The '{name}' field holds {field._unit_length} units, but its length field "
+                f"'{field.length_field}' holds {int(self._fields[field.length_field])}."
+            )
+
+
+class _PendingClass:
+    """Stands in for the class of an unbuilt lazy definition in the DispatchIndex of a MessageBuilder."""
+
+    def __init__(self, name, compiled):
+        """Constructs a stand-in from the name and the compiled format of a definition."""
+        self.__name__ = name
+        self.compiled = compiled
+        self.layout = compiled.layout
+        self.bit_length = compiled.layout.bit_length
+
+    def __repr__(self):
+        """Return a short string representation of the stand-in"""
+        return f"<unbuilt {self.__name__}>"
 
 
 class MessageBuilder:
@@ -33,20 +105,115 @@ class MessageBuilder:
     All message definitions that are loaded will become accessible by message name as an attribute of
     the builder. For example, if a definition for a message called "GET_ADDR" is loaded into an object
     called `builder`, the generated class could be accessed via `builder.GET_ADDR`
+
+    If the builder is lazy, loading a definition only records it. The message class is built the first time it is
+    accessed as an attribute of the builder or used as the context of another message. All remaining classes are
+    built the first time `message_classes` is needed. The dispatch index used by build_message is built from the
+    compiled formats of unbuilt definitions, so build_message only builds the classes of the candidates it tries.
+    Errors in a definition are then raised when its class is built (or first indexed) instead of when it is
+    loaded.
+
+    Builders can be shared by threads. Loading definitions, building lazy classes and building the dispatch index
+    are serialized by a lock held by the builder, so each class is only built once. The formats, compiled formats
+    and layouts of built classes are never modified, and the caches of a dispatch index (the partners and tagged
+    union checks of each class) are only ever filled with the same values, so accessing classes, dispatching and
+    decoding don't take the lock. An adaptive builder counts messages without the lock, so the counts may miss
+    some messages that are built concurrently; its order is replaced all at once when it's refreshed.
+
+    Enabling or disabling stats and adding or removing tracers replace methods of the builder and of every built
+    class one at a time, so they must not run while other threads use the builder or its messages. Decodes that
+    overlap with such a change may be partially counted or traced.
+
+    Messages themselves are not thread-safe: each message should only be used by one thread at a time (frozen
+    messages can be shared).
     """
 
-    def __init__(self, definitions={}):
-        """Constructs a MessageBuilder class and loads the provided definitions."""
-        self.message_classes = []
+    def __init__(self, definitions={}, adaptive=False, lazy=False, cache=None):
+        """
+        Constructs a MessageBuilder class and loads the provided definitions.
+
+        If adaptive is True, the builder counts how often each message type is built by build_message and tries
+        the most frequent types first. The order is refreshed every `refresh_interval` messages.
+
+        If lazy is True, message classes are built when they're first needed instead of when they're loaded.
+
+        The cache can be a DefinitionCache or the path of its file. Compiled definitions are then loaded from the
+        cache instead of being compiled, and definitions that aren't in the cache are added to it. The cache is
+        saved after definitions are loaded, after all lazy classes are built and after ambiguous pairs are found.
+        """
+        if cache is not None and not isinstance(cache, DefinitionCache):
+            cache = DefinitionCache(cache)
+        self._lock = threading.RLock()  # held while loading definitions and building lazy classes
+        self.cache = cache
+        self.lazy = lazy
+        self._message_classes = []  # loaded classes, with the names of unbuilt lazy definitions in their place
+        self._pending = {}  # maps names of unbuilt lazy definitions to (definition, index in _message_classes)
+        self.adaptive = adaptive
+        self.refresh_interval = 1000
+        self.hit_counts = {}  # maps message classes to the number of messages built by build_message
+        self._ranks = {}  # maps message names to their position in the adaptive order
+        self._builds_since_refresh = 0
+        self._dispatch_index = None
+        self._stats = None
+        self._tracing = None
         self.load_definitions(definitions)
 
     def load_definitions(self, definitions: Dict):
         """Loads the provided definitions into this MessageBuilder object."""
 
-        for name, definition in definitions.items():
-            cls = self.build_message_class(name, definition)
+        with self._lock:
+            for name, definition in definitions.items():
+                if name in self._pending:
+                    # Keep the class of the previous definition, as if it had been built when it was loaded.
+                    self._build_pending(name)
+                if self.lazy:
+                    self.__dict__.pop(name, None)
+                    self._pending[name] = (definition, len(self._message_classes))
+                    self._message_classes.append(name)
+                else:
+                    cls = self.build_message_class(name, definition)
+                    self.__dict__[name] = cls
+                    self._message_classes.append(cls)
+            self._dispatch_index = None
+            if self.cache is not None:
+                self.cache.save()
+
+    @property
+    def message_classes(self):
+        """Return all loaded message classes in the order they were loaded. Unbuilt lazy classes are built first."""
+        if self._pending:
+            with self._lock:
+                for name in list(self._pending):
+                    self._build_pending(name)
+                if self.cache is not None:
+                    self.cache.save()
+        return self._message_classes
+
+    def _build_pending(self, name):
+        """
+        Build the message class of an unbuilt lazy definition and return it. If another thread built it first, the
+        class built by that thread is returned.
+        """
+        with self._lock:
+            if name not in self._pending:
+                return self.__dict__[name]
+            definition, index = self._pending.pop(name)
+            try:
+                cls = self.build_message_class(name, definition)
+            except Exception:
+                self._pending[name] = (definition, index)
+                raise
+            # The list entry is set first so that a class is in message_classes once it's an attribute.
+            self._message_classes[index] = cls
             self.__dict__[name] = cls
-            self.message_classes.append(cls)
+            return cls
+
+    def __getattr__(self, name):
+        """Builds unbuilt lazy message classes the first time they are accessed."""
+        pending = self.__dict__.get("_pending")
+        if pending and name in pending:
+            return self._build_pending(name)
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
 
     def build_message_class(self, cls_name, fmt):
         """
@@ -54,102 +221,268 @@ class MessageBuilder:
         to field objects.
         """
 
-        # Categorize the fields to generate methods appropriately
-        all_fields = {}
-        writable_fields = {}
-        readable_fields = {}
-        auto_updated_fields = {}
-        for name, item in fmt.items():
-            if isinstance(item, Field):
-                all_fields[name] = item
-                if item.is_writable:
-                    writable_fields[name] = item
-                if item.is_readable:
-                    readable_fields[name] = item
-                if item.is_auto_updated:
-                    auto_updated_fields[name] = item
-            else:
-                raise InvalidFieldException(f"cls_name: {name} must be a Field object.")
+        # Check the definition and derive everything that doesn't depend on this builder (shared by all builders).
+        compiled = CompiledFormat.get(cls_name, fmt, self.cache)
 
-        # Define the metaclass to use
-        class MessageType(ABCMeta):
-            """This is a dynamically-created Metaclass that will be the type of all Message subclasses"""
+        # Create an empty class with the appropriate name that inherits from Message.
+        msg_cls = MessageType(cls_name, (Message,), {"__init__": _init_message})
 
-            def __len__(self):
-                """Return the length of the Message class. If any fields have non-positive lengths, return 0"""
-                length = 0
-                for field in all_fields.values():
-                    length += len(field)
-                return length
+        # Compile tagged unions into lookup tables so contexts can be selected without a dispatch chain.
+        unions = {}
+        for name, field in fmt.items():
+            if field.union is None:
+                continue
+            if field.union.discriminator not in fmt or field.union.discriminator == name:
+                raise InvalidFieldException(
+                    f"Discriminator '{field.union.discriminator}' of field '{name}' is not a valid field in {cls_name}."
+                )
+            unions[name] = field.union.compile(self._resolve_context)
+            for context in list(unions[name][1].values()) + [unions[name][2]]:
+                if context is not None and not field.is_variable_length and len(context) != len(field):
+                    raise InvalidFieldException(
+                        f"Context {context.__name__} does not have the same length as field '{name}' in {cls_name}."
+                    )
 
-        # Create an empty class with the appropriate name that inherits from Message.
-        msg_cls = MessageType(cls_name, (Message,), {})
+        # Make a getter for all fields and a setter only for writable fields. Set each field name.
+        for name, field in fmt.items():
+            setattr(msg_cls, name, Message._field_property(name, field.is_writable))
+            field._name = name
 
-        def __init__(self, **kwargs):
-            """Constructor for generated Message subclasses."""
-            Message.__init__(self, all_fields)
+        msg_cls.format = fmt
+        msg_cls.compiled = compiled
+        msg_cls.dependency_graph = compiled.dependency_graph
+        msg_cls.unions = unions
+        msg_cls.update_order = compiled.update_order
+        msg_cls.layout = compiled.layout
+        msg_cls.bit_length = compiled.layout.bit_length
+        msg_cls._writable_fields = compiled.writable_fields
 
-            # Verify values for all writable fields were provided via params
-            for field_name in writable_fields:
-                if field_name not in kwargs:
-                    raise MissingFieldDataException(
-                        f"A value must be provided for the '{field_name}' field upon instantiation"
-                    )
+        if self._stats is not None or self._tracing is not None:
+            self._instrument(msg_cls)
 
-            # initialize writable fields from parameters
-            for param, val in kwargs.items():
-
-                if param in all_fields and param not in writable_fields:
-                    raise InvalidFieldException(f"Cannot specify a value for read-only field '{param}'.")
-                elif param in all_fields:
-                    context = None
-                    if isinstance(val, Message):
-                        context = type(val)
-                        val = val.render()
-
-                    if msg_cls.format[param].value_is_valid(val):
-                        self._fields[param].value = val
-                        if context:
-                            self._fields[param].context = context
-                    else:
-                        raise InvalidFieldDataException(
-                            f"'{val}' is not a valid value for the field '{param}' in message '{cls_name}'"
-                        )
-                else:
-                    raise InvalidFieldException(f"'{param}' is not a valid field in the {cls_name} message.")
+        return msg_cls
 
-            self.update_fields()
+    @property
+    def stats(self):
+        """Return the Stats collected since stats were enabled, or None if they're disabled."""
+        return self._stats
 
-        # Construct a graph of all dependencies - used for detecting circular imports and choosing order of updates.
-        msg_cls.dependency_graph = DependencyGraph()
-        for name, field in auto_updated_fields.items():
-            dependencies = inspect.getfullargspec(field.value_updater)[0]
-            for dependency in dependencies:
-                msg_cls.dependency_graph.addEdge(name, dependency)
+    def enable_stats(self):
+        """
+        Start collecting counters and timings of build_message and of the loaded message classes (see Stats) and
+        return the Stats object. Unbuilt lazy classes are instrumented when they're built. If stats are already
+        enabled, the existing Stats object is returned. Must not be called while other threads use the builder.
+        """
+        with self._lock:
+            if self._stats is None:
+                self._stats = Stats()
+                self._reinstrument()
+            return self._stats
 
-        # Verify no cycles exist in auto-update fields
-        if msg_cls.dependency_graph.cycle is not None:
-            raise CircularDependencyException(
-                f"Detected cycle in auto-update fields: {' -> '.join(msg_cls.dependency_graph.cycle)}"
-            )
+    def disable_stats(self):
+        """
+        Stop collecting counters and timings and return the Stats collected so far (or None if stats weren't
+        enabled). The message classes run at full speed again. Must not be called while other threads use the
+        builder.
+        """
+        with self._lock:
+            stats = self._stats
+            if stats is not None:
+                self._stats = None
+                self._reinstrument()
+            return stats
 
-        # Make a getter for all fields and a setter only for writable fields. Set each field name.
-        for name, field in all_fields.items():
-            getter = Message._create_getter(name)
-            setter = Message._create_setter(name, field) if name in writable_fields else None
-            setattr(msg_cls, name, property(getter, setter))
-            field._name = name
+    @property
+    def tracers(self):
+        """Return the installed tracers in the order they're called."""
+        return list(self._tracing.tracers) if self._tracing is not None else []
 
-        msg_cls.__init__ = __init__
-        msg_cls.format = fmt
-        msg_cls.bit_length = sum((len(field) for field in fmt.values()))
+    def add_tracer(self, tracer):
+        """
+        Install a tracer (see Tracer) that is notified of field writes, auto-update functions, decodes and
+        build_message dispatch decisions of the messages of this builder. Only the events handled by installed
+        tracers are traced, so there's no cost when no tracer is installed. Returns the tracer. Must not be called
+        while other threads use the builder.
+        """
+        with self._lock:
+            self._tracing = Tracing(self.tracers + [tracer])
+            self._reinstrument()
+        return tracer
 
-        return msg_cls
+    def remove_tracer(self, tracer):
+        """
+        Uninstall a tracer added with add_tracer. Must not be called while other threads use the builder.
+
+        :raises: ValueError if the tracer isn't installed.
+        """
+        with self._lock:
+            tracers = self.tracers
+            tracers.remove(tracer)
+            self._tracing = Tracing(tracers) if tracers else None
+            self._reinstrument()
+
+    def _instrument(self, msg_cls):
+        """
+        Replace the wrappers installed on a message class with those of the installed tracers and the enabled stats.
+        Stats are installed last so that they wrap the tracers.
+        """
+        Stats.uninstrument(msg_cls)
+        Tracing.uninstrument(msg_cls)
+        if self._tracing is not None:
+            self._tracing.instrument(msg_cls)
+        if self._stats is not None:
+            self._stats.instrument(msg_cls)
+
+    def _reinstrument(self):
+        """Replace the wrappers installed on this builder and on all built message classes."""
+        self.__dict__.pop("build_message", None)
+        if self._tracing is not None:
+            self._tracing.instrument_builder(self)
+        if self._stats is not None:
+            self._stats.instrument_builder(self)
+        for msg_cls in self._message_classes:
+            if not isinstance(msg_cls, str):
+                self._instrument(msg_cls)
+
+    def _resolve_context(self, context):
+        """
+        Return the Message class for a context given as a class or as the name of a loaded message.
+
+        :raises: InvalidFieldException if the context is not a Message class or a loaded message name.
+        """
+        if isinstance(context, str):
+            context = self._build_pending(context) if context in self._pending else self.__dict__.get(context)
+        if not (isinstance(context, type) and issubclass(context, Message)):
+            raise InvalidFieldException(f"'{context}' is not a Message class or the name of a loaded message.")
+        return context
+
+    @property
+    def dispatch_index(self):
+        """
+        Return the DispatchIndex of the loaded message classes. It is rebuilt when definitions are loaded. Unbuilt
+        lazy classes are indexed by their compiled formats without building them, so the index may hold
+        _PendingClass stand-ins (see MessageBuilder._resolve_entry).
+        """
+        index = self._dispatch_index
+        if index is None:
+            with self._lock:
+                index = self._dispatch_index
+                if index is None:
+                    entries = [
+                        self._pending_entry(msg_cls) if isinstance(msg_cls, str) else msg_cls
+                        for msg_cls in self._message_classes
+                    ]
+                    pairs = None
+                    if self.cache is not None:
+                        pairs = self.cache.get_ambiguous_pairs(self._pairs_digest(entries))
+                        if self.cache.modified:
+                            self.cache.save()
+                    index = self._dispatch_index = DispatchIndex(entries, pairs)
+        return index
+
+    def _pending_entry(self, name):
+        """Return the stand-in of an unbuilt lazy class in the dispatch index, compiling its definition."""
+        definition, _ = self._pending[name]
+        return _PendingClass(name, CompiledFormat.get(name, definition, self.cache))
+
+    def _resolve_entry(self, entry):
+        """Return the message class of an entry of the dispatch index, building it if it's an unbuilt class."""
+        if isinstance(entry, _PendingClass):
+            return self._build_pending(entry.__name__)
+        return entry
+
+    @staticmethod
+    def _pairs_digest(message_classes):
+        """Return the key of the ambiguous pairs of the message classes in a DefinitionCache."""
+        return CompiledFormat.digest(tuple(msg_cls.compiled.digest for msg_cls in message_classes))
+
+    @staticmethod
+    def _frame(data):
+        """
+        Return the integer value of the data and its length in bits (None for integers), or None if the data isn't
+        a formatted value, bytes-like object or integer.
+        """
+        try:
+            if isinstance(data, str):
+                return int(data[1:], Field.get_format(data).value), Field.value_bit_length(data)
+            elif isinstance(data, int):
+                return data, None
+            else:
+                return int.from_bytes(data, "big"), len(data) * 8
+        except (KeyError, ValueError, IndexError, TypeError):
+            return None
+
+    def _candidates(self, data, frame=None):
+        """Return the message classes that the data could be decoded as, without decoding it."""
+        frame = frame or self._frame(data)
+        if frame is None:
+            return list(self.dispatch_index.message_classes)
+        candidates = self.dispatch_index.candidates(*frame)
+        if self.adaptive and len(candidates) > 1:
+            ranks = self._ranks
+            candidates.sort(key=lambda msg_cls: ranks.get(msg_cls.__name__, len(ranks)))
+        return candidates
+
+    def _record_hit(self, msg_cls):
+        """Count a message built by build_message and refresh the adaptive order periodically."""
+        self.hit_counts[msg_cls] = self.hit_counts.get(msg_cls, 0) + 1
+        self._builds_since_refresh += 1
+        if self._builds_since_refresh >= self.refresh_interval:
+            self.refresh_order()
+
+    def refresh_order(self):
+        """
+        Order the message types by the number of messages built so far, most frequent first. Types that haven't been
+        built are tried last, in the order they were loaded.
+        """
+        ordered = sorted(self.hit_counts, key=lambda msg_cls: -self.hit_counts[msg_cls])
+        self._ranks = {msg_cls.__name__: rank for rank, msg_cls in enumerate(ordered)}
+        self._builds_since_refresh = 0
+
+    def ambiguous_pairs(self):
+        """
+        Return the pairs of loaded message types whose constant fields don't rule out some data being a message of
+        both types (see DispatchIndex.may_overlap).
+        """
+        if self.cache is None:
+            resolve = self._resolve_entry
+            return [(resolve(cls_a), resolve(cls_b)) for cls_a, cls_b in self.dispatch_index.ambiguous_pairs()]
+
+        classes = self.message_classes
+        digest = self._pairs_digest(classes)
+        pairs = self.cache.get_ambiguous_pairs(digest)
+        if pairs is None:
+            # The dispatch index may still hold placeholders of classes that weren't built when it was created.
+            index = {msg_cls.__name__: i for i, msg_cls in enumerate(classes)}
+            pairs = [
+                (index[cls_a.__name__], index[cls_b.__name__]) for cls_a, cls_b in self.dispatch_index.ambiguous_pairs()
+            ]
+            self.cache.put_ambiguous_pairs(digest, pairs)
+            self.cache.save()
+        return [(classes[i], classes[j]) for i, j in pairs]
 
     def build_message(self, data):
+        """
+        Constructs a message of whichever loaded message type the data (a formatted value, bytes-like object or
+        integer) is. Only the message classes whose constant fields match the data are tried (see DispatchIndex).
+        Candidates are also skipped without decoding them if the data doesn't match the constant fields of the
+        contexts selected by their tagged unions. Once a message type matches, only the remaining candidates that
+        may overlap with it are tried, so an adaptive builder usually decodes a single candidate.
+
+        :raises: InvalidDataFormatException if the data is not a message of any loaded type.
+        :raises: MultipleMatchingMessageDefinitionsException if the data could be a message of more than one type.
+        """
+        frame = self._frame(data)
+        index = self.dispatch_index
         matches = []
         message = None
-        for msg_cls in self.message_classes:
+        partners = None
+        for entry in self._candidates(data, frame):
+            if partners is not None and entry not in partners:
+                continue
+            msg_cls = self._resolve_entry(entry)
+            if frame is not None and index.rules_out(msg_cls, frame[0]):
+                continue
             try:
                 msg = msg_cls.from_data(data)
             except InvalidDataFormatException as e:
@@ -157,13 +490,19 @@ class MessageBuilder:
             else:
                 matches.append(msg_cls)
                 message = msg
+                if partners is None:
+                    partners = index.partners(entry)
+                    if not partners:
+                        break
 
         if len(matches) == 0:
-            msg_list = "\n".join([f"\t- {msg_cls.__name__}" for msg_cls in self.message_classes])
+            msg_list = "\n".join([f"\t- {entry.__name__}" for entry in index.message_classes])
             raise InvalidDataFormatException(
                 f"Data '{data}' could not be resolved to any of the following message types:\n{msg_list}"
             )
         elif len(matches) == 1:
+            if self.adaptive:
+                self._record_hit(matches[0])
             return message
         else:
             msg_list = "\n".join([f"\t- {msg_cls.__name__}" for msg_cls in matches])
@@ -0,0 +1,73 @@
+"""
+This module contains the MessagePool class which recycles message objects of one type when decoding.
+
+Created on Oct 19, 2026
+
+@author: smalb
+"""
+
+from pymessagelib._exceptions import InvalidDataFormatException
+
+
+class MessagePool:
+    """
+    A MessagePool keeps a free list of messages of a single type. Decoding with the pool reuses a released message
+    (see Message.decode_into) instead of constructing a new one, so decode loops don't allocate new Message and
+    Field objects for every message. For example:
+
+    pool = MessagePool(WRITE_REGISTER_REQUEST)
+    for data in frames:
+        msg = pool.decode(data)
+        handle(msg)
+        pool.release(msg)
+
+    A message must not be used after it is released. At most `max_size` messages are kept in the free list;
+    messages released to a full pool are left to be garbage collected.
+    """
+
+    def __init__(self, msg_cls, max_size=64):
+        """Constructs an empty pool for messages of the given class."""
+        self._cls = msg_cls
+        self._max_size = max_size
+        self._free = []
+
+    @property
+    def message_class(self):
+        """Return the message class of this pool."""
+        return self._cls
+
+    def decode(self, data, verify=False):
+        """
+        Return a message decoded from the data, reusing a released message if there is one.
+
+        :raises: InvalidDataFormatException if the data does not have the format of the message
+        :raises: AutoUpdateMismatchException if verify is True and the data has incorrect auto-update values.
+        """
+        if not self._free:
+            return self._cls.from_data(data, verify)
+        msg = self._free.pop()
+        try:
+            return msg.decode_into(data, verify)
+        except InvalidDataFormatException:
+            # The message will be decoded into again before it's used.
+            self._free.append(msg)
+            raise
+
+    def release(self, msg):
+        """
+        Return a message to the pool so it can be reused by a later decode.
+
+        :raises: InvalidDataFormatException if the message is not of the pool's message class.
+        """
+        if type(msg) is not self._cls:
+            raise InvalidDataFormatException(f"Cannot release {msg!r} to a pool of {self._cls.__name__} messages.")
+        if len(self._free) < self._max_size:
+            self._free.append(msg)
+
+    def __len__(self):
+        """Return the number of released messages that are ready to be reused."""
+        return len(self._free)
+
+    def __repr__(self):
+        """Return a short string representation of the pool"""
+        return f"<{type(self).__name__} for {self._cls.__name__} ({len(self)} free)>"
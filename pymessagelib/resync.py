@@ -0,0 +1,137 @@
+"""
+This module contains the Resynchronizer class which finds the frames in a byte stream that may contain garbage
+and dropped bytes.
+
+Created on Oct 19, 2026
+
+@author: smalb
+"""
+
+from collections import namedtuple
+
+from pymessagelib.dispatch import DispatchIndex
+
+Frame = namedtuple("Frame", ["offset", "msg_classes", "data"])
+Frame.__doc__ = """A frame found in a stream: its offset, the message classes it matches and its bytes."""
+
+Skipped = namedtuple("Skipped", ["start", "end"])
+Skipped.__doc__ = """A range of bytes in a stream that isn't part of any frame."""
+
+
+class Resynchronizer:
+    """
+    A Resynchronizer splits a byte stream into frames of fixed-length message classes and reports the ranges of
+    bytes in between that don't belong to any frame. Frames are in the same form as bytes(message). For example:
+
+    for item in Resynchronizer(builder.message_classes).scan(data):
+        if isinstance(item, Frame):
+            msg = item.msg_classes[0].from_data(item.data)
+        else:
+            log.warning(f"Skipped bytes {item.start} to {item.end}")
+
+    After a frame, the next frame is expected to start immediately. If it doesn't, the stream is searched for the
+    sync patterns of the message classes. The sync pattern of a class is the longest run of bytes that is
+    entirely made of constant fields (such as the bytes of a `mid` field), so candidate frame starts can be found
+    with `bytes.find` instead of trying to decode at every offset. Each candidate is confirmed with a
+    DispatchIndex. Message classes without a constant byte can only be found directly after another frame.
+
+    When frames of different lengths match at the same offset, the longest frame is taken. The frame lists every
+    class of that length that matched. If verify is True, the auto-update fields of a frame must also be correct
+    (which makes checksums part of the confirmation).
+
+    Messages with variable-length fields are ignored.
+    """
+
+    def __init__(self, message_classes, verify=False):
+        """Constructs a Resynchronizer for the message classes."""
+        self.message_classes = tuple(cls for cls in message_classes if cls.layout.is_fixed)
+        self.verify = verify
+        self._index = DispatchIndex(self.message_classes)
+        self._bit_lengths = self._index.bit_lengths
+        # (pattern bytes, offset in the frame) pairs of all classes with sync patterns
+        self.sync_patterns = sorted({Resynchronizer.sync_pattern(cls) for cls in self.message_classes} - {None})
+
+    @staticmethod
+    def sync_pattern(msg_cls):
+        """
+        Return the sync pattern of a message class as a tuple of (pattern bytes, offset in the frame), or None if
+        no byte of the frame is entirely made of constant fields.
+        """
+        layout = msg_cls.layout
+        size = (msg_cls.bit_length + 7) // 8
+        mask = layout.constant_mask | ((1 << size * 8) - 1) ^ ((1 << msg_cls.bit_length) - 1)
+        mask_bytes = mask.to_bytes(size, "big")
+        value_bytes = layout.constant_value.to_bytes(size, "big")
+
+        best = None
+        start = None
+        for i in range(size + 1):
+            if i < size and mask_bytes[i] == 0xFF:
+                if start is None:
+                    start = i
+            elif start is not None:
+                if best is None or i - start > best[1] - best[0]:
+                    best = (start, i)
+                start = None
+        if best is None:
+            return None
+        return value_bytes[best[0] : best[1]], best[0]
+
+    def _match(self, data, offset):
+        """Return the frame starting at the offset, or None if no message class matches there."""
+        available = len(data) - offset
+        for bit_length in self._bit_lengths:
+            size = (bit_length + 7) // 8
+            if size > available:
+                continue
+            frame = data[offset : offset + size]
+            value = int.from_bytes(frame, "big")
+            if value >> bit_length:
+                continue
+            classes = self._index.match(value, bit_length)
+            if self.verify:
+                classes = [msg_cls for msg_cls in classes if not next(msg_cls.verify_frames([value]), None)]
+            if classes:
+                return Frame(offset, tuple(classes), bytes(frame))
+        return None
+
+    def scan(self, data, start=0):
+        """
+        Yields a Frame for every frame in the data (a bytes-like object that supports `find`, such as bytes,
+        bytearray or mmap) and a Skipped range for the bytes between frames, in stream order. Bytes at the end that
+        don't form a complete frame are reported as skipped.
+        """
+        size = len(data)
+        hits = [-1] * len(self.sync_patterns)  # the last occurrence of each pattern found (None if there are no more)
+        position = start
+        skip_start = None
+        while position < size:
+            frame = self._match(data, position)
+            if frame is not None:
+                if skip_start is not None:
+                    yield Skipped(skip_start, position)
+                    skip_start = None
+                yield frame
+                position += len(frame.data)
+                continue
+
+            if skip_start is None:
+                skip_start = position
+
+            # Move to the nearest candidate frame start after this position.
+            candidate = size
+            for i, (pattern, offset) in enumerate(self.sync_patterns):
+                hit = hits[i]
+                if hit is not None and hit - offset <= position:
+                    found = data.find(pattern, position + 1 + offset)
+                    hit = hits[i] = None if found < 0 else found
+                if hit is not None:
+                    candidate = min(candidate, hit - offset)
+            position = candidate
+
+        if skip_start is not None:
+            yield Skipped(skip_start, size)
+
+    def __repr__(self):
+        """Return a short string representation of the resynchronizer"""
+        return f"<{type(self).__name__} ({len(self.message_classes)} message classes)>"
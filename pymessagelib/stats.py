@@ -0,0 +1,215 @@
+"""
+This module contains the Stats class which collects counters and latencies of the messages of a MessageBuilder.
+
+Created on Oct 19, 2026
+
+@author: smalb
+"""
+
+import threading
+from time import perf_counter_ns
+
+from pymessagelib.message import Message
+from pymessagelib._exceptions import InvalidDataFormatException, MultipleMatchingMessageDefinitionsException
+
+
+class Stats:
+    """
+    Stats collects counters and timings for the message classes of a MessageBuilder while they're enabled (see
+    MessageBuilder.enable_stats). For example:
+
+    stats = builder.enable_stats()
+    ...
+    stats.snapshot()["messages"]["WRITE_REGISTER_REQUEST"]["decoded"]
+
+    Instrumentation is installed by wrapping methods of the builder's message classes (and the builder's
+    build_message method) and is removed again when stats are disabled, so it costs nothing while stats are off.
+    The following is collected:
+
+        - messages: per message type, the number of messages decoded (from_data, including nested messages), the
+          number of decodes that failed because the data wasn't a message of the type and the number of messages
+          encoded (bytes(message) and pack_into, which is used by encode_many).
+        - build_message: the number of messages built, the number of calls whose data matched no type or more
+          than one type, and the number of candidate types whose decode matched or mismatched.
+        - time_s: seconds spent checking data against message formats (validation), running auto-update
+          functions (auto_update) and propagating updates from nested messages to their ancestors, excluding the
+          auto-update functions of the ancestors (nesting).
+        - latency_us: histograms of the latencies of decode, encode and build_message. Each histogram maps an
+          upper bound in microseconds (a power of 2) to the number of calls that took less than the bound and at
+          least half of it.
+
+    Counters are not locked, so they may miss some events when messages are used by several threads at once.
+    """
+
+    _PHASES = ("validation", "auto_update", "nesting")
+    _OPERATIONS = ("decode", "encode", "build_message")
+
+    def __init__(self):
+        """Constructs an empty Stats object."""
+        self._local = threading.local()  # holds the decoding depth and build_message matches of each thread
+        self._messages = {}  # maps message type names to [decoded, decode errors, encoded]
+        self._build = dict.fromkeys(("built", "unresolved", "ambiguous", "matches", "mismatches"), 0)
+        self._times = dict.fromkeys(Stats._PHASES, 0)  # nanoseconds
+        self._latencies = {operation: {} for operation in Stats._OPERATIONS}
+
+    def reset(self):
+        """
+        Set all counters, times and histograms to zero. They're reset in place because the installed wrappers hold
+        on to them.
+        """
+        for counters in self._messages.values():
+            counters[:] = [0, 0, 0]
+        for counts in (self._build, self._times):
+            counts.update(dict.fromkeys(counts, 0))
+        for histogram in self._latencies.values():
+            histogram.clear()
+
+    def _counters(self, msg_cls):
+        """Return the [decoded, decode errors, encoded] counters of a message type."""
+        counters = self._messages.get(msg_cls.__name__)
+        if counters is None:
+            counters = self._messages[msg_cls.__name__] = [0, 0, 0]
+        return counters
+
+    def _record_latency(self, operation, elapsed_ns):
+        """Add a latency in nanoseconds to the histogram of the operation."""
+        histogram = self._latencies[operation]
+        micros = elapsed_ns // 1000
+        bound = 1 << micros.bit_length()
+        histogram[bound] = histogram.get(bound, 0) + 1
+
+    def snapshot(self):
+        """Return all counters, times and histograms as a dictionary of plain values (see Stats)."""
+        return {
+            "messages": {
+                name: {"decoded": decoded, "decode_errors": errors, "encoded": encoded}
+                for name, (decoded, errors, encoded) in self._messages.items()
+            },
+            "build_message": dict(self._build),
+            "time_s": {phase: elapsed / 1e9 for phase, elapsed in self._times.items()},
+            "latency_us": {
+                operation: dict(sorted(histogram.items())) for operation, histogram in self._latencies.items()
+            },
+        }
+
+    def instrument(self, msg_cls):
+        """
+        Wrap the methods of a message class so they're counted and timed. The methods the class has when it's
+        instrumented are wrapped, so other wrappers (such as those of Tracing) can be installed first.
+        """
+        stats = self
+        decode = msg_cls.from_data.__func__
+        split_data = msg_cls._split_data.__func__
+        update_auto_fields = msg_cls._update_auto_fields
+        update = msg_cls.update_fields
+        counters = self._counters(msg_cls)
+        times = self._times
+        local = self._local
+
+        def from_data(cls, *args, **kwargs):
+            """Message.from_data, counted and timed."""
+            depth = getattr(local, "decoding", 0)
+            local.decoding = depth + 1
+            start = perf_counter_ns()
+            try:
+                msg = decode(cls, *args, **kwargs)
+            except InvalidDataFormatException:
+                counters[1] += 1
+                if not depth:
+                    local.mismatches = getattr(local, "mismatches", 0) + 1
+                raise
+            finally:
+                local.decoding = depth
+            counters[0] += 1
+            if not depth:
+                local.matches = getattr(local, "matches", 0) + 1
+            stats._record_latency("decode", perf_counter_ns() - start)
+            return msg
+
+        def _split_data(cls, data):
+            """Message._split_data, timed as validation."""
+            start = perf_counter_ns()
+            try:
+                return split_data(cls, data)
+            finally:
+                times["validation"] += perf_counter_ns() - start
+
+        def _update_auto_fields(self, changed=None):
+            """Message._update_auto_fields, timed as auto_update."""
+            start = perf_counter_ns()
+            try:
+                update_auto_fields(self, changed)
+            finally:
+                times["auto_update"] += perf_counter_ns() - start
+
+        def update_fields(self, changed=None):
+            """Message.update_fields, with the propagation to ancestors timed as nesting."""
+            if self._parent_field is None or getattr(local, "nesting", False):
+                return update(self, changed)
+            local.nesting = True
+            start = perf_counter_ns()
+            auto_update = times["auto_update"]
+            try:
+                update(self, changed)
+            finally:
+                local.nesting = False
+                # The auto-update functions run while propagating are timed as auto_update.
+                times["nesting"] += perf_counter_ns() - start - (times["auto_update"] - auto_update)
+
+        def encoded(method):
+            """Wrap an encoding method so it's counted and timed."""
+
+            def encode(self, *args, **kwargs):
+                """An encoding method of Message, counted and timed as encode."""
+                start = perf_counter_ns()
+                result = method(self, *args, **kwargs)
+                counters[2] += 1
+                stats._record_latency("encode", perf_counter_ns() - start)
+                return result
+
+            return encode
+
+        msg_cls.from_data = classmethod(from_data)
+        msg_cls._split_data = classmethod(_split_data)
+        msg_cls._update_auto_fields = _update_auto_fields
+        msg_cls.update_fields = update_fields
+        msg_cls.__bytes__ = encoded(msg_cls.__bytes__)
+        msg_cls.pack_into = encoded(msg_cls.pack_into)
+
+    @staticmethod
+    def uninstrument(msg_cls):
+        """Remove the wrappers installed by Stats.instrument from a message class."""
+        for name in ("from_data", "_split_data", "_update_auto_fields", "update_fields", "__bytes__", "pack_into"):
+            if name in msg_cls.__dict__:
+                delattr(msg_cls, name)
+
+    def instrument_builder(self, builder):
+        """Wrap the build_message method of a builder so it's counted and timed."""
+        build = self._build
+        local = self._local
+        build_message = builder.build_message
+
+        def build_message_with_stats(data):
+            """MessageBuilder.build_message, counted and timed."""
+            local.matches = local.mismatches = 0
+            start = perf_counter_ns()
+            try:
+                msg = build_message(data)
+            except MultipleMatchingMessageDefinitionsException:
+                build["ambiguous"] += 1
+                raise
+            except InvalidDataFormatException:
+                build["unresolved"] += 1
+                raise
+            finally:
+                build["matches"] += local.matches
+                build["mismatches"] += local.mismatches
+            build["built"] += 1
+            self._record_latency("build_message", perf_counter_ns() - start)
+            return msg
+
+        builder.build_message = build_message_with_stats
+
+    def __repr__(self):
+        """Return a short string representation of the stats"""
+        return f"<{type(self).__name__} ({len(self._messages)} message types)>"
@@ -0,0 +1,252 @@
+"""
+This module contains the MessageTemplate class which encodes messages of one type directly to bytes.
+
+Created on Oct 19, 2026
+
+@author: smalb
+"""
+
+from pymessagelib.field import Field
+from pymessagelib._exceptions import (
+    ContextDataMismatchException,
+    InvalidDataFormatException,
+    InvalidFieldException,
+    InvalidFieldDataException,
+    InvalidFormatException,
+    MissingFieldDataException,
+)
+
+
+class MessageTemplate:
+    """
+    A MessageTemplate encodes messages of a single type without constructing Message or Field objects. It is
+    intended for sending the same type of message many times when only one or two fields change between sends.
+
+    When the template is created, the bits of all constant fields and all default values are combined into a
+    single integer, and auto-update fields that only depend on those values are calculated. Encoding then only
+    clears and sets the bits of the fields that are given, and recalculates the auto-update fields that depend
+    on them. For example:
+
+    template = WRITE_REGISTER_REQUEST.template(addr="x60000001")
+    template.encode(data="x80000000")  # -> bytes
+    template.encode(addr="x60000002", data=0x80000000)
+
+    Values can be formatted strings, integers or messages (for nested fields). As with Message, the data of nested
+    fields must be compatible with their contexts (including contexts selected by tagged unions). The checks are
+    compiled when the template is created, so encoding only compares the bits of the nested fields that may have
+    changed with the constant fields of their contexts.
+    """
+
+    def __init__(self, msg_cls, **defaults):
+        """
+        Constructs a template for the message class with default values for some writable fields.
+
+        :raises: InvalidFormatException if the message has variable-length fields.
+        :raises: ContextDataMismatchException if the default value of a nested field is not compatible with its
+            context.
+        """
+        if not msg_cls.layout.is_fixed:
+            raise InvalidFormatException(f"Templates are not supported for variable-length message {msg_cls.__name__}.")
+
+        self._cls = msg_cls
+        self._layout = msg_cls.layout
+        self._size = (msg_cls.bit_length + 7) // 8
+        self._writable = tuple(name for name, field in msg_cls.format.items() if field.is_writable)
+        self._required = frozenset(name for name in self._writable if name not in defaults)
+        self._plans = {}  # maps sets of given field names to (affected auto fields, mask of bits to clear, checks)
+        self._checks = MessageTemplate._field_checks(msg_cls)
+
+        # Start from the constant fields and default values. Auto-update fields that can be calculated from them
+        # are calculated now.
+        self._values = {}
+        for name, field in msg_cls.format.items():
+            if not field.is_writable and not field.is_auto_updated:
+                self._values[name] = int(field)
+        self._values.update(self._convert(defaults))
+        known = [name for name in msg_cls.update_order if not self._affected_by(name, self._required)]
+        msg_cls._compute_auto_fields(self._values, known)
+
+        self._value = 0
+        for name, value in self._values.items():
+            self._value |= value << self._layout.spans[name][0]
+
+        # Nested fields whose data and discriminator are known now are only checked once, here.
+        unknown = self._required.union(name for name in msg_cls.update_order if name not in known)
+        self._check_contexts(
+            self._value, [check for check in self._checks if check[0] not in unknown and check[1] not in unknown]
+        )
+
+    @property
+    def message_class(self):
+        """Return the message class this template encodes."""
+        return self._cls
+
+    def _affected_by(self, name, changed):
+        """Return True if the auto-update field depends (directly or indirectly) on any of the changed fields."""
+        for arg in self._cls.format[name].updater_args:
+            if arg in changed:
+                return True
+            if self._cls.format[arg].is_auto_updated and self._affected_by(arg, changed):
+                return True
+        return False
+
+    def _convert(self, values):
+        """
+        Convert a dictionary of field values to integers.
+
+        :raises: InvalidFieldException if a value is given for a field that doesn't exist or isn't writable.
+        :raises: InvalidFieldDataException if a value is not valid for its field.
+        """
+        from pymessagelib.message import Message
+
+        converted = {}
+        for name, value in values.items():
+            field = self._cls.format.get(name)
+            if field is None:
+                raise InvalidFieldException(f"'{name}' is not a valid field in the {self._cls.__name__} message.")
+            if not field.is_writable:
+                raise InvalidFieldException(f"Cannot specify a value for read-only field '{name}'.")
+            if isinstance(value, Message):
+                value = int(value) if len(value) == len(field) else -1
+            elif isinstance(value, str):
+                value = int(value[1:], Field.get_format(value).value) if field.value_is_valid(value) else -1
+            if not isinstance(value, int) or not 0 <= value < 1 << len(field):
+                raise InvalidFieldDataException(
+                    f"'{values[name]}' is not a valid value for the field '{name}' in message '{self._cls.__name__}'"
+                )
+            converted[name] = value
+        return converted
+
+    @staticmethod
+    def _field_checks(msg_cls):
+        """
+        Return a (field name, discriminator name, check) tuple for each field of a fixed-length message class that
+        has a context or a tagged union. A check is a tuple of (field shift, field mask, discriminator shift,
+        discriminator mask, {discriminator value: data checks}, default data checks). Fields with a fixed context
+        have no discriminator and their context is the default.
+        """
+        layout = msg_cls.layout
+        checks = []
+        for name, field in msg_cls.format.items():
+            if name in msg_cls.unions:
+                discriminator, table, default = msg_cls.unions[name]
+                contexts = {key: MessageTemplate._data_checks(context) for key, context in table.items()}
+                discriminator_span = layout.spans[discriminator]
+            elif field.context is not None:
+                discriminator, contexts, default, discriminator_span = None, {}, field.context, (0, 0)
+            else:
+                continue
+            check = (*layout.spans[name], *discriminator_span, contexts, MessageTemplate._data_checks(default))
+            checks.append((name, discriminator, check))
+        return tuple(checks)
+
+    @staticmethod
+    def _data_checks(context):
+        """
+        Return the checks Message.from_data makes on the data of a field with the context: None if there is no
+        context, the context itself if it has variable-length fields (the data is then decoded) or a tuple of the
+        mask and value of its constant fields and the checks of its own nested fields.
+        """
+        if context is None:
+            return None
+        if not context.layout.is_fixed:
+            return context
+        nested = tuple(check for _, _, check in MessageTemplate._field_checks(context))
+        return (context.layout.constant_mask, context.layout.constant_value, nested)
+
+    @staticmethod
+    def _passes(check, value):
+        """Return True if the data of a nested field in the integer value is compatible with its selected context."""
+        field_shift, field_mask, discriminator_shift, discriminator_mask, contexts, default = check
+        data_checks = contexts.get(value >> discriminator_shift & discriminator_mask, default)
+        if data_checks is None:
+            return True
+        data = value >> field_shift & field_mask
+        if isinstance(data_checks, tuple):
+            mask, constant_value, nested = data_checks
+            return data & mask == constant_value and all(MessageTemplate._passes(check, data) for check in nested)
+        try:
+            data_checks.from_data(f"b{data:0{field_mask.bit_length()}b}")
+        except InvalidDataFormatException:
+            return False
+        return True
+
+    def _check_contexts(self, value, checks):
+        """
+        Check the data of nested fields in the integer value of a message.
+
+        :raises: ContextDataMismatchException if the data of a field is not compatible with its context.
+        """
+        for name, _, check in checks:
+            if not MessageTemplate._passes(check, value):
+                raise ContextDataMismatchException(
+                    f"The data of the field '{name}' in message '{self._cls.__name__}' is not compatible with its "
+                    "context"
+                )
+
+    def _plan(self, names):
+        """
+        Return the auto-update fields to recalculate, the bits to clear and the nested fields to check when the
+        named fields are given.
+        """
+        plan = self._plans.get(names)
+        if plan is None:
+            missing = self._required - names
+            if missing:
+                raise MissingFieldDataException(
+                    f"A value must be provided for the '{sorted(missing)[0]}' field when encoding with this template"
+                )
+            auto_fields = tuple(name for name in self._cls.update_order if self._affected_by(name, names))
+            clear_mask = 0
+            for name in tuple(names) + auto_fields:
+                shift, mask = self._layout.spans[name]
+                clear_mask |= mask << shift
+            changed = names.union(auto_fields)
+            checks = tuple(check for check in self._checks if check[0] in changed or check[1] in changed)
+            plan = self._plans[names] = (auto_fields, ~clear_mask, checks)
+        return plan
+
+    def encode_int(self, **values):
+        """
+        Return the integer value of a message with the given field values.
+
+        :raises: ContextDataMismatchException if the data of a nested field is not compatible with its context.
+        :raises: InvalidFieldDataException if an auto-update function returns a value that does not fit in its field.
+        """
+        converted = self._convert(values)
+        auto_fields, clear_mask, checks = self._plan(frozenset(converted))
+        if auto_fields:
+            field_values = dict(self._values)
+            field_values.update(converted)
+            self._cls._compute_auto_fields(field_values, auto_fields)
+            converted.update((name, field_values[name]) for name in auto_fields)
+
+        value = self._value & clear_mask
+        spans = self._layout.spans
+        for name, field_value in converted.items():
+            value |= field_value << spans[name][0]
+        if checks:
+            self._check_contexts(value, checks)
+        return value
+
+    def encode(self, **values):
+        """Return the bytes of a message with the given field values, in the same form as bytes(message)."""
+        return self.encode_int(**values).to_bytes(self._size, "big")
+
+    def pack_into(self, buffer, offset=0, **values):
+        """
+        Write a message with the given field values into a writable buffer at the offset, in the same form as
+        bytes(message). Returns the number of bytes written.
+
+        :raises: ValueError if the message doesn't fit in the buffer at the offset.
+        """
+        if offset < 0 or offset + self._size > len(buffer):
+            raise ValueError(
+                f"A {self._size}-byte message does not fit in a {len(buffer)}-byte buffer at offset {offset}."
+            )
+        buffer[offset : offset + self._size] = self.encode(**values)
+        return self._size
+
+    def __repr__(self):
+        """Return a short string representation of the template"""
+        return f"<{type(self).__name__} for {self._cls.__name__}>"
@@ -0,0 +1,198 @@
+"""
+This module contains the Tracer class, the base class of objects that are notified of what the messages of a
+MessageBuilder do, and the Tracing class which installs them.
+
+Created on Oct 19, 2026
+
+@author: smalb
+"""
+
+import threading
+from time import perf_counter_ns
+
+from pymessagelib._exceptions import InvalidDataFormatException
+
+
+class Tracer:
+    """
+    Tracers are notified of field writes, auto-update functions, decodes and build_message dispatch decisions of the
+    messages of a MessageBuilder they're added to (see MessageBuilder.add_tracer). For example, to find slow
+    auto-update functions:
+
+    class SlowUpdates(Tracer):
+        def auto_updated(self, msg, name, inputs, value, elapsed_ns):
+            if elapsed_ns > 100_000:
+                print(f"{type(msg).__name__}.{name} took {elapsed_ns / 1000} us with {inputs}")
+
+    builder.add_tracer(SlowUpdates())
+
+    Subclasses only override the methods of the events they're interested in. Events that no tracer overrides are
+    not traced at all, so they cost nothing. Objects that don't inherit from Tracer can also be added; only the
+    methods they have are called.
+
+    Tracers are called by the thread using the message, so they should be thread-safe if messages are used by
+    several threads.
+    """
+
+    def field_written(self, msg, name, value):
+        """
+        Called after a value was written to a writable field of a message, through the property of the field, the
+        field itself (Field.value, bit or record assignment) or the constructor. The auto-update fields that depend
+        on it may not have been updated yet. Fields written by decoding are not reported.
+        """
+
+    def auto_updated(self, msg, name, inputs, value, elapsed_ns):
+        """
+        Called after the auto-update function of a field was evaluated. The inputs map the names of the fields the
+        function depends on to the arguments they were given as, and elapsed_ns is the time the function took.
+        """
+
+    def decoded(self, msg_cls, data, msg, error, elapsed_ns):
+        """
+        Called after data was decoded as a message of type msg_cls (by from_data). If the data isn't a message of
+        the type, msg is None and error is the InvalidDataFormatException that is raised.
+        """
+
+    def dispatched(self, data, attempts, msg, error, elapsed_ns):
+        """
+        Called after build_message has decided which type the data is. The attempts are (message class, matched)
+        pairs of the candidate types that were decoded, in the order they were tried. If no type or more than one
+        type matched, msg is None and error is the exception that is raised.
+        """
+
+
+class Tracing:
+    """
+    Tracing installs tracers by wrapping the methods of message classes and of a MessageBuilder. Only the methods
+    needed by the events the tracers handle are wrapped.
+    """
+
+    _EVENTS = ("field_written", "auto_updated", "decoded", "dispatched")
+
+    def __init__(self, tracers):
+        """Constructs a Tracing object calling the given tracers, in order."""
+        self.tracers = tuple(tracers)
+        self._callbacks = {event: self._event_callbacks(event) for event in Tracing._EVENTS}
+        self._local = threading.local()  # holds the decoding depth and build_message attempts of each thread
+
+    def _event_callbacks(self, event):
+        """Return the methods of the tracers that handle an event. Methods inherited from Tracer do nothing."""
+        callbacks = []
+        for tracer in self.tracers:
+            method = getattr(type(tracer), event, None)
+            if method is not None and method is not getattr(Tracer, event):
+                callbacks.append(getattr(tracer, event))
+        return tuple(callbacks)
+
+    def instrument(self, msg_cls):
+        """Wrap the methods of a message class that are needed to trace the events the tracers handle."""
+        callbacks = self._callbacks
+
+        if callbacks["field_written"]:
+            msg_cls._field_written = self._traced_field_written()
+
+        if callbacks["auto_updated"]:
+            msg_cls._evaluate_updater = self._traced_evaluate_updater(msg_cls._evaluate_updater)
+
+        # from_data also tracks decoding, so the fields written while a message is decoded aren't reported.
+        if callbacks["decoded"] or callbacks["dispatched"] or callbacks["field_written"]:
+            msg_cls.from_data = classmethod(self._traced_from_data(msg_cls.from_data.__func__))
+
+    @staticmethod
+    def uninstrument(msg_cls):
+        """Remove the wrappers installed by Tracing.instrument from a message class."""
+        for name in ("_field_written", "_evaluate_updater", "from_data"):
+            if name in msg_cls.__dict__:
+                delattr(msg_cls, name)
+
+    def _traced_field_written(self):
+        """Return a _field_written function notifying the tracers, except while a message is being decoded."""
+        callbacks = self._callbacks["field_written"]
+        local = self._local
+
+        def _field_written(self, name, value):
+            """Message._field_written, traced."""
+            if getattr(local, "decoding", 0):
+                return
+            for callback in callbacks:
+                callback(self, name, value)
+
+        return _field_written
+
+    def _traced_evaluate_updater(self, evaluate):
+        """Return an _evaluate_updater function calling evaluate, notifying the tracers after each auto-update function."""
+        callbacks = self._callbacks["auto_updated"]
+
+        def _evaluate_updater(self, field, args):
+            """Message._evaluate_updater, timed and traced."""
+            start = perf_counter_ns()
+            value = evaluate(self, field, args)
+            elapsed_ns = perf_counter_ns() - start
+            inputs = dict(zip(field.updater_args, args))
+            for callback in callbacks:
+                callback(self, field.name, inputs, value, elapsed_ns)
+            return value
+
+        return _evaluate_updater
+
+    def _traced_from_data(self, decode):
+        """Return a from_data function calling decode, notifying the tracers and recording build_message attempts."""
+        callbacks = self._callbacks["decoded"]
+        local = self._local
+
+        def from_data(cls, data, *args, **kwargs):
+            """Message.from_data, traced."""
+            depth = getattr(local, "decoding", 0)
+            local.decoding = depth + 1
+            start = perf_counter_ns()
+            try:
+                msg = decode(cls, data, *args, **kwargs)
+            except InvalidDataFormatException as e:
+                elapsed_ns = perf_counter_ns() - start
+                if not depth and getattr(local, "attempts", None) is not None:
+                    local.attempts.append((cls, False))
+                for callback in callbacks:
+                    callback(cls, data, None, e, elapsed_ns)
+                raise
+            finally:
+                local.decoding = depth
+            elapsed_ns = perf_counter_ns() - start
+            if not depth and getattr(local, "attempts", None) is not None:
+                local.attempts.append((cls, True))
+            for callback in callbacks:
+                callback(cls, data, msg, None, elapsed_ns)
+            return msg
+
+        return from_data
+
+    def instrument_builder(self, builder):
+        """Wrap the build_message method of a builder if the tracers handle dispatch decisions."""
+        callbacks = self._callbacks["dispatched"]
+        if not callbacks:
+            return
+        local = self._local
+        build_message = builder.build_message
+
+        def build_message_traced(data):
+            """MessageBuilder.build_message, traced."""
+            attempts = local.attempts = []
+            start = perf_counter_ns()
+            try:
+                msg = build_message(data)
+            except Exception as e:
+                elapsed_ns = perf_counter_ns() - start
+                for callback in callbacks:
+                    callback(data, attempts, None, e, elapsed_ns)
+                raise
+            finally:
+                local.attempts = None
+            elapsed_ns = perf_counter_ns() - start
+            for callback in callbacks:
+                callback(data, attempts, msg, None, elapsed_ns)
+            return msg
+
+        builder.build_message = build_message_traced
+
+    def __repr__(self):
+        """Return a short string representation of the tracing"""
+        return f"<{type(self).__name__} ({len(self.tracers)} tracers)>"
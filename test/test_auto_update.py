@@ -0,0 +1,110 @@
+import unittest
+from pymessagelib import (
+    MessageBuilder,
+    Field,
+    Nibbles,
+    Byte,
+    Bytes,
+    Bits,
+    auto_update,
+    InvalidFormatException,
+    InvalidFieldException,
+    InvalidFieldDataException,
+)
+
+
+@auto_update(takes=int)
+def calc_or(addr, data):
+    return addr | data
+
+
+@auto_update(takes=bytes)
+def calc_length(addr, data):
+    return len(addr + data)
+
+
+def calc_xor(addr: int, data: "int"):
+    return f"x{addr ^ data:X}"
+
+
+def calc_parity(or_field: str):
+    return or_field.count("1") % 2
+
+
+class TestAutoUpdate(unittest.TestCase):
+    def setUp(self):
+        self.builder = MessageBuilder(
+            {
+                "FAST_REQUEST": {
+                    "mid": Nibbles(4, value="x0016"),
+                    "length": Byte(value=calc_length),
+                    "or_field": Bytes(4, value=calc_or),
+                    "xor_field": Bytes(4, value=calc_xor),
+                    "parity": Bits(2, value=calc_parity),
+                    "addr": Bytes(4),
+                    "data": Bytes(4),
+                }
+            }
+        )
+
+    def testArgumentKinds(self):
+        FAST_REQUEST = self.builder.FAST_REQUEST
+        self.assertEqual(FAST_REQUEST.format["or_field"].updater_arg_kinds, (int, int))
+        self.assertEqual(FAST_REQUEST.format["length"].updater_arg_kinds, (bytes, bytes))
+        self.assertEqual(FAST_REQUEST.format["xor_field"].updater_arg_kinds, (int, int))
+        self.assertEqual(FAST_REQUEST.format["parity"].updater_arg_kinds, (str,))
+        self.assertEqual(FAST_REQUEST.format["parity"].updater_args, ("or_field",))
+
+    def testValues(self):
+        msg = self.builder.FAST_REQUEST(addr="x60000001", data="x80000000")
+        self.assertEqual(msg.length, "x08")
+        self.assertEqual(msg.or_field, "xE0000001")
+        self.assertEqual(msg.xor_field, "xE0000001")
+        self.assertEqual(msg.parity, "b00")
+        msg.addr = "x60000003"
+        self.assertEqual(msg.or_field, "xE0000003")
+        self.assertEqual(msg.parity, "b01")
+
+    def testUpdateOrder(self):
+        self.assertLess(
+            self.builder.FAST_REQUEST.update_order.index("or_field"),
+            self.builder.FAST_REQUEST.update_order.index("parity"),
+        )
+
+    def testReturnedIntegerTooLarge(self):
+        builder = MessageBuilder({"OVERFLOW": {"a": Byte(), "b": Byte(value=auto_update(takes=int)(lambda a: a << 8))}})
+        with self.assertRaises(InvalidFieldDataException):
+            builder.OVERFLOW(a="x01")
+
+    def testOutOfRangeValuesRaiseOnEveryPath(self):
+        builder = MessageBuilder(
+            {
+                "INT_OVERFLOW": {"a": Byte(), "b": Byte(value=auto_update(takes=int)(lambda a: a << 4))},
+                "STR_OVERFLOW": {"a": Byte(), "b": Byte(value=auto_update(takes=int)(lambda a: f"x{a:X}0"))},
+            }
+        )
+        for msg_cls in (builder.INT_OVERFLOW, builder.STR_OVERFLOW):
+            self.assertEqual(msg_cls(a="x0F").b, "xF0")
+            self.assertEqual(msg_cls.template().encode_int(a="x0F"), 0x0FF0)
+            self.assertEqual(msg_cls.from_data("x0F00", frozen=True), "x0FF0")
+            with self.assertRaises(InvalidFieldDataException):
+                msg_cls(a="x10")
+            with self.assertRaises(InvalidFieldDataException):
+                msg_cls.from_data("x1000")
+            with self.assertRaises(InvalidFieldDataException):
+                msg_cls.from_data("x1000", frozen=True)
+            with self.assertRaises(InvalidFieldDataException):
+                msg_cls.template().encode(a="x10")
+            with self.assertRaises(InvalidFieldDataException):
+                msg_cls.template(a="x10")
+
+    def testFieldArgumentsByDefault(self):
+        builder = MessageBuilder({"DEFAULT": {"a": Byte(), "b": Byte(value=lambda a: a.render())}})
+        self.assertEqual(builder.DEFAULT.format["b"].updater_arg_kinds, (Field,))
+        self.assertEqual(builder.DEFAULT(a="x12").b, "x12")
+
+    def testInvalidDeclarations(self):
+        with self.assertRaises(InvalidFormatException):
+            auto_update(takes=float)
+        with self.assertRaises(InvalidFieldException):
+            MessageBuilder({"UNKNOWN": {"a": Byte(), "b": Byte(value=lambda c: c)}})
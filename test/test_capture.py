@@ -0,0 +1,231 @@
+import os
+import tempfile
+import unittest
+from pymessagelib import (
+    MessageBuilder,
+    Nibbles,
+    Bytes,
+    TaggedUnion,
+    Capture,
+    InvalidFieldException,
+    InvalidFieldDataException,
+    InvalidFormatException,
+    InvalidDataFormatException,
+)
+from msg_definitions import msg_fmts, register_defs
+from test_message_variable_length import variable_defs
+
+
+class TestCapture(unittest.TestCase):
+    def setUp(self):
+        self.builder = MessageBuilder(msg_fmts)
+        self.builder.load_definitions(variable_defs)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "traffic.cap")
+
+        self.messages = []
+        for i in range(20):
+            self.messages.append(
+                self.builder.WRITE_REGISTER_REQUEST(addr=f"x6000000{i % 4}", data=f"x{i << 28 & 0xFFFFFFFF:08X}")
+            )
+            self.messages.append(self.builder.READ_REGISTER_REQUEST(addr=f"x6000000{i % 4}"))
+        self.messages.append(self.builder.WRITE_REGISTER_RESPONSE(success="x01"))
+        self.assertEqual(Capture.write(self.path, self.messages), 41)
+        self.capture = Capture(self.path)
+        self.addCleanup(self.capture.close)
+
+    def testFrames(self):
+        self.assertEqual(list(self.capture), [bytes(msg) for msg in self.messages])
+        offsets = [offset for offset, _ in self.capture.records()]
+        self.assertEqual(offsets[:3], [0, 16, 28])
+        self.assertEqual(self.capture.frame_at(16), bytes(self.messages[1]))
+        self.assertEqual(self.capture.size, 20 * (16 + 12) + 4 + 5)
+
+    def testWhere(self):
+        matches = list(self.capture.where(self.builder.WRITE_REGISTER_REQUEST, addr="x60000001"))
+        self.assertEqual(matches, [msg for msg in self.messages[0::2][:20] if msg.addr == "x60000001"])
+        self.assertEqual(len(matches), 5)
+
+        matches = list(
+            self.capture.where(self.builder.WRITE_REGISTER_REQUEST, addr=0x60000001, data=lambda v: v & 1 << 31)
+        )
+        self.assertEqual([msg.data for msg in matches], ["x90000000", "xD0000000"])
+
+        self.assertEqual(len(list(self.capture.where(self.builder.READ_REGISTER_REQUEST))), 20)
+        self.assertEqual(len(list(self.capture.where(self.builder.WRITE_REGISTER_RESPONSE))), 1)
+        # READ_REGISTER_REQUEST_V2 frames look like READ_REGISTER_REQUEST frames.
+        self.assertEqual(len(list(self.capture.where(self.builder.READ_REGISTER_REQUEST_V2))), 20)
+
+    def testPredicatesContradictingConstants(self):
+        self.assertEqual(list(self.capture.where(self.builder.WRITE_REGISTER_REQUEST, mid="x0015")), [])
+
+    def testMatchingDoesNotDecode(self):
+        matches = list(self.capture.matching(self.builder.READ_REGISTER_REQUEST, addr="x60000003"))
+        self.assertEqual(len(matches), 5)
+        offset, value = matches[0]
+        self.assertEqual(value, int(self.messages[7]))
+        self.assertEqual(self.capture.frame_at(offset), bytes(self.messages[7]))
+
+    def testInvalidQueries(self):
+        with self.assertRaises(InvalidFieldException):
+            list(self.capture.where(self.builder.WRITE_REGISTER_REQUEST, address="x60000001"))
+        with self.assertRaises(InvalidFieldDataException):
+            list(self.capture.where(self.builder.WRITE_REGISTER_REQUEST, addr="x160000001"))
+        with self.assertRaises(InvalidFormatException):
+            list(self.capture.where(self.builder.BLOCK_WRITE))
+
+    def testTruncatedCapture(self):
+        with open(self.path, "ab") as file:
+            file.write(b"\x00\x00\x00\x10\x00")
+        with Capture(self.path) as capture:
+            with self.assertRaises(InvalidDataFormatException):
+                list(capture)
+
+    def testEmptyCapture(self):
+        Capture.write(self.path, [])
+        with Capture(self.path) as capture:
+            self.assertEqual(list(capture), [])
+
+
+class TestCaptureIndex(unittest.TestCase):
+    def setUp(self):
+        self.builder = MessageBuilder(msg_fmts)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "traffic.cap")
+        self.requests = [
+            self.builder.WRITE_REGISTER_REQUEST(addr=f"x6000000{i % 5}", data=f"x{i:08X}") for i in range(50)
+        ]
+        Capture.write(self.path, self.requests)
+        self.capture = Capture(self.path)
+        self.addCleanup(self.capture.close)
+
+    def testLookup(self):
+        index = self.capture.build_index(self.builder.WRITE_REGISTER_REQUEST, "addr")
+        self.assertEqual(len(index), 50)
+        self.assertTrue(os.path.exists(self.capture.index_path(self.builder.WRITE_REGISTER_REQUEST, "addr")))
+        matches = self.capture.lookup(self.builder.WRITE_REGISTER_REQUEST, addr="x60000003")
+        self.assertEqual([msg.data for msg in matches], [f"x{i:08X}" for i in range(3, 50, 5)])
+        matches = self.capture.lookup(self.builder.WRITE_REGISTER_REQUEST, addr=0x60000003, data=lambda v: v > 40)
+        self.assertEqual([msg.data for msg in matches], ["x0000002B", "x00000030"])
+        self.assertEqual(self.capture.lookup(self.builder.WRITE_REGISTER_REQUEST, addr="x60000009"), [])
+
+    def testLookupRequiresIndex(self):
+        with self.assertRaises(InvalidFieldException):
+            self.capture.lookup(self.builder.WRITE_REGISTER_REQUEST, addr="x60000003")
+        with self.assertRaises(InvalidFieldException):
+            self.capture.build_index(self.builder.WRITE_REGISTER_REQUEST, "address")
+
+    def testIndexFileIsReused(self):
+        self.capture.build_index(self.builder.WRITE_REGISTER_REQUEST, "addr")
+        with Capture(self.path) as capture:
+            matches = capture.lookup(self.builder.WRITE_REGISTER_REQUEST, addr="x60000001")
+            self.assertEqual(len(matches), 10)
+
+    def testIndexIsExtendedWhenCaptureGrows(self):
+        index = self.capture.build_index(self.builder.WRITE_REGISTER_REQUEST, "addr")
+        indexed_size = index._size
+        new_request = self.builder.WRITE_REGISTER_REQUEST(addr="x60000001", data="x000000FF")
+        Capture.write(self.path, [new_request], append=True)
+        matches = self.capture.lookup(self.builder.WRITE_REGISTER_REQUEST, addr="x60000001")
+        self.assertEqual(len(index), 51)
+        self.assertEqual(matches[-1], new_request)
+        self.assertEqual(index.offsets("x60000001")[-1], indexed_size)
+
+    def testIndexIsRebuiltWhenCaptureIsRewritten(self):
+        self.capture.build_index(self.builder.WRITE_REGISTER_REQUEST, "addr")
+        self.capture.close()
+        Capture.write(self.path, self.requests[:10])
+        with Capture(self.path) as capture:
+            matches = capture.lookup(self.builder.WRITE_REGISTER_REQUEST, addr="x60000001")
+            self.assertEqual([msg.data for msg in matches], ["x00000001", "x00000006"])
+
+    def testIndexMergesNewEntries(self):
+        index = self.capture.build_index(self.builder.WRITE_REGISTER_REQUEST, "addr")
+        new_requests = [
+            self.builder.WRITE_REGISTER_REQUEST(addr=f"x6000000{i}", data=f"x{0xF0 + i:08X}") for i in (4, 0, 2)
+        ]
+        Capture.write(self.path, new_requests, append=True)
+        matches = self.capture.lookup(self.builder.WRITE_REGISTER_REQUEST, addr="x60000000")
+        self.assertEqual([msg.data for msg in matches], [f"x{i:08X}" for i in range(0, 50, 5)] + ["x000000F0"])
+        self.assertEqual(len(index), 53)
+        values = [index._value_at(i) for i in range(len(index))]
+        self.assertEqual(values, sorted(values))
+
+    def testIndexUpdatedWithoutNewEntries(self):
+        index = self.capture.build_index(self.builder.WRITE_REGISTER_REQUEST, "addr")
+        Capture.write(self.path, [self.builder.READ_REGISTER_REQUEST(addr="x60000001")], append=True)
+        self.assertEqual(len(self.capture.lookup(self.builder.WRITE_REGISTER_REQUEST, addr="x60000001")), 10)
+        self.assertEqual(index._size, self.capture.size)
+        with Capture(self.path) as capture:
+            self.assertEqual(len(capture.lookup(self.builder.WRITE_REGISTER_REQUEST, addr="x60000001")), 10)
+            self.assertEqual(capture._indexes[(self.builder.WRITE_REGISTER_REQUEST, "addr")]._size, capture.size)
+
+    def testRefreshClosesOldMap(self):
+        old = self.capture._data
+        Capture.write(self.path, self.requests[:1], append=True)
+        self.capture.refresh()
+        self.assertTrue(old.closed)
+        self.assertEqual(self.capture._retired, [])
+
+    def testRefreshKeepsMapOfFramesInUse(self):
+        old = self.capture._data
+        records = self.capture.records()
+        _, frame = next(records)
+        Capture.write(self.path, self.requests[:1], append=True)
+        self.capture.refresh()
+        self.assertFalse(old.closed)
+        self.assertEqual(bytes(frame), bytes(self.requests[0]))
+        del frame
+        records.close()
+        self.capture.refresh()
+        self.assertTrue(old.closed)
+        self.assertEqual(self.capture._retired, [])
+
+    def testIndexIsRebuiltWhenDefinitionChanges(self):
+        builder = MessageBuilder({"REQ": {"id": Nibbles(4, value="x0001"), "addr": Bytes(2), "port": Bytes(2)}})
+        Capture.write(self.path, [builder.REQ(addr="x0067", port="x0042")])
+        with Capture(self.path) as capture:
+            self.assertEqual(len(capture.build_index(builder.REQ, "addr")), 1)
+
+        swapped = MessageBuilder({"REQ": {"id": Nibbles(4, value="x0001"), "port": Bytes(2), "addr": Bytes(2)}})
+        with Capture(self.path) as capture:
+            self.assertEqual(len(list(capture.where(swapped.REQ, addr="x0042"))), 1)
+            self.assertEqual(len(capture.lookup(swapped.REQ, addr="x0042")), 1)
+            self.assertEqual(capture.lookup(swapped.REQ, addr="x0067"), [])
+
+    def testIndexLeavesNoTemporaryFiles(self):
+        self.capture.build_index(self.builder.WRITE_REGISTER_REQUEST, "addr")
+        Capture.write(self.path, self.requests[:2], append=True)
+        self.capture.build_index(self.builder.WRITE_REGISTER_REQUEST, "addr")
+        self.assertEqual(
+            sorted(os.listdir(os.path.dirname(self.path))),
+            ["traffic.cap", "traffic.cap.WRITE_REGISTER_REQUEST.addr.idx"],
+        )
+
+    def testUndecodableFramesSkipped(self):
+        builder = MessageBuilder(msg_fmts)
+        builder.load_definitions(register_defs)
+        builder.load_definitions(
+            {
+                "REGISTER_ACCESS": {
+                    "mid": Nibbles(4),
+                    "data": Bytes(4, context=TaggedUnion("mid", {"x0016": "OUTPUTS"})),
+                },
+            }
+        )
+        frames = [bytes.fromhex(data) for data in ("001680000000", "001600000001", "001640000000")]
+        Capture.write(self.path, frames)
+        with Capture(self.path) as capture:
+            matches = capture.where(builder.REGISTER_ACCESS, mid="x0016")
+            self.assertEqual([msg.data for msg in matches], ["x80000000", "x40000000"])
+            matches = capture.where(builder.REGISTER_ACCESS, strict=True, mid="x0016")
+            self.assertEqual(next(matches).data, "x80000000")
+            with self.assertRaises(InvalidDataFormatException):
+                next(matches)
+
+            capture.build_index(builder.REGISTER_ACCESS, "mid")
+            self.assertEqual(len(capture.lookup(builder.REGISTER_ACCESS, mid="x0016")), 2)
+            with self.assertRaises(InvalidDataFormatException):
+                capture.lookup(builder.REGISTER_ACCESS, strict=True, mid="x0016")
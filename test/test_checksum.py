@@ -0,0 +1,88 @@
+import unittest
+from pymessagelib import MessageBuilder, Field, Nibbles, Bytes, Bits, Crc, Sum, Xor
+from pymessagelib.checksum import (
+    CRC8,
+    CRC8_MAXIM,
+    CRC16_ARC,
+    CRC16_CCITT_FALSE,
+    CRC16_KERMIT,
+    CRC16_MODBUS,
+    CRC16_XMODEM,
+    CRC32,
+    CRC32C,
+    CRC32_MPEG2,
+    SUM8,
+    SUM16,
+    XOR8,
+)
+
+CHECK_DATA = b"123456789"
+
+
+class TestChecksum(unittest.TestCase):
+    def testCheckValues(self):
+        self.assertEqual(CRC8.compute(CHECK_DATA), 0xF4)
+        self.assertEqual(CRC8_MAXIM.compute(CHECK_DATA), 0xA1)
+        self.assertEqual(CRC16_ARC.compute(CHECK_DATA), 0xBB3D)
+        self.assertEqual(CRC16_CCITT_FALSE.compute(CHECK_DATA), 0x29B1)
+        self.assertEqual(CRC16_KERMIT.compute(CHECK_DATA), 0x2189)
+        self.assertEqual(CRC16_MODBUS.compute(CHECK_DATA), 0x4B37)
+        self.assertEqual(CRC16_XMODEM.compute(CHECK_DATA), 0x31C3)
+        self.assertEqual(CRC32.compute(CHECK_DATA), 0xCBF43926)
+        self.assertEqual(CRC32C.compute(CHECK_DATA), 0xE3069283)
+        self.assertEqual(CRC32_MPEG2.compute(CHECK_DATA), 0x0376E6E7)
+        self.assertEqual(SUM8.compute(CHECK_DATA), 0xDD)
+        self.assertEqual(SUM16.compute(CHECK_DATA), 0x01DD)
+        self.assertEqual(XOR8.compute(CHECK_DATA), 0x31)
+
+    def testExtend(self):
+        for crc in (CRC8, CRC16_CCITT_FALSE, CRC16_MODBUS, CRC32, CRC32_MPEG2):
+            self.assertEqual(crc.extend(crc.compute(CHECK_DATA[:4]), CHECK_DATA[4:]), crc.compute(CHECK_DATA))
+
+    def testPatch(self):
+        old = int.from_bytes(CHECK_DATA, "big")
+        new = old ^ (0x5A << 24)
+        new_data = new.to_bytes(len(CHECK_DATA), "big")
+        for checksum in (CRC8, CRC16_ARC, CRC16_CCITT_FALSE, CRC32, CRC32C, SUM8, SUM16, XOR8, Xor(16)):
+            patched = checksum.patch(checksum.compute(CHECK_DATA), old, new, len(CHECK_DATA) * 8)
+            self.assertEqual(patched, checksum.compute(new_data))
+            self.assertEqual(checksum.patch(patched, new, new, len(CHECK_DATA) * 8), patched)
+
+    def testUnalignedSpan(self):
+        self.assertEqual(CRC32.compute_span(0b101, 3), CRC32.compute(b"\x05"))
+        self.assertEqual(CRC32.compute_span(0x1FFFF, 17), CRC32.compute(b"\x01\xff\xff"))
+
+    def testCustomCrc(self):
+        crc = Crc(16, 0x1021, init=0x1D0F, name="CRC16_AUG_CCITT")
+        self.assertEqual(crc.compute(CHECK_DATA), 0xE5CC)
+        with self.assertRaises(ValueError):
+            Crc(4, 0x3)
+
+    def testAutoUpdate(self):
+        builder = MessageBuilder(
+            {
+                "GET_ADDR": {
+                    "id": Nibbles(4, value="x0014"),
+                    "ptr": Bytes(4),
+                    "addr": Bits(11),
+                    "pad": Bits(3, value="b000"),
+                    "crc": Bytes(2, value=CRC16_CCITT_FALSE.auto_update("ptr", "addr", "pad")),
+                    "sum": Bytes(4, value=SUM8.auto_update("id", "crc")),
+                }
+            }
+        )
+        msg = builder.GET_ADDR(ptr="x00000012", addr="x11")
+        span = (0x12 << 14) | (0x11 << 3)
+        self.assertEqual(int(msg.crc), CRC16_CCITT_FALSE.compute_span(span, 46))
+        self.assertEqual(int(msg.sum), SUM8.compute(bytes(msg.id) + bytes(msg.crc)))
+        self.assertEqual(builder.GET_ADDR.dependency_graph.graph["crc"], ["ptr", "addr", "pad"])
+
+        msg.ptr = "x12345678"
+        self.assertEqual(int(msg.crc), CRC16_CCITT_FALSE.compute_span((0x12345678 << 14) | (0x11 << 3), 46))
+
+    def testMessageBytes(self):
+        builder = MessageBuilder({"SHORT": {"a": Bits(3), "b": Nibbles(2)}})
+        msg = builder.SHORT(a="b101", b="xFF")
+        self.assertEqual(int(msg), 0b10111111111)
+        self.assertEqual(bytes(msg), b"\x05\xff")
+        self.assertEqual(bytes(msg.a), b"\x05")
@@ -0,0 +1,98 @@
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from pymessagelib import MessageBuilder, FrozenMessage, Nibbles, Bytes
+from msg_definitions import msg_fmts
+
+
+def synthetic_defs(prefix, count):
+    """Return distinct message definitions that can all be loaded into one builder."""
+    return {f"{prefix}_{i}": {"mid": Nibbles(4, value=f"x{i:04X}"), "data": Bytes(4)} for i in range(count)}
+
+
+class TestConcurrency(unittest.TestCase):
+    def run_threads(self, target, count=8):
+        """Run the target in threads that all start at the same time and re-raise the first exception."""
+        barrier = threading.Barrier(count)
+        errors = []
+
+        def run(i):
+            barrier.wait()
+            try:
+                target(i)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+
+    def testLazyClassesBuiltOnce(self):
+        builder = MessageBuilder(msg_fmts, lazy=True)
+        built = []
+        build_message_class = builder.build_message_class
+
+        def counting_build(name, fmt):
+            built.append(name)
+            return build_message_class(name, fmt)
+
+        builder.build_message_class = counting_build
+        seen = [None] * 8
+
+        def access(i):
+            seen[i] = [getattr(builder, name) for name in reversed(list(msg_fmts))]
+            builder.build_message("x001600089999999900000000")
+
+        self.run_threads(access)
+        self.assertEqual(sorted(built), sorted(msg_fmts))
+        for classes in seen:
+            self.assertEqual(classes, seen[0])
+        self.assertEqual(builder.message_classes, list(reversed(seen[0])))
+
+    def testConcurrentLoading(self):
+        builder = MessageBuilder()
+        definitions = [synthetic_defs(f"SET{i}", 20) for i in range(8)]
+        self.run_threads(lambda i: builder.load_definitions(definitions[i]))
+        names = [name for defs in definitions for name in defs]
+        self.assertEqual(sorted(msg_cls.__name__ for msg_cls in builder.message_classes), sorted(names))
+        for name in names:
+            self.assertIn(getattr(builder, name), builder.message_classes)
+
+    def testConcurrentDecoding(self):
+        builder = MessageBuilder(msg_fmts, lazy=True)
+        frames = [f"x00160008{i:08X}{i * 7:08X}" for i in range(1, 200)] * 4
+
+        def decode(frame):
+            msg = builder.build_message(frame)
+            return type(msg), msg.render()
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(decode, frames))
+        self.assertEqual(results, [decode(frame) for frame in frames])
+        self.assertEqual({msg_cls for msg_cls, _ in results}, {builder.WRITE_REGISTER_REQUEST})
+
+    def testFrozenClassBuiltOnce(self):
+        builder = MessageBuilder(msg_fmts)
+        build = FrozenMessage.build.__func__
+        built = []
+
+        def slow_build(cls, msg_cls):
+            built.append(msg_cls)
+            time.sleep(0.01)
+            return build(cls, msg_cls)
+
+        frozen = [None] * 8
+
+        def decode(i):
+            frozen[i] = builder.WRITE_REGISTER_REQUEST.from_data("x001600089999999900000000", frozen=True)
+
+        with mock.patch.object(FrozenMessage, "build", classmethod(slow_build)):
+            self.run_threads(decode)
+        self.assertEqual(built, [builder.WRITE_REGISTER_REQUEST])
+        self.assertEqual(len(set(frozen)), 1)
@@ -0,0 +1,81 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from pymessagelib import MessageBuilder, CompiledFormat, DefinitionCache, Nibbles, Bytes
+from msg_definitions import msg_fmts
+
+
+class TestDefinitionCache(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "msg_fmts.cache")
+        # Compiled formats interned by other tests would never be looked up in the cache.
+        CompiledFormat._interned.clear()
+
+    def testCacheWritten(self):
+        builder = MessageBuilder(msg_fmts, cache=self.path)
+        self.assertTrue(os.path.exists(self.path))
+        self.assertFalse(builder.cache.modified)
+        cache = DefinitionCache(self.path)
+        self.assertEqual(len(cache), len({CompiledFormat.fingerprint(fmt) for fmt in msg_fmts.values()}))
+        self.assertIsNotNone(cache.get(builder.GET_ADDR.compiled.digest))
+
+    def testCompiledFormatsLoadedFromCache(self):
+        original = MessageBuilder(msg_fmts, cache=self.path)
+        CompiledFormat._interned.clear()
+        with mock.patch.object(CompiledFormat, "__init__", side_effect=AssertionError("compiled again")):
+            builder = MessageBuilder(msg_fmts, cache=self.path)
+        for msg_cls, original_cls in zip(builder.message_classes, original.message_classes):
+            self.assertEqual(msg_cls.compiled.snapshot()["layout"], original_cls.compiled.snapshot()["layout"])
+            self.assertEqual(msg_cls.update_order, original_cls.update_order)
+            self.assertEqual(msg_cls.bit_length, original_cls.bit_length)
+        self.assertEqual(builder.GET_ADDR.dependency_graph.graph["length"], ["id"])
+
+        msg = builder.build_message("x001600089999999900000000")
+        self.assertIs(type(msg), builder.WRITE_REGISTER_REQUEST)
+        self.assertEqual(msg.length, "x0008")
+        msg.addr = "x01"
+        self.assertEqual(msg, original.WRITE_REGISTER_REQUEST(addr="x01", data="x00000000").render())
+
+    def testChangedDefinitionCompiled(self):
+        MessageBuilder({"MSG": {"mid": Nibbles(2, value="x01"), "data": Bytes(2)}}, cache=self.path)
+        CompiledFormat._interned.clear()
+        builder = MessageBuilder({"MSG": {"mid": Nibbles(2, value="x02"), "data": Bytes(2)}}, cache=self.path)
+        self.assertEqual(len(DefinitionCache(self.path)), 2)
+        self.assertEqual(builder.MSG.layout.constant_value, 0x02 << 16)
+
+    def testAmbiguousPairsCached(self):
+        expected = MessageBuilder(msg_fmts).ambiguous_pairs()
+        builder = MessageBuilder(msg_fmts, cache=self.path)
+        pairs = builder.ambiguous_pairs()
+        names = [(cls_a.__name__, cls_b.__name__) for cls_a, cls_b in pairs]
+        self.assertEqual(names, [(cls_a.__name__, cls_b.__name__) for cls_a, cls_b in expected])
+
+        builder = MessageBuilder(msg_fmts, cache=self.path)
+        with mock.patch.object(builder.dispatch_index, "ambiguous_pairs", side_effect=AssertionError("not cached")):
+            self.assertEqual(builder.ambiguous_pairs(), [(builder.__dict__[a], builder.__dict__[b]) for a, b in names])
+
+    def testUnreadableCacheReplaced(self):
+        with open(self.path, "w") as file:
+            file.write("not json")
+        builder = MessageBuilder(msg_fmts, cache=self.path)
+        self.assertEqual(len(DefinitionCache(self.path)), len(builder.cache))
+        self.assertGreater(len(builder.cache), 0)
+
+    def testSaveUsesUniqueTemporaryFile(self):
+        # A temporary file left at the old fixed path doesn't get in the way, and none are left behind.
+        os.mkdir(f"{self.path}.tmp")
+        MessageBuilder(msg_fmts, cache=self.path)
+        self.assertGreater(len(DefinitionCache(self.path)), 0)
+        self.assertEqual(sorted(os.listdir(os.path.dirname(self.path))), ["msg_fmts.cache", "msg_fmts.cache.tmp"])
+
+    def testAmbiguousPairsOfLazyBuilder(self):
+        expected = [(a.__name__, b.__name__) for a, b in MessageBuilder(msg_fmts).ambiguous_pairs()]
+        builder = MessageBuilder(msg_fmts, lazy=True, cache=self.path)
+        builder.build_message("x101400010F")
+        self.assertEqual([(a.__name__, b.__name__) for a, b in builder.ambiguous_pairs()], expected)
+        builder = MessageBuilder(msg_fmts, lazy=True, cache=self.path)
+        builder.build_message("x101400010F")
+        self.assertEqual([(a.__name__, b.__name__) for a, b in builder.ambiguous_pairs()], expected)
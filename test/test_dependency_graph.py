@@ -1,5 +1,5 @@
 import unittest
-from pymessagelib import DependencyGraph
+from pymessagelib import DependencyGraph, CircularDependencyException
 
 
 class TestDependencyGraph(unittest.TestCase):
@@ -35,3 +35,59 @@ class TestDependencyGraph(unittest.TestCase):
         self.assertEqual(self.graph.num_vertices, 3)
         self.graph.addEdge("cool", "hello")
         self.assertEqual(self.graph.num_vertices, 3)
+
+    def testCyclePath(self):
+        self.graph.addEdge("start", "hello")
+        self.graph.addEdge("hello", "other")
+        self.graph.addEdge("hello", "world")
+        self.graph.addEdge("world", "cool")
+        self.graph.addEdge("cool", "hello")
+        self.assertEqual(self.graph.cycle, ["hello", "world", "cool"])
+
+    def testSelfLoop(self):
+        self.graph.addEdge("hello", "world")
+        self.graph.addEdge("world", "world")
+        self.assertEqual(self.graph.cycle, ["world"])
+
+    def testCacheInvalidated(self):
+        self.graph.addEdge("hello", "world")
+        self.graph.addEdge("world", "cool")
+        self.assertFalse(self.graph.isCyclic())
+        self.assertEqual(self.graph.dependents("cool"), ("world", "hello"))
+        self.graph.addEdge("cool", "hello")
+        self.assertTrue(self.graph.isCyclic())
+
+    def testTopologicalOrder(self):
+        self.graph.addEdge("crc", "length")
+        self.graph.addEdge("crc", "data")
+        self.graph.addEdge("length", "data")
+        self.graph.addNode("parity")
+        order = self.graph.topological_order()
+        self.assertEqual(sorted(order), ["crc", "data", "length", "parity"])
+        self.assertLess(order.index("data"), order.index("length"))
+        self.assertLess(order.index("length"), order.index("crc"))
+
+    def testTopologicalOrderOfCyclicGraph(self):
+        self.graph.addEdge("hello", "world")
+        self.graph.addEdge("world", "hello")
+        with self.assertRaises(CircularDependencyException):
+            self.graph.topological_order()
+
+    def testDependents(self):
+        self.graph.addEdge("crc", "length")
+        self.graph.addEdge("crc", "data")
+        self.graph.addEdge("length", "data")
+        self.graph.addEdge("parity", "addr")
+        self.assertEqual(self.graph.dependents("data"), ("length", "crc"))
+        self.assertEqual(self.graph.dependents("length"), ("crc",))
+        self.assertEqual(self.graph.dependents("crc"), ())
+        self.assertEqual(self.graph.dependents("addr"), ("parity",))
+
+    def testDeepGraph(self):
+        for i in range(10000):
+            self.graph.addEdge(i + 1, i)
+        self.assertFalse(self.graph.isCyclic())
+        self.assertEqual(self.graph.topological_order(), list(range(10001)))
+        self.assertEqual(len(self.graph.dependents(0)), 10000)
+        self.graph.addEdge(0, 10000)
+        self.assertEqual(len(self.graph.cycle), 10001)
@@ -0,0 +1,45 @@
+import unittest
+from pymessagelib import MessageBuilder, Bits, Nibbles, encode_many, iter_encode
+from msg_definitions import msg_fmts
+
+
+class TestEncoder(unittest.TestCase):
+    def setUp(self):
+        self.builder = MessageBuilder(msg_fmts)
+        self.builder.load_definitions({"SHORT": {"a": Bits(3), "b": Nibbles(2)}})
+        self.messages = [
+            self.builder.WRITE_REGISTER_REQUEST(addr=f"x{i:08X}", data=f"x{i * 3:08X}") for i in range(10)
+        ] + [self.builder.SHORT(a="b101", b="xFF")]
+        self.expected = b"".join(bytes(msg) for msg in self.messages)
+
+    def testMessageBytes(self):
+        self.assertEqual(bytes(self.messages[1]), bytes.fromhex(self.messages[1].render()[1:]))
+        self.assertEqual(bytes(self.messages[-1]), b"\x05\xff")
+
+    def testPackInto(self):
+        buffer = bytearray(16)
+        self.assertEqual(self.messages[-1].pack_into(buffer, 3), 2)
+        self.assertEqual(buffer[3:5], b"\x05\xff")
+        with self.assertRaises(ValueError):
+            self.messages[0].pack_into(buffer, 8)
+
+    def testEncodeManyAllocates(self):
+        encoded = encode_many(iter(self.messages))
+        self.assertEqual(bytes(encoded), self.expected)
+
+    def testEncodeManyIntoBuffer(self):
+        buffer = bytearray(len(self.expected) + 4)
+        encoded = encode_many(self.messages, out=buffer, offset=4)
+        self.assertEqual(bytes(encoded), self.expected)
+        self.assertEqual(buffer[4:], self.expected)
+        with self.assertRaises(ValueError):
+            encode_many(self.messages, out=bytearray(len(self.expected) - 1))
+
+    def testIterEncode(self):
+        buffer = bytearray(30)
+        chunks = [bytes(chunk) for chunk in iter_encode(self.messages, buffer)]
+        self.assertEqual(b"".join(chunks), self.expected)
+        self.assertTrue(all(len(chunk) <= 30 for chunk in chunks))
+        self.assertEqual([len(chunk) for chunk in chunks], [24, 24, 24, 24, 26])
+        with self.assertRaises(ValueError):
+            list(iter_encode(self.messages, bytearray(4)))
@@ -0,0 +1,88 @@
+import unittest
+from pymessagelib import (
+    MessageBuilder,
+    Field,
+    Array,
+    Bit,
+    Bits,
+    Nibbles,
+    Byte,
+    InvalidFormatException,
+    InvalidFieldDataException,
+)
+
+
+class TestMessageArrays(unittest.TestCase):
+    def setUp(self):
+        self.builder = MessageBuilder(
+            {
+                "CHANNEL_STATUS": {
+                    "enabled": Bit(),
+                    "fault": Bit(),
+                    "level": Bits(6),
+                }
+            }
+        )
+        self.builder.load_definitions(
+            {
+                "CHANNEL_REPORT": {
+                    "mid": Nibbles(4, value="x0020"),
+                    "channels": Array(self.builder.CHANNEL_STATUS, count=4),
+                    "checksum": Byte(value=lambda channels: f"x{sum(channels.column('level')) & 0xFF:02X}"),
+                }
+            }
+        )
+        self.msg = self.builder.CHANNEL_REPORT.from_data("x0020" "81" "02" "C3" "04" "00")
+
+    def testLength(self):
+        self.assertEqual(len(self.builder.CHANNEL_REPORT), 16 + 32 + 8)
+        self.assertEqual(len(self.msg.channels), 32)
+        self.assertEqual(self.msg.channels.count, 4)
+        self.assertEqual(self.msg.channels.stride, 8)
+
+    def testIndexing(self):
+        self.assertEqual(type(self.msg.channels[0]), self.builder.CHANNEL_STATUS)
+        self.assertEqual(self.msg.channels[0].enabled, "b1")
+        self.assertEqual(self.msg.channels[0].level, "b000001")
+        self.assertEqual(self.msg.channels[2].fault, "b1")
+        self.assertEqual(self.msg.channels[-1].level, "b000100")
+        with self.assertRaises(IndexError):
+            self.msg.channels[4]
+
+    def testSlicingAndIteration(self):
+        records = self.msg.channels[1:3]
+        self.assertEqual([record.render() for record in records], ["x02", "xc3"])
+        self.assertEqual([record.render() for record in self.msg.channels], ["x81", "x02", "xc3", "x04"])
+
+    def testColumns(self):
+        self.assertEqual(self.msg.channels.column("enabled"), [1, 0, 1, 0])
+        self.assertEqual(self.msg.channels.column("level"), [1, 2, 3, 4])
+        self.assertEqual(self.msg.channels.column("level", fmt=Field.Format.Hex), ["x1", "x2", "x3", "x4"])
+        with self.assertRaises(KeyError):
+            self.msg.channels.column("unknown")
+
+    def testRecordWritePropagates(self):
+        self.assertEqual(self.msg.checksum, "x0A")
+        self.msg.channels[1].level = "b000111"
+        self.assertEqual(self.msg.channels[1].level, "b000111")
+        self.assertEqual(self.msg.channels, "x8107C304")
+        self.assertEqual(self.msg.checksum, "x0F")
+
+    def testRecordAssignment(self):
+        self.msg.channels[3] = self.builder.CHANNEL_STATUS(enabled="b1", fault="b1", level="b111111")
+        self.assertEqual(self.msg.channels[3].render(), "xff")
+        self.msg.channels[0] = "x00"
+        self.assertEqual(self.msg, "x0020" "0002C3FF" "44")
+        with self.assertRaises(InvalidFieldDataException):
+            self.msg.channels[0] = "x100"
+
+    def testConstruction(self):
+        msg = self.builder.CHANNEL_REPORT(channels="x01020304")
+        self.assertEqual(msg.channels.column("level"), [1, 2, 3, 4])
+        self.assertEqual(msg.checksum, "x0A")
+
+    def testInvalidArrays(self):
+        with self.assertRaises(InvalidFormatException):
+            Array(self.builder.CHANNEL_STATUS, count=0)
+        with self.assertRaises(InvalidFormatException):
+            Array(Byte(), count=2)
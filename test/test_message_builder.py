@@ -1,5 +1,14 @@
 import unittest
-from pymessagelib import MessageBuilder, InvalidFieldException, MultipleMatchingMessageDefinitionsException
+from pymessagelib import (
+    MessageBuilder,
+    Nibbles,
+    Byte,
+    Bytes,
+    TaggedUnion,
+    InvalidFieldException,
+    InvalidDataFormatException,
+    MultipleMatchingMessageDefinitionsException,
+)
 from msg_definitions import msg_fmts, register_defs, invalid_def
 
 
@@ -24,3 +33,83 @@ class TestMessageBuilder(unittest.TestCase):
     def testMessageProduction_MultipleMatches(self):
         with self.assertRaises(MultipleMatchingMessageDefinitionsException):
             wrt_req_1 = self.builder.build_message("x00150004FFFFFFFF")
+
+
+class TestLazyMessageBuilder(unittest.TestCase):
+    def setUp(self):
+        self.builder = MessageBuilder(msg_fmts, lazy=True)
+
+    def testClassesBuiltOnAccess(self):
+        self.assertNotIn("GET_ADDR", self.builder.__dict__)
+        GET_ADDR = self.builder.GET_ADDR
+        self.assertIn("GET_ADDR", self.builder.__dict__)
+        self.assertIs(self.builder.GET_ADDR, GET_ADDR)
+        self.assertNotIn("FILL_KEY", self.builder.__dict__)
+        with self.assertRaises(AttributeError):
+            self.builder.NOT_A_MESSAGE
+
+    def testMessageClassesInLoadOrder(self):
+        eager = MessageBuilder(msg_fmts)
+        response = self.builder.WRITE_REGISTER_RESPONSE
+        names = [msg_cls.__name__ for msg_cls in self.builder.message_classes]
+        self.assertEqual(names, [msg_cls.__name__ for msg_cls in eager.message_classes])
+        self.assertIn(response, self.builder.message_classes)
+
+    def testMessageProduction(self):
+        msg = self.builder.build_message("x001600089999999900000000")
+        self.assertIs(type(msg), self.builder.WRITE_REGISTER_REQUEST)
+        with self.assertRaises(MultipleMatchingMessageDefinitionsException):
+            self.builder.build_message("x00150004FFFFFFFF")
+
+    def testBuildMessageOnlyBuildsTriedCandidates(self):
+        msg = self.builder.build_message("x001600089999999900000000")
+        self.assertIs(type(msg), self.builder.WRITE_REGISTER_REQUEST)
+        built = set(msg_fmts) - set(self.builder._pending)
+        self.assertEqual(built, {"WRITE_REGISTER_REQUEST"})
+        self.assertNotIn("GET_ADDR", self.builder.__dict__)
+        with self.assertRaises(InvalidDataFormatException):
+            self.builder.build_message("x99999999")
+        self.assertEqual(set(msg_fmts) - set(self.builder._pending), built)
+
+    def testInvalidDefinitionRaisedOnAccess(self):
+        self.builder.load_definitions(invalid_def)
+        with self.assertRaises(InvalidFieldException):
+            self.builder.INVALID_DEF
+        with self.assertRaises(InvalidFieldException):
+            self.builder.INVALID_DEF
+
+
+class TestCompiledFormatSharing(unittest.TestCase):
+    def setUp(self):
+        self.builder = MessageBuilder(msg_fmts)
+        self.other = MessageBuilder(msg_fmts)
+
+    def testBuildersShareCompiledFormats(self):
+        self.assertIsNot(self.builder.GET_ADDR, self.other.GET_ADDR)
+        self.assertIs(self.builder.GET_ADDR.compiled, self.other.GET_ADDR.compiled)
+        self.assertIs(self.builder.GET_ADDR.layout, self.other.GET_ADDR.layout)
+        self.assertIsNot(self.builder.GET_ADDR.compiled, self.builder.FILL_KEY.compiled)
+
+    def testDifferentDefinitionsAreNotShared(self):
+        first = MessageBuilder({"MSG": {"mid": Nibbles(2, value="x01"), "crc": Byte(value=lambda mid: "x01")}})
+        second = MessageBuilder({"MSG": {"mid": Nibbles(2, value="x01"), "crc": Byte(value=lambda: "x02")}})
+        third = MessageBuilder({"MSG": {"mid": Nibbles(2, value="x02"), "crc": Byte()}})
+        self.assertIsNot(first.MSG.compiled, second.MSG.compiled)
+        self.assertIsNot(first.MSG.compiled, third.MSG.compiled)
+        self.assertEqual(third.MSG(crc="x03"), "x0203")
+
+    def testAutoUpdateFunctionsNotShared(self):
+        first = MessageBuilder({"MSG": {"mid": Nibbles(2, value="x01"), "crc": Byte(value=lambda mid: "x01")}})
+        second = MessageBuilder({"MSG": {"mid": Nibbles(2, value="x01"), "crc": Byte(value=lambda mid: "x02")}})
+        self.assertIs(first.MSG.compiled, second.MSG.compiled)
+        self.assertEqual(first.MSG(), "x0101")
+        self.assertEqual(second.MSG(), "x0102")
+
+    def testContextsResolvedPerBuilder(self):
+        definition = {"mid": Nibbles(4), "data": Bytes(4, context=TaggedUnion("mid", {"x0016": "OUTPUTS"}))}
+        for builder in (self.builder, self.other):
+            builder.load_definitions(register_defs)
+            builder.load_definitions({"REGISTER_ACCESS": definition})
+        self.assertIs(self.builder.REGISTER_ACCESS.compiled, self.other.REGISTER_ACCESS.compiled)
+        msg = self.other.REGISTER_ACCESS.from_data("x001600000000")
+        self.assertIs(msg.data.context, self.other.OUTPUTS)
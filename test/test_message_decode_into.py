@@ -0,0 +1,105 @@
+import unittest
+from pymessagelib import (
+    MessageBuilder,
+    MessagePool,
+    Nibbles,
+    Bytes,
+    TaggedUnion,
+    InvalidDataFormatException,
+    AutoUpdateMismatchException,
+)
+from msg_definitions import msg_fmts, register_defs, caution_codes
+from test_message_variable_length import variable_defs
+
+
+class TestMessageDecodeInto(unittest.TestCase):
+    def setUp(self):
+        self.builder = MessageBuilder()
+        self.builder.load_definitions(msg_fmts)
+        self.builder.load_definitions(register_defs)
+        self.builder.load_definitions(caution_codes)
+        self.builder.load_definitions(variable_defs)
+        self.builder.load_definitions(
+            {
+                "REGISTER_ACCESS": {
+                    "mid": Nibbles(4),
+                    "data": Bytes(4, context=TaggedUnion("mid", {"x0016": "OUTPUTS", "x0017": "INPUTS"})),
+                },
+            }
+        )
+
+    def testDecodeIntoReusesObjects(self):
+        msg = self.builder.WRITE_REGISTER_REQUEST(addr="x00000000", data="x00000000")
+        fields = dict(msg._fields)
+        self.assertIs(msg.decode_into("x0016000860000001800000FF"), msg)
+        self.assertEqual(msg.addr, "x60000001")
+        self.assertEqual(msg.data, "x800000FF")
+        self.assertEqual(msg.length, "x0008")
+        self.assertEqual(msg, self.builder.WRITE_REGISTER_REQUEST.from_data("x0016000860000001800000FF"))
+        for name, field in msg._fields.items():
+            self.assertIs(field, fields[name])
+
+    def testFromDataInto(self):
+        msg = self.builder.WRITE_REGISTER_REQUEST(addr="x00000000", data="x00000000")
+        decoded = self.builder.WRITE_REGISTER_REQUEST.from_data(bytes.fromhex("0016000860000001800000FF"), into=msg)
+        self.assertIs(decoded, msg)
+        self.assertEqual(msg.data, "x800000FF")
+        with self.assertRaises(InvalidDataFormatException):
+            self.builder.READ_REGISTER_REQUEST.from_data("x0015000460000001", into=msg)
+
+    def testInvalidDataIsRejected(self):
+        msg = self.builder.WRITE_REGISTER_REQUEST(addr="x00000000", data="x00000000")
+        with self.assertRaises(InvalidDataFormatException):
+            msg.decode_into("x0017000160000001800000FF")
+        with self.assertRaises(AutoUpdateMismatchException):
+            msg.decode_into("x0016000260000001800000FF", verify=True)
+
+    def testNestedMessagesAreReused(self):
+        msg = self.builder.WRITE_REGISTER_REQUEST(addr="x00000000", data="x00000000")
+        msg.data.context = self.builder.OUTPUTS
+        outputs = msg.data
+        msg.decode_into("x001600086000000140000000")
+        self.assertIs(msg.data, outputs)
+        self.assertEqual(msg.data.reset2, "b1")
+
+    def testUnionContextsFollowDecodedData(self):
+        msg = self.builder.REGISTER_ACCESS.from_data("x001680000000")
+        outputs = msg.data
+        msg.decode_into("x001640000000")
+        self.assertIs(msg.data, outputs)
+        self.assertEqual(msg.data.reset2, "b1")
+        msg.decode_into("x0017C0000000")
+        self.assertEqual(msg.data.context, self.builder.INPUTS)
+        self.assertEqual(msg.data.voltage_ready, "b1")
+        msg.decode_into("x001880000000")
+        self.assertIsNone(msg._fields["data"].context)
+        self.assertEqual(msg.data, "x80000000")
+
+    def testVariableLength(self):
+        msg = self.builder.BLOCK_READ_RESPONSE.from_data("x0031" "02" "ABCD" "01")
+        msg.decode_into("x0031" "03" "ABCDEF" "02")
+        self.assertEqual(msg.data, "xABCDEF")
+        self.assertEqual(len(msg), 16 + 8 + 24 + 8)
+        self.assertEqual(msg, "x003103ABCDEF02")
+
+    def testPool(self):
+        pool = MessagePool(self.builder.WRITE_REGISTER_REQUEST, max_size=1)
+        first = pool.decode("x0016000860000001800000FF")
+        self.assertEqual(len(pool), 0)
+        pool.release(first)
+        self.assertEqual(len(pool), 1)
+        second = pool.decode("x0016000860000002800000FF")
+        self.assertIs(second, first)
+        self.assertEqual(second.addr, "x60000002")
+
+        third = pool.decode("x0016000860000003800000FF")
+        self.assertIsNot(third, second)
+        pool.release(second)
+        pool.release(third)
+        self.assertEqual(len(pool), 1)
+
+        with self.assertRaises(InvalidDataFormatException):
+            pool.decode("x0017000160000001800000FF")
+        self.assertEqual(len(pool), 1)
+        with self.assertRaises(InvalidDataFormatException):
+            pool.release(self.builder.READ_REGISTER_REQUEST(addr="x00000000"))
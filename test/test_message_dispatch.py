@@ -0,0 +1,126 @@
+import unittest
+from pymessagelib import (
+    MessageBuilder,
+    DispatchIndex,
+    Nibbles,
+    Bytes,
+    Byte,
+    TaggedUnion,
+    MultipleMatchingMessageDefinitionsException,
+)
+from msg_definitions import msg_fmts, register_defs
+from test_message_variable_length import variable_defs
+
+
+class TestDispatchIndex(unittest.TestCase):
+    def setUp(self):
+        self.builder = MessageBuilder(msg_fmts)
+        self.index = DispatchIndex(self.builder.message_classes)
+
+    def testCandidates(self):
+        msg = self.builder.WRITE_REGISTER_REQUEST(addr="x60000001", data="x80000000")
+        self.assertEqual(self.index.candidates(int(msg)), [self.builder.WRITE_REGISTER_REQUEST])
+        msg = self.builder.READ_REGISTER_REQUEST(addr="x60000001")
+        self.assertEqual(
+            self.index.candidates(int(msg)), [self.builder.READ_REGISTER_REQUEST, self.builder.READ_REGISTER_REQUEST_V2]
+        )
+        self.assertEqual(self.index.candidates(0xFFFF << 80), [])
+
+    def testBuildMessageUsesIndex(self):
+        msg = self.builder.WRITE_REGISTER_REQUEST(addr="x60000001", data="x80000000")
+        self.assertEqual(self.builder.build_message(msg.render()), msg)
+        self.assertEqual(self.builder.build_message(bytes(msg)), msg)
+        self.assertEqual(self.builder.build_message(int(msg)), msg)
+        with self.assertRaises(MultipleMatchingMessageDefinitionsException):
+            self.builder.build_message("x0015000460000001")
+
+    def testIndexIsRebuiltWhenDefinitionsAreLoaded(self):
+        self.assertEqual(len(self.builder.dispatch_index.message_classes), len(msg_fmts))
+        self.builder.load_definitions({"EXTRA": {"mid": Nibbles(4, value="x0099"), "data": Byte()}})
+        self.assertEqual(type(self.builder.build_message("x009901")), self.builder.EXTRA)
+
+    def testVariableLengthPrefixes(self):
+        self.builder.load_definitions(variable_defs)
+        index = self.builder.dispatch_index
+        data = "x0031" "02" "ABCD" "01"
+        self.assertEqual(index.candidates(int(data[1:], 16), 48), [self.builder.BLOCK_READ_RESPONSE])
+        self.assertEqual(index.candidates(int(data[1:], 16)), [])
+        msg = self.builder.WRITE_REGISTER_REQUEST(addr="x60000001", data="x80000000")
+        self.assertEqual(index.candidates(int(msg), len(msg)), [self.builder.WRITE_REGISTER_REQUEST])
+
+    def testAmbiguousPairs(self):
+        self.builder.load_definitions(variable_defs)
+        self.builder.load_definitions({"BLOCK_WRITE_V2": {"mid": Nibbles(4, value="x0030"), "count": Byte()}})
+        pairs = [(a.__name__, b.__name__) for a, b in self.builder.ambiguous_pairs()]
+        self.assertIn(("READ_REGISTER_REQUEST", "READ_REGISTER_REQUEST_V2"), pairs)
+        self.assertNotIn(("WRITE_REGISTER_REQUEST", "READ_REGISTER_REQUEST"), pairs)
+        # The longer message has a non-zero constant above the length of the shorter one.
+        self.assertNotIn(("WRITE_REGISTER_REQUEST", "WRITE_REGISTER_REQUEST_V2"), pairs)
+        self.assertNotIn(("BLOCK_WRITE", "BLOCK_READ_RESPONSE"), pairs)
+        self.assertIn(("WRITE_REGISTER_REQUEST", "BLOCK_WRITE"), pairs)
+        index = self.builder.dispatch_index
+        self.assertTrue(index.may_overlap(self.builder.BLOCK_WRITE, self.builder.BLOCK_WRITE_V2))
+
+
+class TestAdaptiveOrdering(unittest.TestCase):
+    def setUp(self):
+        self.builder = MessageBuilder(register_defs, adaptive=True)
+        self.builder.refresh_interval = 10
+        self.builder.load_definitions(
+            {
+                "STRICT": {"mid": Nibbles(4), "data": Bytes(4, context=TaggedUnion("mid", {"x0016": "INPUTS"}))},
+                "LOOSE": {"mid": Nibbles(4), "data": Bytes(4)},
+            }
+        )
+        # The INPUTS message requires the last 12 bits to be 0, so this can only be a LOOSE message.
+        self.loose = "x001600000001"
+
+    def testHitCountsReorderCandidates(self):
+        self.assertEqual(self.builder._candidates(self.loose), [self.builder.STRICT, self.builder.LOOSE])
+        for _ in range(10):
+            self.assertEqual(type(self.builder.build_message(self.loose)), self.builder.LOOSE)
+        self.assertEqual(self.builder.hit_counts, {self.builder.LOOSE: 10})
+        self.assertEqual(self.builder._candidates(self.loose), [self.builder.LOOSE, self.builder.STRICT])
+
+    def testAmbiguityIsStillDetected(self):
+        for _ in range(10):
+            self.builder.build_message(self.loose)
+        with self.assertRaises(MultipleMatchingMessageDefinitionsException):
+            self.builder.build_message("x001680000000")
+
+    def count_decodes(self):
+        """Record the name of the class of every from_data call of the builder's classes."""
+        decodes = []
+        for msg_cls in self.builder.message_classes:
+
+            def from_data(cls, *args, decode=msg_cls.from_data.__func__, **kwargs):
+                decodes.append(cls.__name__)
+                return decode(cls, *args, **kwargs)
+
+            msg_cls.from_data = classmethod(from_data)
+        return decodes
+
+    def testTrafficDecodesOneCandidate(self):
+        decodes = self.count_decodes()
+        for _ in range(100):
+            self.builder.build_message(self.loose)
+        self.assertEqual(decodes, ["LOOSE"] * 100)
+
+        del decodes[:]
+        with self.assertRaises(MultipleMatchingMessageDefinitionsException):
+            self.builder.build_message("x001680000000")
+        self.assertEqual(sorted(set(decodes)), ["INPUTS", "LOOSE", "STRICT"])
+
+    def testPartners(self):
+        index = self.builder.dispatch_index
+        self.assertIn(self.builder.STRICT, index.partners(self.builder.LOOSE))
+        self.assertNotIn(self.builder.LOOSE, index.partners(self.builder.LOOSE))
+        pairs = [(index.message_classes.index(a), index.message_classes.index(b)) for a, b in index.ambiguous_pairs()]
+        seeded = DispatchIndex(index.message_classes, pairs)
+        for msg_cls in index.message_classes:
+            self.assertEqual(seeded.partners(msg_cls), index.partners(msg_cls))
+
+    def testNoCountingByDefault(self):
+        builder = MessageBuilder(msg_fmts)
+        builder.build_message("x0016000860000001800000FF")
+        self.assertEqual(builder.hit_counts, {})
@@ -0,0 +1,107 @@
+import unittest
+from pymessagelib import (
+    MessageBuilder,
+    FrozenMessage,
+    Field,
+    Nibbles,
+    Bytes,
+    TaggedUnion,
+    InvalidFormatException,
+    InvalidDataFormatException,
+    AutoUpdateMismatchException,
+)
+from msg_definitions import msg_fmts, register_defs
+from test_message_variable_length import variable_defs
+
+
+class TestMessageFrozen(unittest.TestCase):
+    def setUp(self):
+        self.builder = MessageBuilder()
+        self.builder.load_definitions(msg_fmts)
+        self.builder.load_definitions(register_defs)
+        self.builder.load_definitions(variable_defs)
+        self.builder.load_definitions(
+            {
+                "REGISTER_ACCESS": {
+                    "mid": Nibbles(4),
+                    "data": Bytes(4, context=TaggedUnion("mid", {"x0016": "OUTPUTS", "x0017": "INPUTS"})),
+                },
+            }
+        )
+        self.data = "x0016000860000001800000FF"
+        self.msg = self.builder.WRITE_REGISTER_REQUEST.from_data(self.data, frozen=True)
+
+    def testFrozenClass(self):
+        frozen_cls = self.builder.WRITE_REGISTER_REQUEST.frozen_class()
+        self.assertIs(type(self.msg), frozen_cls)
+        self.assertIs(self.builder.WRITE_REGISTER_REQUEST.frozen_class(), frozen_cls)
+        self.assertEqual(frozen_cls.__name__, "FrozenWRITE_REGISTER_REQUEST")
+        self.assertTrue(isinstance(self.msg, FrozenMessage))
+        self.assertIs(self.msg.context, self.builder.WRITE_REGISTER_REQUEST)
+        with self.assertRaises(InvalidFormatException):
+            self.builder.BLOCK_WRITE.frozen_class()
+
+    def testGettersAndRendering(self):
+        mutable = self.builder.WRITE_REGISTER_REQUEST.from_data(self.data)
+        for name in ("mid", "length", "addr", "data"):
+            self.assertEqual(getattr(self.msg, name), getattr(mutable, name))
+        self.assertIs(self.msg.addr, self.msg.addr)
+        self.assertEqual(self.msg.render(), mutable.render())
+        self.assertEqual(self.msg.render(fmt=Field.Format.Bin), mutable.render(fmt=Field.Format.Bin))
+        self.assertEqual(repr(self.msg), "<FrozenWRITE_REGISTER_REQUEST: x0016000860000001800000ff>")
+        self.assertEqual(len(self.msg), len(mutable))
+        self.assertEqual(int(self.msg), int(mutable))
+        self.assertEqual(bytes(self.msg), bytes(mutable))
+        self.assertEqual(self.msg, self.data)
+        self.assertEqual(self.msg.thaw(), mutable)
+
+    def testWritesRaise(self):
+        with self.assertRaises(AttributeError):
+            self.msg.addr = "x60000002"
+        with self.assertRaises(AttributeError):
+            self.msg._value = 0
+        with self.assertRaises(AttributeError):
+            self.msg.extra = 0
+        with self.assertRaises(AttributeError):
+            del self.msg.addr
+        with self.assertRaises(AttributeError):
+            self.msg.addr.value = "x60000002"
+        with self.assertRaises(AttributeError):
+            self.msg.addr[0] = "b0"
+        with self.assertRaises(AttributeError):
+            self.msg.addr.context = self.builder.OUTPUTS
+        self.assertEqual(self.msg.addr, "x60000001")
+        self.assertEqual(self.msg, self.data)
+        self.assertEqual(self.msg.addr + 1, "x60000002")
+
+    def testHashing(self):
+        other = self.builder.WRITE_REGISTER_REQUEST.from_data(bytes.fromhex(self.data[1:]), frozen=True)
+        self.assertEqual(self.msg, other)
+        self.assertEqual(hash(self.msg), hash(other))
+        self.assertEqual(len({self.msg, other}), 1)
+        different = self.builder.WRITE_REGISTER_REQUEST.from_data("x0016000860000002800000FF", frozen=True)
+        self.assertNotEqual(self.msg, different)
+
+    def testDecodingChecks(self):
+        with self.assertRaises(InvalidDataFormatException):
+            self.builder.WRITE_REGISTER_REQUEST.from_data("x0017000860000001800000FF", frozen=True)
+        with self.assertRaises(InvalidDataFormatException):
+            self.builder.WRITE_REGISTER_REQUEST.from_data("x10016000860000001800000FF", frozen=True)
+        with self.assertRaises(AutoUpdateMismatchException):
+            self.builder.WRITE_REGISTER_REQUEST.from_data("x0016000160000001800000FF", frozen=True, verify=True)
+        msg = self.builder.WRITE_REGISTER_REQUEST.from_data("x0016000160000001800000FF", frozen=True)
+        self.assertEqual(msg.length, "x0008")
+
+    def testNestedFields(self):
+        msg = self.builder.REGISTER_ACCESS.from_data("x001680000000", frozen=True)
+        self.assertIs(type(msg.data), self.builder.OUTPUTS.frozen_class())
+        self.assertEqual(msg.data.reset1, "b1")
+        msg = self.builder.REGISTER_ACCESS.from_data("x0017C0000000", frozen=True)
+        self.assertEqual(msg.data.context, self.builder.INPUTS)
+        self.assertEqual(msg.data.voltage_ready, "b1")
+        msg = self.builder.REGISTER_ACCESS.from_data("x001880000000", frozen=True)
+        self.assertEqual(msg.data, "x80000000")
+        with self.assertRaises(InvalidDataFormatException):
+            self.builder.REGISTER_ACCESS.from_data("x001700000001", frozen=True)
+        with self.assertRaises(InvalidDataFormatException):
+            self.builder.REGISTER_ACCESS.from_data("x001700000001")
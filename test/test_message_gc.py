@@ -0,0 +1,72 @@
+import gc
+import unittest
+import weakref
+from copy import deepcopy
+from pymessagelib import MessageBuilder
+from msg_definitions import msg_fmts, register_defs, caution_codes
+
+
+class TestMessageGarbageCollection(unittest.TestCase):
+    def setUp(self):
+        self.builder = MessageBuilder()
+        self.builder.load_definitions(msg_fmts)
+        self.builder.load_definitions(register_defs)
+        self.builder.load_definitions(caution_codes)
+        gc.collect()
+        gc.disable()
+        self.addCleanup(gc.enable)
+
+    def assertFreedByRefcount(self, make_msg):
+        refs = []
+        for i in range(100):
+            msg = make_msg(i)
+            refs.append(weakref.ref(msg))
+            refs.extend(weakref.ref(field) for field in msg._fields.values())
+            del msg
+        self.assertFalse([ref for ref in refs if ref() is not None])
+        self.assertEqual(gc.collect(), 0)
+        self.assertEqual(gc.garbage, [])
+
+    def testDecodedMessagesAreFreed(self):
+        self.assertFreedByRefcount(lambda i: self.builder.WRITE_REGISTER_REQUEST.from_data(f"x00160008{i:08X}800000FF"))
+
+    def testNestedMessagesAreFreed(self):
+        def make_msg(i):
+            msg = self.builder.WRITE_REGISTER_REQUEST(addr=f"x{i:08X}", data="x80000000")
+            msg.data.context = self.builder.OUTPUTS
+            msg.data.cautions.context = self.builder.CAUTION_CODES
+            msg.data.cautions.addr = "x3"
+            return msg
+
+        self.assertFreedByRefcount(make_msg)
+
+    def testUpdatesStillPropagate(self):
+        msg = self.builder.WRITE_REGISTER_REQUEST(addr="x60000001", data="x80000000")
+        msg.data.context = self.builder.OUTPUTS
+        msg.data.cautions.context = self.builder.CAUTION_CODES
+        msg.data.cautions.addr = "x3"
+        self.assertEqual(msg.data, "x8c000000")
+        self.assertIs(msg._fields["data"]._parent_message, msg)
+
+    def testDeepCopiesUpdateThemselves(self):
+        msg = self.builder.WRITE_REGISTER_REQUEST_V2(addr="x40000000", data="x80000000")
+        msg.data.context = self.builder.OUTPUTS
+        msg_copy = deepcopy(msg)
+        msg_copy.data.reset2 = "b1"
+        self.assertEqual(msg_copy.or_field, "xc0000000")
+        self.assertEqual(msg.data, "x80000000")
+        self.assertEqual(msg.or_field, "xc0000000")
+        self.assertIs(msg_copy._fields["data"]._parent_message, msg_copy)
+        self.assertIsNone(msg_copy._parent_field)
+
+        msg_copy.addr = "x00000001"
+        self.assertEqual(msg_copy.or_field, "xc0000001")
+        self.assertEqual(msg.or_field, "xc0000000")
+
+    def testDeepCopiesOfLazyMessages(self):
+        msg = self.builder.WRITE_REGISTER_REQUEST_V2.from_data("x0016c00000004000000080000000", lazy=True)
+        msg_copy = deepcopy(msg)
+        msg_copy.data = "x00000001"
+        self.assertEqual(msg_copy.or_field, "x40000001")
+        self.assertEqual(msg.data, "x80000000")
+        self.assertIs(msg_copy._fields["addr"]._parent_message, msg_copy)
@@ -0,0 +1,77 @@
+import gc
+import unittest
+import weakref
+from pymessagelib import MessageBuilder, Nibbles, Bytes, TaggedUnion, InvalidDataFormatException
+from msg_definitions import msg_fmts, register_defs
+from test_message_variable_length import variable_defs
+
+
+class TestMessageLazy(unittest.TestCase):
+    def setUp(self):
+        self.builder = MessageBuilder()
+        self.builder.load_definitions(msg_fmts)
+        self.builder.load_definitions(register_defs)
+        self.builder.load_definitions(variable_defs)
+        self.builder.load_definitions(
+            {
+                "REGISTER_ACCESS": {
+                    "mid": Nibbles(4),
+                    "data": Bytes(4, context=TaggedUnion("mid", {"x0016": "OUTPUTS", "x0017": "INPUTS"})),
+                },
+            }
+        )
+        self.data = "x0016000160000001800000FF"
+
+    def testFieldsAreConstructedWhenUsed(self):
+        msg = self.builder.WRITE_REGISTER_REQUEST.from_data(self.data, lazy=True)
+        self.assertEqual(len(msg._fields._data), 4)
+        self.assertEqual(msg.addr, "x60000001")
+        self.assertEqual(sorted(msg._fields._data), ["data", "length", "mid"])
+        self.assertIs(msg.addr, msg.addr)
+
+        # Auto-update fields are calculated from the fields they depend on.
+        self.assertEqual(msg.length, "x0008")
+        self.assertEqual(list(msg._fields._data), ["mid"])
+
+    def testSameAsEagerDecode(self):
+        eager = self.builder.WRITE_REGISTER_REQUEST.from_data(self.data)
+        msg = self.builder.WRITE_REGISTER_REQUEST.from_data(self.data, lazy=True)
+        self.assertEqual(msg.data, "x800000FF")
+        self.assertEqual(msg.render(), eager.render())
+        self.assertEqual(list(msg._fields), ["mid", "length", "addr", "data"])
+        self.assertEqual(msg, eager)
+        self.assertEqual(len(msg), len(eager))
+
+    def testWritingLazyMessage(self):
+        msg = self.builder.WRITE_REGISTER_REQUEST.from_data(self.data, lazy=True)
+        msg.data = "x00000001"
+        self.assertEqual(msg, "x0016000860000001" "00000001")
+
+    def testConstantsAreCheckedEagerly(self):
+        with self.assertRaises(InvalidDataFormatException):
+            self.builder.WRITE_REGISTER_REQUEST.from_data("x0017000160000001800000FF", lazy=True)
+
+    def testNestedFields(self):
+        msg = self.builder.REGISTER_ACCESS.from_data("x0017C0000000", lazy=True)
+        self.assertEqual(msg.data.context, self.builder.INPUTS)
+        self.assertEqual(msg.data.voltage_ready, "b1")
+        msg.mid = "x0016"
+        self.assertEqual(msg.data.context, self.builder.OUTPUTS)
+        msg = self.builder.REGISTER_ACCESS.from_data("x001700000001", lazy=True)
+        with self.assertRaises(InvalidDataFormatException):
+            msg.data
+
+    def testVariableLength(self):
+        msg = self.builder.BLOCK_READ_RESPONSE.from_data("x0031" "02" "ABCD" "01", lazy=True)
+        self.assertEqual(msg.status, "x01")
+        self.assertEqual(msg.data, "xABCD")
+        self.assertEqual(len(msg), 16 + 8 + 16 + 8)
+
+    def testFreedByRefcount(self):
+        gc.disable()
+        self.addCleanup(gc.enable)
+        msg = self.builder.WRITE_REGISTER_REQUEST.from_data(self.data, lazy=True)
+        msg.length
+        ref = weakref.ref(msg)
+        del msg
+        self.assertIsNone(ref())
@@ -1,5 +1,5 @@
 import unittest
-from pymessagelib import MessageBuilder
+from pymessagelib import MessageBuilder, InvalidFieldDataException
 from msg_definitions import msg_fmts, register_defs
 
 
@@ -18,3 +18,20 @@ class TestMessageLength(unittest.TestCase):
         self.assertTrue(len(outputs.cautions) == 8)
         self.assertTrue(len(outputs.unused) == 22)
         self.assertTrue(OUTPUTS.bit_length == 32)
+
+    def testSharedMetaclass(self):
+        builder = MessageBuilder(msg_fmts)
+        self.assertIs(type(builder.GET_ADDR), type(builder.FILL_KEY))
+        self.assertEqual(len(builder.GET_ADDR), builder.GET_ADDR.bit_length)
+        self.assertIs(builder.GET_ADDR.ptr, builder.FILL_KEY.ptr)
+        self.assertIsNot(builder.GET_ADDR.addr, builder.GET_ADDR.crc)
+
+    def testSharedPropertiesWriteTheirOwnMessage(self):
+        builder = MessageBuilder(msg_fmts)
+        get_addr = builder.GET_ADDR(ptr="x00000001", addr="b00000000001")
+        fill_key = builder.FILL_KEY(ptr="x000002", addr="b01")
+        get_addr.ptr = "x00000003"
+        self.assertEqual(int(get_addr.ptr), 3)
+        self.assertEqual(int(fill_key.ptr), 2)
+        with self.assertRaises(InvalidFieldDataException):
+            fill_key.ptr = "x10000003"
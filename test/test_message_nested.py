@@ -2,6 +2,9 @@ import unittest
 from field import Field
 from pymessagelib import (
     MessageBuilder,
+    Bit,
+    Byte,
+    Bytes,
     InvalidFieldDataException,
     CircularDependencyException,
     ContextDataMismatchException,
@@ -105,3 +108,56 @@ class TestNestedMessages(unittest.TestCase):
         msg = WRITE_REGISTER_REQUEST(addr="x60000001", data="x80000001")
         with self.assertRaises(ContextDataMismatchException):
             msg.data.context = self.builder.OUTPUTS
+
+
+class TestTargetedUpdates(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+        self.builder = MessageBuilder()
+        self.builder.load_definitions(register_defs)
+        self.builder.load_definitions(caution_codes)
+        self.builder.load_definitions(
+            {
+                "REGISTER_WRITE": {
+                    "addr": Bytes(4),
+                    "data": Bytes(4),
+                    "addr_parity": Bit(value=lambda addr: f"b{bin(int(addr)).count('1') % 2}"),
+                    "crc": Byte(value=lambda data, addr_parity: f"x{(int(data) >> 24) + int(addr_parity):02X}"),
+                }
+            }
+        )
+        self.msg = self.builder.REGISTER_WRITE(addr="x60000001", data="x00000000")
+        self.msg.data.context = self.builder.OUTPUTS
+        self.msg.data.cautions.context = self.builder.CAUTION_CODES
+        self.spy("addr_parity")
+        self.spy("crc")
+
+    def spy(self, name):
+        """Record the calls of the auto-update function of a field of the message."""
+        calls = self.calls
+        updater = self.msg._fields[name]._value_function
+
+        def spied(*args):
+            calls.append(name)
+            return updater(*args)
+
+        self.msg._fields[name]._value_function = spied
+
+    def testNestedWriteUpdatesDependentAncestorFields(self):
+        self.msg.data.cautions.addr = "x3"
+        self.assertEqual(self.calls, ["crc"])
+        self.assertEqual(self.msg.data, "x0c000000")
+        self.assertEqual(self.msg.crc, "x0D")
+        self.assertEqual(self.msg, self.builder.REGISTER_WRITE(addr="x60000001", data="x0c000000").render())
+
+    def testWriteUpdatesDependentFields(self):
+        self.msg.addr = "x60000003"
+        self.assertEqual(self.calls, ["addr_parity", "crc"])
+        self.msg.data = "x04400000"
+        self.assertEqual(self.calls, ["addr_parity", "crc", "crc"])
+        self.assertEqual(self.msg.crc, "x04")
+        self.assertEqual(self.msg, self.builder.REGISTER_WRITE(addr="x60000003", data="x04400000").render())
+
+    def testFullUpdate(self):
+        self.msg.update_fields()
+        self.assertEqual(self.calls, ["addr_parity", "crc"])
@@ -0,0 +1,101 @@
+import unittest
+from pymessagelib import (
+    MessageBuilder,
+    Byte,
+    Bytes,
+    Nibbles,
+    Words,
+    TaggedUnion,
+    ContextDataMismatchException,
+    InvalidFormatException,
+    InvalidFieldException,
+    InvalidFieldDataException,
+    MissingFieldDataException,
+)
+from msg_definitions import msg_fmts, register_defs
+
+
+class TestMessageTemplate(unittest.TestCase):
+    def setUp(self):
+        self.builder = MessageBuilder(msg_fmts)
+        self.builder.load_definitions(register_defs)
+
+    def testEncodeMatchesMessages(self):
+        WRITE_REGISTER_REQUEST_V2 = self.builder.WRITE_REGISTER_REQUEST_V2
+        template = WRITE_REGISTER_REQUEST_V2.template(addr="x60000001")
+        for data in ("x80000000", "x00000000", "x12345678"):
+            expected = WRITE_REGISTER_REQUEST_V2(addr="x60000001", data=data)
+            self.assertEqual(template.encode(data=data), bytes(expected))
+            self.assertEqual(template.encode_int(data=data), int(expected))
+
+    def testOverridingDefaults(self):
+        GET_ADDR = self.builder.GET_ADDR
+        template = GET_ADDR.template(ptr="x00000012", addr="b00000010001")
+        self.assertEqual(template.encode(), bytes(GET_ADDR(ptr="x00000012", addr="b00000010001")))
+        self.assertEqual(template.encode(ptr=0x12345678), bytes(GET_ADDR(ptr="x12345678", addr="b00000010001")))
+        self.assertEqual(template.encode(), bytes(GET_ADDR(ptr="x00000012", addr="b00000010001")))
+
+    def testNestedValues(self):
+        template = self.builder.WRITE_REGISTER_REQUEST.template(addr="x60000001")
+        outputs = self.builder.OUTPUTS(reset1="b1", reset2="b0", cautions="x00")
+        expected = self.builder.WRITE_REGISTER_REQUEST(addr="x60000001", data=outputs)
+        self.assertEqual(template.encode(data=outputs), bytes(expected))
+
+    def testNestedContextsChecked(self):
+        self.builder.load_definitions(
+            {
+                "REGISTER_ACCESS": {
+                    "mid": Nibbles(4),
+                    "data": Bytes(4, context=TaggedUnion("mid", {"x0016": "OUTPUTS", "x0017": "INPUTS"})),
+                },
+                "OUTPUT_WRITE": {"id": Byte(value="x01"), "outputs": Bytes(4, context=self.builder.OUTPUTS)},
+            }
+        )
+        template = self.builder.REGISTER_ACCESS.template(mid="x0016")
+        self.assertEqual(template.encode(data="x80000000"), bytes.fromhex("001680000000"))
+        with self.assertRaises(ContextDataMismatchException):
+            template.encode(data="x80000001")
+        with self.assertRaises(ContextDataMismatchException):
+            self.builder.REGISTER_ACCESS(mid="x0016", data="x80000001")
+        self.assertEqual(template.encode(mid="x0017", data="xC0000000"), bytes.fromhex("0017C0000000"))
+        self.assertEqual(template.encode(mid="x0018", data="x00000001"), bytes.fromhex("001800000001"))
+
+        template = self.builder.REGISTER_ACCESS.template(data="x00000001")
+        with self.assertRaises(ContextDataMismatchException):
+            template.encode(mid="x0016")
+        self.assertEqual(template.encode(mid="x0018"), bytes.fromhex("001800000001"))
+        with self.assertRaises(ContextDataMismatchException):
+            self.builder.REGISTER_ACCESS.template(mid="x0017", data="x00000001")
+
+        template = self.builder.OUTPUT_WRITE.template()
+        self.assertEqual(template.encode(outputs="x40000000"), bytes.fromhex("0140000000"))
+        with self.assertRaises(ContextDataMismatchException):
+            template.encode(outputs="x00000001")
+
+    def testPackInto(self):
+        template = self.builder.READ_REGISTER_REQUEST.template()
+        buffer = bytearray(16)
+        self.assertEqual(template.pack_into(buffer, 2, addr="x60000001"), 8)
+        self.assertEqual(buffer[2:10], bytes.fromhex("0015000460000001"))
+        with self.assertRaises(ValueError):
+            template.pack_into(buffer, 10, addr="x60000001")
+
+    def testInvalidValues(self):
+        template = self.builder.WRITE_REGISTER_REQUEST.template(addr="x60000001")
+        with self.assertRaises(MissingFieldDataException):
+            template.encode(addr="x60000002")
+        with self.assertRaises(InvalidFieldException):
+            template.encode(data="x0", length="x0008")
+        with self.assertRaises(InvalidFieldException):
+            template.encode(data="x0", unknown="x0")
+        with self.assertRaises(InvalidFieldDataException):
+            template.encode(data="x100000000")
+        with self.assertRaises(InvalidFieldDataException):
+            template.encode(data=-1)
+        with self.assertRaises(InvalidFieldDataException):
+            self.builder.WRITE_REGISTER_REQUEST.template(addr="60000001")
+
+    def testVariableLengthMessage(self):
+        builder = MessageBuilder({"BLOCK": {"count": Byte(), "data": Words("count")}})
+        with self.assertRaises(InvalidFormatException):
+            builder.BLOCK.template()
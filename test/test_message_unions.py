@@ -0,0 +1,104 @@
+import unittest
+from pymessagelib import (
+    MessageBuilder,
+    Nibbles,
+    Bytes,
+    TaggedUnion,
+    InvalidFieldException,
+    InvalidDataFormatException,
+    ContextDataMismatchException,
+)
+from msg_definitions import register_defs, caution_codes
+
+
+class TestMessageUnions(unittest.TestCase):
+    def setUp(self):
+        self.builder = MessageBuilder()
+        self.builder.load_definitions(register_defs)
+        self.builder.load_definitions(caution_codes)
+        self.builder.load_definitions(
+            {
+                "REGISTER_ACCESS": {
+                    "mid": Nibbles(4),
+                    "data": Bytes(4, context=TaggedUnion("mid", {"x0016": self.builder.OUTPUTS, "x0017": "INPUTS"})),
+                },
+                "REGISTER_ACCESS_WITH_DEFAULT": {
+                    "mid": Nibbles(4),
+                    "data": Bytes(4, context=TaggedUnion("mid", {"x0016": "OUTPUTS"}, default="RANDOM_MEANING")),
+                },
+            }
+        )
+
+    def testContextSelectedOnDecode(self):
+        msg = self.builder.REGISTER_ACCESS.from_data("x001680000000")
+        self.assertEqual(msg.data.context, self.builder.OUTPUTS)
+        self.assertEqual(msg.data.reset1, "b1")
+
+        msg = self.builder.REGISTER_ACCESS.from_data("x0017C0000000")
+        self.assertEqual(msg.data.context, self.builder.INPUTS)
+        self.assertEqual(msg.data.service_req, "b1")
+        self.assertEqual(msg.data.voltage_ready, "b1")
+
+    def testContextSelectedOnConstruction(self):
+        msg = self.builder.REGISTER_ACCESS(mid="x0016", data="x40000000")
+        self.assertEqual(type(msg.data), self.builder.OUTPUTS)
+        self.assertEqual(msg.data.reset2, "b1")
+
+    def testUnknownDiscriminatorValue(self):
+        msg = self.builder.REGISTER_ACCESS.from_data("x001880000000")
+        self.assertIsNone(msg._fields["data"].context)
+        self.assertEqual(msg.data, "x80000000")
+
+        msg = self.builder.REGISTER_ACCESS_WITH_DEFAULT.from_data("x001880000000")
+        self.assertEqual(msg.data.context, self.builder.RANDOM_MEANING)
+        self.assertEqual(msg.data.byte_1, "x80")
+
+    def testContextChangesWithDiscriminator(self):
+        msg = self.builder.REGISTER_ACCESS(mid="x0016", data="x00000000")
+        self.assertEqual(msg.data.context, self.builder.OUTPUTS)
+        msg.mid = "x0017"
+        self.assertEqual(msg.data.context, self.builder.INPUTS)
+        msg.mid = "x0001"
+        self.assertIsNone(msg._fields["data"].context)
+
+    def testManualContextKeptUntilDiscriminatorChanges(self):
+        msg = self.builder.REGISTER_ACCESS(mid="x0016", data="x00000000")
+        msg.data.context = self.builder.RANDOM_MEANING
+        msg.data.byte_2 = "x12"
+        self.assertEqual(msg.data.context, self.builder.RANDOM_MEANING)
+        msg.mid = "x0017"
+        self.assertEqual(msg.data.context, self.builder.INPUTS)
+        self.assertEqual(msg.data, "x00120000")
+
+    def testIncompatibleDataIsNotDecoded(self):
+        # The INPUTS message has a constant field that requires the last 12 bits to be 0.
+        with self.assertRaises(InvalidDataFormatException):
+            self.builder.REGISTER_ACCESS.from_data("x001700000001")
+        with self.assertRaises(ContextDataMismatchException):
+            self.builder.REGISTER_ACCESS(mid="x0017", data="x00000001")
+
+    def testBuildMessageUsesUnion(self):
+        union = TaggedUnion("mid", {"x0016": self.builder.OUTPUTS})
+        builder = MessageBuilder({"REGISTER_ACCESS": {"mid": Nibbles(4), "data": Bytes(4, context=union)}})
+        msg = builder.build_message("x001680000000")
+        self.assertEqual(type(msg), builder.REGISTER_ACCESS)
+        self.assertEqual(msg.data.context, self.builder.OUTPUTS)
+
+    def testInvalidUnions(self):
+        with self.assertRaises(InvalidFieldException):
+            self.builder.build_message_class(
+                "BAD_DISCRIMINATOR", {"mid": Nibbles(4), "data": Bytes(4, context=TaggedUnion("id", {"x1": "OUTPUTS"}))}
+            )
+        with self.assertRaises(InvalidFieldException):
+            self.builder.build_message_class(
+                "UNKNOWN_CONTEXT", {"mid": Nibbles(4), "data": Bytes(4, context=TaggedUnion("mid", {"x1": "NOPE"}))}
+            )
+        with self.assertRaises(InvalidFieldException):
+            self.builder.build_message_class(
+                "WRONG_LENGTH",
+                {"mid": Nibbles(4), "data": Bytes(2, context=TaggedUnion("mid", {"x1": "CAUTION_CODES"}))},
+            )
+        with self.assertRaises(InvalidDataFormatException):
+            self.builder.build_message_class(
+                "BAD_KEY", {"mid": Nibbles(4), "data": Bytes(4, context=TaggedUnion("mid", {"16": "OUTPUTS"}))}
+            )
@@ -0,0 +1,91 @@
+import unittest
+from pymessagelib import (
+    MessageBuilder,
+    Nibbles,
+    Byte,
+    Bytes,
+    Words,
+    InvalidFormatException,
+    InvalidFieldException,
+    InvalidFieldDataException,
+    InvalidDataFormatException,
+)
+
+variable_defs = {
+    "BLOCK_WRITE": {
+        "mid": Nibbles(4, value="x0030"),
+        "count": Byte(value=lambda data: f"d{len(data) // 16}"),
+        "addr": Bytes(4),
+        "data": Words("count"),
+    },
+    "BLOCK_READ_RESPONSE": {
+        "mid": Nibbles(4, value="x0031"),
+        "count": Byte(),
+        "data": Bytes("count"),
+        "status": Byte(),
+    },
+}
+
+
+class TestMessageVariableLength(unittest.TestCase):
+    def setUp(self):
+        self.builder = MessageBuilder(variable_defs)
+
+    def testClassLength(self):
+        self.assertEqual(len(self.builder.BLOCK_WRITE), 0)
+        self.assertEqual(self.builder.BLOCK_WRITE.bit_length, 0)
+
+    def testConstruction(self):
+        msg = self.builder.BLOCK_WRITE(addr="x60000000", data="x111122223333")
+        self.assertEqual(msg.count, "x03")
+        self.assertEqual(len(msg.data), 48)
+        self.assertEqual(len(msg), 16 + 8 + 32 + 48)
+        self.assertEqual(msg.render(), "x00300360000000111122223333")
+
+    def testWritingChangesLength(self):
+        msg = self.builder.BLOCK_WRITE(addr="x60000000", data="x1111")
+        self.assertEqual(msg.count, "x01")
+        msg.data = "x1111222233334444"
+        self.assertEqual(msg.count, "x04")
+        self.assertEqual(len(msg), 16 + 8 + 32 + 64)
+        with self.assertRaises(InvalidFieldDataException):
+            msg.data = "x111"
+
+    def testDecoding(self):
+        msg = self.builder.BLOCK_READ_RESPONSE.from_data("x0031" "02" "ABCD" "01")
+        self.assertEqual(msg.count, "x02")
+        self.assertEqual(msg.data, "xABCD")
+        self.assertEqual(msg.status, "x01")
+        self.assertEqual(self.builder.BLOCK_WRITE.from_data("x0030" "01" "60000000" "2345").data, "x2345")
+
+    def testDecodingInvalidLengths(self):
+        with self.assertRaises(InvalidDataFormatException):
+            self.builder.BLOCK_READ_RESPONSE.from_data("x0031" "03" "ABCD" "01")
+        with self.assertRaises(InvalidDataFormatException):
+            self.builder.BLOCK_READ_RESPONSE.from_data("x0031" "01" "ABCD" "01")
+        with self.assertRaises(InvalidDataFormatException):
+            self.builder.BLOCK_READ_RESPONSE.from_data("x0031" "00" "01")
+
+    def testInconsistentWritableLength(self):
+        with self.assertRaises(InvalidFieldDataException):
+            self.builder.BLOCK_READ_RESPONSE(count="x03", data="xABCD", status="x01")
+
+    def testFrameLength(self):
+        stream = "x0031" "02" "ABCD" "01" "0031" "01" "EF" "00"
+        self.assertEqual(self.builder.BLOCK_READ_RESPONSE.frame_length(stream), 48)
+        self.assertEqual(self.builder.BLOCK_READ_RESPONSE.frame_length("x003103"), 56)
+        self.assertEqual(self.builder.BLOCK_READ_RESPONSE.frame_length("b" + "0" * 10 + "110001" + "00000001"), 40)
+        with self.assertRaises(InvalidDataFormatException):
+            self.builder.BLOCK_READ_RESPONSE.frame_length("x00310")
+
+    def testBuildMessage(self):
+        msg = self.builder.build_message("x0031" "02" "ABCD" "01")
+        self.assertEqual(type(msg), self.builder.BLOCK_READ_RESPONSE)
+
+    def testInvalidDefinitions(self):
+        with self.assertRaises(InvalidFormatException):
+            Bytes("count", value="x00")
+        with self.assertRaises(InvalidFieldException):
+            self.builder.build_message_class("LENGTH_AFTER_DATA", {"data": Bytes("count"), "count": Byte()})
+        with self.assertRaises(InvalidFieldException):
+            self.builder.build_message_class("MISSING_LENGTH", {"data": Bytes("count")})
@@ -0,0 +1,71 @@
+import unittest
+from pymessagelib import (
+    MessageBuilder,
+    Nibbles,
+    Bytes,
+    Bits,
+    Words,
+    Byte,
+    InvalidFormatException,
+    InvalidDataFormatException,
+    AutoUpdateMismatchException,
+)
+from pymessagelib.checksum import CRC16_CCITT_FALSE
+from msg_definitions import msg_fmts
+
+
+class TestMessageVerification(unittest.TestCase):
+    def setUp(self):
+        self.builder = MessageBuilder(msg_fmts)
+        self.builder.load_definitions(
+            {
+                "CRC_REQUEST": {
+                    "mid": Nibbles(4, value="x0016"),
+                    "addr": Bytes(4),
+                    "data": Bytes(4),
+                    "crc": Bytes(2, value=CRC16_CCITT_FALSE.auto_update("addr", "data")),
+                }
+            }
+        )
+        self.good = self.builder.CRC_REQUEST(addr="x60000001", data="x80000000")
+        self.good_data = self.good.render()
+
+    def testVerifyValidData(self):
+        msg = self.builder.CRC_REQUEST.from_data(self.good_data, verify=True)
+        self.assertEqual(msg, self.good)
+        msg = self.builder.WRITE_REGISTER_REQUEST.from_data("x001600089999999900000000", verify=True)
+        self.assertEqual(msg.length, "x0008")
+
+    def testVerifyCorruptedData(self):
+        corrupted = self.good_data[:-4] + "0000"
+        msg = self.builder.CRC_REQUEST.from_data(corrupted)
+        self.assertEqual(msg, self.good)  # without verification, the checksum is silently recalculated
+
+        with self.assertRaises(AutoUpdateMismatchException) as context:
+            self.builder.CRC_REQUEST.from_data(corrupted, verify=True)
+        self.assertEqual(context.exception.mismatches, {"crc": (0, int(self.good.crc))})
+
+        with self.assertRaises(InvalidDataFormatException):
+            self.builder.WRITE_REGISTER_REQUEST.from_data("x001600049999999900000000", verify=True)
+
+    def testVerifyFrames(self):
+        good_bytes = bytes(self.good)
+        bad_crc = good_bytes[:-1] + bytes([good_bytes[-1] ^ 0x01])
+        bad_mid = b"\x00\x17" + good_bytes[2:]
+        frames = [good_bytes, bad_crc, int(self.good), self.good_data, bad_mid, good_bytes]
+        results = list(self.builder.CRC_REQUEST.verify_frames(frames))
+        self.assertEqual([index for index, _ in results], [1, 4])
+        self.assertEqual(results[0][1], {"crc": (int(self.good.crc) ^ 0x01, int(self.good.crc))})
+        self.assertEqual(results[1][1], {"mid": (0x17, 0x16)})
+
+    def testVerifyFramesWithFieldArguments(self):
+        frames = ["x001600089999999900000000", "x001600049999999900000000", "x001600089999999900000001"]
+        results = list(self.builder.WRITE_REGISTER_REQUEST.verify_frames(frames))
+        self.assertEqual(results, [(1, {"length": (4, 8)})])
+
+    def testVerifyFramesInvalid(self):
+        with self.assertRaises(InvalidDataFormatException):
+            list(self.builder.CRC_REQUEST.verify_frames([bytes(self.good) + b"\x00"]))
+        builder = MessageBuilder({"BLOCK": {"count": Byte(), "data": Words("count")}})
+        with self.assertRaises(InvalidFormatException):
+            list(builder.BLOCK.verify_frames([b"\x01\x00\x00"]))
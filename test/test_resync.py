@@ -0,0 +1,69 @@
+import unittest
+from pymessagelib import MessageBuilder, Resynchronizer, Frame, Skipped, Bytes, Byte
+from pymessagelib.checksum import CRC8
+
+
+class TestResynchronizer(unittest.TestCase):
+    def setUp(self):
+        self.builder = MessageBuilder(
+            {
+                "STATUS": {
+                    "sync": Bytes(2, value="xA55A"),
+                    "mid": Byte(value="x01"),
+                    "status": Bytes(2),
+                    "crc": Byte(value=CRC8.auto_update("mid", "status")),
+                },
+                "DATA": {
+                    "sync": Bytes(2, value="xA55A"),
+                    "mid": Byte(value="x02"),
+                    "data": Bytes(4),
+                    "crc": Byte(value=CRC8.auto_update("mid", "data")),
+                },
+            }
+        )
+        self.resync = Resynchronizer(self.builder.message_classes)
+        self.status = bytes(self.builder.STATUS(status="x1234"))
+        self.data = bytes(self.builder.DATA(data="xDEADBEEF"))
+
+    def testSyncPatterns(self):
+        self.assertEqual(Resynchronizer.sync_pattern(self.builder.STATUS), (b"\xa5\x5a\x01", 0))
+        self.assertEqual(self.resync.sync_patterns, [(b"\xa5\x5a\x01", 0), (b"\xa5\x5a\x02", 0)])
+        builder = MessageBuilder({"NO_SYNC": {"a": Bytes(2)}})
+        self.assertIsNone(Resynchronizer.sync_pattern(builder.NO_SYNC))
+
+    def testCleanStream(self):
+        stream = self.status + self.data + self.status
+        items = list(self.resync.scan(stream))
+        self.assertEqual(
+            items,
+            [
+                Frame(0, (self.builder.STATUS,), self.status),
+                Frame(6, (self.builder.DATA,), self.data),
+                Frame(14, (self.builder.STATUS,), self.status),
+            ],
+        )
+
+    def testGarbageAndDroppedBytes(self):
+        stream = b"\x00\xa5\xff" + self.status + self.data[:5] + self.data + b"\xa5\x5a" + self.status + b"\x01"
+        # Without verification, the truncated DATA frame and the start of the next one would form a frame.
+        items = list(Resynchronizer(self.builder.message_classes, verify=True).scan(stream))
+        self.assertEqual(
+            items,
+            [
+                Skipped(0, 3),
+                Frame(3, (self.builder.STATUS,), self.status),
+                Skipped(9, 14),
+                Frame(14, (self.builder.DATA,), self.data),
+                Skipped(22, 24),
+                Frame(24, (self.builder.STATUS,), self.status),
+                Skipped(30, 31),
+            ],
+        )
+        self.assertEqual(self.builder.DATA.from_data(items[3].data), self.builder.DATA(data="xDEADBEEF"))
+
+    def testVerifiedResync(self):
+        corrupted = self.status[:4] + b"\x00" + self.status[5:]
+        stream = corrupted + self.status
+        self.assertEqual(len([item for item in self.resync.scan(stream) if isinstance(item, Frame)]), 2)
+        items = list(Resynchronizer(self.builder.message_classes, verify=True).scan(stream))
+        self.assertEqual(items, [Skipped(0, 6), Frame(6, (self.builder.STATUS,), self.status)])
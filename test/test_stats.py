@@ -0,0 +1,96 @@
+import unittest
+from pymessagelib import (
+    MessageBuilder,
+    Message,
+    Stats,
+    encode_many,
+    InvalidDataFormatException,
+    MultipleMatchingMessageDefinitionsException,
+)
+from msg_definitions import msg_fmts, register_defs, caution_codes
+
+
+class TestStats(unittest.TestCase):
+    def setUp(self):
+        self.builder = MessageBuilder(msg_fmts)
+        self.builder.load_definitions(register_defs)
+        self.builder.load_definitions(caution_codes)
+
+    def testDisabledByDefault(self):
+        self.assertIsNone(self.builder.stats)
+        self.assertNotIn("build_message", self.builder.__dict__)
+        for msg_cls in self.builder.message_classes:
+            self.assertIs(msg_cls.from_data.__func__, Message.from_data.__func__)
+            self.assertNotIn("update_fields", msg_cls.__dict__)
+
+    def testDecodeAndEncodeCounts(self):
+        stats = self.builder.enable_stats()
+        self.assertIsInstance(stats, Stats)
+        self.assertIs(self.builder.enable_stats(), stats)
+
+        msg = self.builder.build_message("x001600089999999900000000")
+        self.builder.WRITE_REGISTER_REQUEST.from_data(bytes(msg))
+        with self.assertRaises(InvalidDataFormatException):
+            self.builder.GET_ADDR.from_data("x001600089999999900000000")
+        encode_many([msg, msg])
+
+        snapshot = stats.snapshot()
+        self.assertEqual(
+            snapshot["messages"]["WRITE_REGISTER_REQUEST"], {"decoded": 2, "decode_errors": 0, "encoded": 3}
+        )
+        self.assertEqual(snapshot["messages"]["GET_ADDR"], {"decoded": 0, "decode_errors": 1, "encoded": 0})
+        self.assertEqual(sum(snapshot["latency_us"]["decode"].values()), 2)
+        self.assertEqual(sum(snapshot["latency_us"]["encode"].values()), 3)
+        self.assertGreater(snapshot["time_s"]["validation"], 0)
+        self.assertGreater(snapshot["time_s"]["auto_update"], 0)
+
+    def testBuildMessageCounts(self):
+        builder = MessageBuilder(msg_fmts)
+        stats = builder.enable_stats()
+        builder.build_message("x001600089999999900000000")
+        with self.assertRaises(InvalidDataFormatException):
+            builder.build_message("x99999999")
+        builder.load_definitions({"WRITE_REGISTER_REQUEST_COPY": msg_fmts["WRITE_REGISTER_REQUEST"]})
+        with self.assertRaises(MultipleMatchingMessageDefinitionsException):
+            builder.build_message("x001600089999999900000000")
+
+        snapshot = stats.snapshot()
+        build = snapshot["build_message"]
+        self.assertEqual((build["built"], build["unresolved"], build["ambiguous"]), (1, 1, 1))
+        self.assertEqual(build["matches"], 3)
+        self.assertEqual(build["mismatches"], sum(counts["decode_errors"] for counts in snapshot["messages"].values()))
+        self.assertEqual(sum(snapshot["latency_us"]["build_message"].values()), 1)
+        self.assertIn("WRITE_REGISTER_REQUEST_COPY", snapshot["messages"])
+
+    def testNestingTime(self):
+        stats = self.builder.enable_stats()
+        msg = self.builder.WRITE_REGISTER_REQUEST_V2(addr="x60000001", data="x00000000")
+        msg.data.context = self.builder.OUTPUTS
+        msg.data.cautions.context = self.builder.CAUTION_CODES
+        stats.reset()
+        msg.data.cautions.addr = "x3"
+        self.assertEqual(msg.or_field, "x6C000001")
+        self.assertGreater(stats.snapshot()["time_s"]["nesting"], 0)
+
+    def testLazyClassesInstrumented(self):
+        builder = MessageBuilder(msg_fmts, lazy=True)
+        stats = builder.enable_stats()
+        data = MessageBuilder(msg_fmts).GET_ADDR(ptr="x00000012", addr="b00000010010").render()
+        builder.GET_ADDR.from_data(data)
+        self.assertEqual(stats.snapshot()["messages"]["GET_ADDR"]["decoded"], 1)
+
+    def testDisable(self):
+        stats = self.builder.enable_stats()
+        msg = self.builder.build_message("x001600089999999900000000")
+        self.assertIs(self.builder.disable_stats(), stats)
+        self.assertIsNone(self.builder.stats)
+        self.builder.build_message(bytes(msg))
+        self.assertEqual(stats.snapshot()["build_message"]["built"], 1)
+        self.assertEqual(stats.snapshot()["messages"]["WRITE_REGISTER_REQUEST"]["encoded"], 0)
+        self.testDisabledByDefault()
+
+    def testLatencyBuckets(self):
+        stats = Stats()
+        for elapsed_ns in (0, 999, 1000, 1999, 2000, 5000):
+            stats._record_latency("decode", elapsed_ns)
+        self.assertEqual(stats.snapshot()["latency_us"]["decode"], {1: 2, 2: 2, 4: 1, 8: 1})
@@ -0,0 +1,197 @@
+import unittest
+from pymessagelib import (
+    MessageBuilder,
+    Message,
+    Tracer,
+    Bytes,
+    Byte,
+    Array,
+    InvalidDataFormatException,
+)
+from msg_definitions import msg_fmts, register_defs, caution_codes
+
+
+class RecordingTracer(Tracer):
+    """Records every event it is notified of."""
+
+    def __init__(self):
+        self.events = []
+
+    def field_written(self, msg, name, value):
+        self.events.append(("field_written", type(msg).__name__, name, value))
+
+    def auto_updated(self, msg, name, inputs, value, elapsed_ns):
+        self.events.append(("auto_updated", type(msg).__name__, name, inputs, value))
+
+    def decoded(self, msg_cls, data, msg, error, elapsed_ns):
+        self.events.append(("decoded", msg_cls.__name__, msg is not None, error is not None))
+
+    def dispatched(self, data, attempts, msg, error, elapsed_ns):
+        self.events.append(("dispatched", [(cls.__name__, matched) for cls, matched in attempts], type(error)))
+
+    def of(self, kind):
+        """Return the recorded events of a kind."""
+        return [event[1:] for event in self.events if event[0] == kind]
+
+
+class TestTracing(unittest.TestCase):
+    def setUp(self):
+        self.builder = MessageBuilder(msg_fmts)
+        self.tracer = self.builder.add_tracer(RecordingTracer())
+
+    def testFieldWrites(self):
+        msg = self.builder.WRITE_REGISTER_REQUEST(addr="x00000001", data="x00000002")
+        msg.addr = "x00000003"
+        msg.addr.value = "x00000004"
+        msg.data[31] = "b1"
+        msg.length.value = "x0009"
+        self.assertEqual(
+            self.tracer.of("field_written"),
+            [
+                ("WRITE_REGISTER_REQUEST", "addr", "x00000001"),
+                ("WRITE_REGISTER_REQUEST", "data", "x00000002"),
+                ("WRITE_REGISTER_REQUEST", "addr", "x00000003"),
+                ("WRITE_REGISTER_REQUEST", "addr", "x00000004"),
+                ("WRITE_REGISTER_REQUEST", "data", "b10000000000000000000000000000010"),
+            ],
+        )
+
+    def testDecodedFieldsNotReported(self):
+        self.builder.WRITE_REGISTER_REQUEST.from_data("x001600089999999900000000")
+        self.builder.build_message("x001600089999999900000000")
+        self.builder.WRITE_REGISTER_REQUEST.from_data("x001600089999999900000000", lazy=True).addr
+        self.assertEqual(self.tracer.of("field_written"), [])
+
+    def testArrayRecordWritesTraced(self):
+        builder = MessageBuilder({"POINT": {"x": Byte(), "y": Byte()}})
+        builder.load_definitions({"PATH": {"points": Array(builder.POINT, count=2)}})
+        tracer = builder.add_tracer(RecordingTracer())
+        msg = builder.PATH(points="x00000000")
+        tracer.events.clear()
+        msg.points[1] = builder.POINT(x="x01", y="x02")
+        self.assertEqual(tracer.of("field_written")[-1], ("PATH", "points", "b00000000000000000000000100000010"))
+
+    def testAutoUpdates(self):
+        msg = self.builder.WRITE_REGISTER_REQUEST_V2(addr="x00000001", data="x00000002")
+        self.tracer.events.clear()
+        msg.data = "x00000004"
+        (event,) = self.tracer.of("auto_updated")
+        self.assertEqual(event[:2], ("WRITE_REGISTER_REQUEST_V2", "or_field"))
+        self.assertEqual(list(event[2]), ["addr", "data"])
+        self.assertEqual(event[2]["data"], "x00000004")
+        self.assertEqual(event[3], "x5")
+        self.assertEqual(msg.or_field, "x00000005")
+
+    def testLazyDecodeAutoUpdatesTraced(self):
+        msg = self.builder.WRITE_REGISTER_REQUEST.from_data("x001600089999999900000000", lazy=True)
+        self.tracer.events.clear()
+        self.assertEqual(msg.length, "x0008")
+        self.assertEqual(
+            [event[:2] for event in self.tracer.of("auto_updated")], [("WRITE_REGISTER_REQUEST", "length")]
+        )
+
+    def testSlowAutoUpdateTimed(self):
+        builder = MessageBuilder(
+            {
+                "SLOW": {
+                    "data": Bytes(2),
+                    "crc": Byte(value=lambda data: sum(range(200000)) and f"x{int(data) & 0xFF:02X}"),
+                }
+            }
+        )
+        timings = []
+
+        class SlowUpdates:
+            def auto_updated(self, msg, name, inputs, value, elapsed_ns):
+                timings.append((name, elapsed_ns))
+
+        builder.add_tracer(SlowUpdates())
+        builder.SLOW(data="x0102")
+        self.assertEqual([name for name, _ in timings], ["crc"])
+        self.assertGreater(timings[0][1], 0)
+
+    def testBuildMessageDispatch(self):
+        self.builder.build_message("x001600089999999900000000")
+        with self.assertRaises(InvalidDataFormatException):
+            self.builder.build_message("x99999999")
+
+        dispatched = self.tracer.of("dispatched")
+        self.assertEqual(dispatched[0][1], type(None))
+        self.assertIn(("WRITE_REGISTER_REQUEST", True), dispatched[0][0])
+        self.assertTrue(all(matched is False for _, matched in dispatched[1][0]))
+        self.assertEqual(dispatched[1][1], InvalidDataFormatException)
+        decoded = self.tracer.of("decoded")
+        self.assertEqual(len(decoded), len(dispatched[0][0]) + len(dispatched[1][0]))
+
+    def testNestedWritesTraced(self):
+        builder = MessageBuilder(msg_fmts)
+        builder.load_definitions(register_defs)
+        builder.load_definitions(caution_codes)
+        tracer = builder.add_tracer(RecordingTracer())
+        msg = builder.WRITE_REGISTER_REQUEST_V2(addr="x60000001", data="x00000000")
+        msg.data.context = builder.OUTPUTS
+        msg.data.cautions.context = builder.CAUTION_CODES
+        tracer.events.clear()
+        msg.data.cautions.addr = "x3"
+        self.assertEqual(tracer.of("field_written"), [("CAUTION_CODES", "addr", "x3")])
+        self.assertEqual(
+            [event[:2] for event in tracer.of("auto_updated")], [("WRITE_REGISTER_REQUEST_V2", "or_field")]
+        )
+
+    def testOnlyHandledEventsTraced(self):
+        class DecodeTracer(Tracer):
+            def decoded(self, msg_cls, data, msg, error, elapsed_ns):
+                pass
+
+        builder = MessageBuilder(msg_fmts)
+        builder.add_tracer(DecodeTracer())
+        msg_cls = builder.WRITE_REGISTER_REQUEST
+        self.assertIn("from_data", msg_cls.__dict__)
+        self.assertNotIn("_evaluate_updater", msg_cls.__dict__)
+        self.assertIs(msg_cls.__dict__["addr"], Message._field_property("addr", True))
+        self.assertNotIn("build_message", builder.__dict__)
+
+    def testPropertiesNotReplaced(self):
+        builder = MessageBuilder(msg_fmts)
+        marker = property(lambda msg: "marker")
+        builder.GET_ADDR.ptr = marker
+        tracer = builder.add_tracer(RecordingTracer())
+        self.assertIs(builder.GET_ADDR.__dict__["ptr"], marker)
+        builder.remove_tracer(tracer)
+        self.assertIs(builder.GET_ADDR.__dict__["ptr"], marker)
+
+    def testRemoveTracer(self):
+        self.assertEqual(self.builder.tracers, [self.tracer])
+        self.builder.remove_tracer(self.tracer)
+        self.assertEqual(self.builder.tracers, [])
+        self.builder.build_message("x001600089999999900000000").addr = "x00000001"
+        self.assertEqual(self.tracer.events, [])
+        for msg_cls in self.builder.message_classes:
+            self.assertNotIn("from_data", msg_cls.__dict__)
+            self.assertNotIn("_evaluate_updater", msg_cls.__dict__)
+        self.assertNotIn("build_message", self.builder.__dict__)
+        with self.assertRaises(ValueError):
+            self.builder.remove_tracer(self.tracer)
+
+    def testLazyClassesTraced(self):
+        builder = MessageBuilder(msg_fmts, lazy=True)
+        tracer = builder.add_tracer(RecordingTracer())
+        builder.GET_ADDR(ptr="x00000012", addr="b00000010010").ptr = "x00000013"
+        self.assertEqual(tracer.of("field_written")[-1], ("GET_ADDR", "ptr", "x00000013"))
+
+    def testTracingWithStats(self):
+        stats = self.builder.enable_stats()
+        self.builder.build_message("x001600089999999900000000")
+        self.assertEqual(stats.snapshot()["build_message"]["built"], 1)
+        self.assertEqual(len(self.tracer.of("dispatched")), 1)
+
+        self.builder.remove_tracer(self.tracer)
+        self.builder.build_message("x001600089999999900000000")
+        self.assertEqual(stats.snapshot()["build_message"]["built"], 2)
+        self.assertEqual(len(self.tracer.of("dispatched")), 1)
+
+        self.builder.add_tracer(self.tracer)
+        self.builder.disable_stats()
+        self.builder.build_message("x001600089999999900000000")
+        self.assertEqual(stats.snapshot()["build_message"]["built"], 2)
+        self.assertEqual(len(self.tracer.of("dispatched")), 2)